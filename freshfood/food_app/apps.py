@@ -3,3 +3,7 @@ from django.apps import AppConfig
 
 class FoodAppConfig(AppConfig):
     name = 'food_app'
+
+    def ready(self):
+        # Enregistre les récepteurs de signaux (métriques, invalidation de cache)
+        from . import signals  # noqa: F401
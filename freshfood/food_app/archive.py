@@ -0,0 +1,113 @@
+"""
+Archivage des commandes anciennes: tables chaudes et froides.
+
+Les commandes passées depuis plus de FOOD_APP_ARCHIVE_AFTER_DAYS jours
+quittent Order et OrderArticle pour ArchivedOrder et ArchivedOrderArticle,
+avec leur identifiant. Les tables chaudes, leurs index et tout ce qui les
+parcourt (liste des commandes, tableau de bord, historique client,
+prévisions) ne portent donc plus que sur la période récente.
+
+Le déplacement se fait par lots: chaque lot copie les commandes les plus
+anciennes et leurs lignes puis les supprime des tables chaudes, dans une
+seule transaction. Une exécution interrompue ne laisse aucune commande à
+moitié déplacée et la suivante reprend où elle s'est arrêtée. Les
+suppressions passent par l'ORM, récepteurs de signaux suspendus
+(signals.suspended): ils retireraient ces commandes des statistiques.
+
+Les statistiques journalières (DailyStats, DailyCategoryStats) servent de
+cumul: l'archivage ne les modifie pas, le tableau de bord garde tout
+l'historique du chiffre d'affaires, et metrics.rebuild() relit aussi les
+archives. Les exports (exports.py) couvrent les deux tables.
+
+Lecture: OrderDetailView cherche une commande absente de Order dans les
+archives et l'affiche en lecture seule. Les identifiants ne sont jamais
+réutilisés (AUTOINCREMENT sous SQLite, séquence sous PostgreSQL): une
+commande archivée et une commande récente ne partagent pas d'identifiant.
+Les clés d'idempotence des commandes archivées restent connues:
+orders.place_orders_batch les cherche dans les deux tables.
+"""
+import datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import fragments, signals
+from .models import ArchivedOrder, ArchivedOrderArticle, Order, OrderArticle
+
+DEFAULT_ARCHIVE_AFTER_DAYS = 365
+DEFAULT_BATCH_SIZE = 1000
+
+ORDER_FIELDS = (
+    'id', 'customer_id', 'client_name', 'created_at', 'updated_at', 'total_price', 'line_count', 'idempotency_key',
+)
+
+
+def archive_after_days():
+    return getattr(settings, 'FOOD_APP_ARCHIVE_AFTER_DAYS', DEFAULT_ARCHIVE_AFTER_DAYS)
+
+
+def cutoff(days=None):
+    """Instant avant lequel une commande est archivée."""
+    return timezone.now() - datetime.timedelta(days=archive_after_days() if days is None else days)
+
+
+def eligible(before):
+    return Order.objects.filter(created_at__lt=before)
+
+
+@transaction.atomic
+def archive_batch(before, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Déplace au plus batch_size commandes passées avant `before`, les plus
+    anciennes d'abord, avec leurs lignes. Retourne (commandes, lignes).
+    """
+    ids = list(
+        eligible(before).order_by('created_at', 'id').select_for_update()
+        .values_list('id', flat=True)[:batch_size]
+    )
+    if not ids:
+        return 0, 0
+    ArchivedOrder.objects.bulk_create(
+        ArchivedOrder(**row) for row in Order.objects.filter(id__in=ids).values(*ORDER_FIELDS)
+    )
+    # Prix figé au besoin: les archives ne dépendent plus du prix courant du produit
+    lines = [
+        ArchivedOrderArticle(id=pk, order_id=order_id, product_id=product_id, quantity=quantity, unit_price=price)
+        for pk, order_id, product_id, quantity, price in OrderArticle.objects.filter(order_id__in=ids).values_list(
+            'id', 'order_id', 'product_id', 'quantity', Coalesce(F('unit_price'), F('product__price')),
+        )
+    ]
+    ArchivedOrderArticle.objects.bulk_create(lines, batch_size=DEFAULT_BATCH_SIZE)
+
+    # Les lignes suivent par cascade
+    with signals.suspended():
+        Order.objects.filter(id__in=ids).delete()
+    fragments.invalidate(Order, OrderArticle)
+    return len(ids), len(lines)
+
+
+def archive(days=None, batch_size=DEFAULT_BATCH_SIZE, max_batches=None, progress=None):
+    """
+    Archive par lots les commandes de plus de `days` jours (réglage par
+    défaut). La limite est fixée au départ. progress(commandes, lignes) est
+    appelé après chaque lot. Retourne (commandes, lignes) déplacées.
+    """
+    before = cutoff(days)
+    orders = lines = batches = 0
+    while max_batches is None or batches < max_batches:
+        moved, moved_lines = archive_batch(before, batch_size)
+        if not moved:
+            break
+        orders, lines, batches = orders + moved, lines + moved_lines, batches + 1
+        if progress is not None:
+            progress(orders, lines)
+    return orders, lines
+
+
+def lines_of(order):
+    """Lignes d'une commande, chaude ou archivée, avec leur produit."""
+    model = ArchivedOrderArticle if isinstance(order, ArchivedOrder) else OrderArticle
+    return model.objects.filter(order=order).select_related('product').order_by('pk')
@@ -0,0 +1,80 @@
+"""
+Utilisateur connecté lu depuis le cache.
+
+AuthenticationMiddleware recharge l'utilisateur de la session à chaque
+requête (une requête sur auth_user). CachedModelBackend le garde dans le
+cache « sessions » pendant FOOD_APP_USER_CACHE_SECONDS secondes. Quand ce
+cache est partagé (Redis, voir FOOD_APP_SESSION_CACHE_URL), les sessions
+y sont aussi lues (moteur cached_db) et une vue connectée ne coûte plus
+aucune requête avant sa propre logique; avec le cache en mémoire par
+défaut, les sessions restent en base (une requête).
+
+L'entrée est supprimée à chaque enregistrement ou suppression de
+l'utilisateur (mot de passe, is_staff, is_active...) et à la déconnexion;
+la vérification du hachage de session de Django s'applique donc aussitôt
+au nouveau mot de passe. Les mises à jour en masse (User.objects.update)
+n'émettent pas de signaux: appeler invalidate_user().
+
+Avec plusieurs processus et le cache en mémoire, la suppression ne vaut
+que dans le processus qui l'a faite. La déconnexion vaut partout (la
+session est supprimée de la base), mais un autre processus garde l'ancien
+utilisateur, donc l'ancien mot de passe et les anciens droits, au plus
+FOOD_APP_USER_CACHE_SECONDS secondes: configurer un cache partagé en
+production.
+"""
+from django.conf import settings
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.db import transaction
+
+USER_CACHE_VERSION = 'v1'
+USER_CACHE_ALIAS = 'sessions'
+DEFAULT_USER_CACHE_SECONDS = 60
+
+
+def get_cache():
+    return caches[USER_CACHE_ALIAS if USER_CACHE_ALIAS in settings.CACHES else 'default']
+
+
+def cache_seconds():
+    return getattr(settings, 'FOOD_APP_USER_CACHE_SECONDS', DEFAULT_USER_CACHE_SECONDS)
+
+
+def _user_key(user_id):
+    return f'food_app:auth:{USER_CACHE_VERSION}:user:{user_id}'
+
+
+def remember_user(user):
+    get_cache().set(_user_key(user.pk), user, cache_seconds())
+
+
+def invalidate_user(user_id):
+    """
+    Oublie l'utilisateur tout de suite, puis de nouveau après validation:
+    une requête concurrente a pu remettre en cache l'ancienne ligne.
+    """
+    key = _user_key(user_id)
+    get_cache().delete(key)
+    transaction.on_commit(lambda: get_cache().delete(key))
+
+
+class CachedModelBackend(ModelBackend):
+    """ModelBackend dont get_user() passe par le cache; authentification et permissions inchangées."""
+
+    def get_user(self, user_id):
+        user = get_cache().get(_user_key(user_id))
+        if user is None:
+            user = super().get_user(user_id)
+            if user is not None:
+                remember_user(user)
+            return user
+        return user if self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        user = await get_cache().aget(_user_key(user_id))
+        if user is None:
+            user = await super().aget_user(user_id)
+            if user is not None:
+                await get_cache().aset(_user_key(user_id), user, cache_seconds())
+            return user
+        return user if self.user_can_authenticate(user) else None
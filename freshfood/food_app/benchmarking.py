@@ -0,0 +1,196 @@
+"""
+Outils de banc d'essai partagés par les commandes generate_data, benchmark
+et loadtest_orders: jeu de données synthétique reproductible et résumé des
+latences.
+
+Les données générées sont reconnaissables (utilisateurs « bench_… »,
+produits « [bench] … ») et remplacées à chaque génération: une même graine
+donne toujours le même jeu de données.
+"""
+import datetime
+import itertools
+import random
+import statistics
+import time
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.db.models import Q
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from . import catalog, fragments, metrics, search
+from .models import ArchivedOrder, ArchivedOrderArticle, DemandForecast, Order, OrderArticle, Product
+
+BENCH_USER_PREFIX = 'bench_'
+BENCH_STAFF_USERNAME = 'bench_staff'
+BENCH_LABEL_PREFIX = '[bench] '
+BENCH_PASSWORD = 'bench-pass-1234'
+
+WORDS = (
+    'pomme banane mangue ananas orange citron carotte chou tomate oignon poivron '
+    'manioc riz haricot farine sucre huile boeuf poulet chevre poisson tilapia '
+    'frais bio local sec fume entier tranche sachet kilo pack'
+).split()
+
+
+def summarize(name, latencies, statuses, elapsed, success=201):
+    """Débit, codes HTTP et percentiles de latence (ms) des requêtes réussies."""
+    latencies = sorted(latencies)
+
+    def percentile(p):
+        if not latencies:
+            return None
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000, 2)
+
+    return {
+        'path': name,
+        'requests': sum(statuses.values()),
+        'errors': sum(count for status, count in statuses.items() if status != success),
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'p50_ms': round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+    }
+
+
+def test_client_hosts():
+    """Les clients de test s'annoncent comme « testserver »: on l'autorise le temps du banc."""
+    return override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'])
+
+
+@transaction.atomic
+def clear():
+    """
+    Supprime le jeu de données synthétique. Les suppressions se font en SQL
+    direct (_raw_delete), sans les signaux par ligne qui coûteraient
+    plusieurs requêtes par commande; les dérivés sont reconstruits ensuite.
+    Sans la cascade de l'ORM, chaque table qui référence un produit ou une
+    commande du jeu (prévisions, archives) est vidée explicitement d'abord.
+    """
+    bench_orders = Q(order__customer__username__startswith=BENCH_USER_PREFIX)
+    bench_products = Q(product__label__startswith=BENCH_LABEL_PREFIX)
+    for queryset in (
+        DemandForecast.objects.filter(bench_products),
+        ArchivedOrderArticle.objects.filter(bench_orders | bench_products),
+        ArchivedOrder.objects.filter(customer__username__startswith=BENCH_USER_PREFIX),
+        OrderArticle.objects.filter(bench_orders | bench_products),
+        Order.objects.filter(customer__username__startswith=BENCH_USER_PREFIX),
+        Product.objects.filter(label__startswith=BENCH_LABEL_PREFIX),
+    ):
+        queryset._raw_delete(queryset.db)
+    User.objects.filter(username__startswith=BENCH_USER_PREFIX).delete()
+    metrics.rebuild()
+    search.get_backend().rebuild()
+    catalog.invalidate()
+    fragments.invalidate(Product, Order, OrderArticle)
+
+
+def _line_count(rng, max_lines):
+    # Loi de Pareto: la plupart des paniers ont 1 à 3 lignes, quelques-uns beaucoup plus
+    return min(max_lines, int(rng.paretovariate(1.2)))
+
+
+def generate(users=200, products=2000, orders=20_000, max_lines=40, skew=1.1, days=90,
+             seed=42, batch_size=2000, progress=None):
+    """
+    Génère un jeu de données complet par bulk_create, après avoir supprimé
+    le précédent. Les produits couvrent toutes les catégories; leur
+    popularité suit une loi de Zipf d'exposant `skew`, le nombre de lignes
+    par commande une loi de Pareto bornée à `max_lines`, et les dates sont
+    réparties sur les `days` derniers jours.
+
+    Retourne le nombre d'objets créés et la durée.
+    """
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    clear()
+
+    # Un seul hachage de mot de passe, partagé par tous les utilisateurs
+    password = make_password(BENCH_PASSWORD)
+    customers = User.objects.bulk_create([
+        User(username=f'{BENCH_USER_PREFIX}{i:06d}', password=password) for i in range(users)
+    ])
+    User.objects.create(username=BENCH_STAFF_USERNAME, password=password, is_staff=True)
+
+    categories = [code for code, _ in Product.CATEGORIE_CHOICES]
+    catalog_products = Product.objects.bulk_create([
+        Product(
+            label=f"{BENCH_LABEL_PREFIX}{' '.join(rng.sample(WORDS, 2))} {i}",
+            sku=f'BENCH-{i:07d}',
+            description=' '.join(rng.choices(WORDS, k=10)),
+            Categorie=categories[i % len(categories)],
+            price=Decimal(rng.randint(100, 50_000)) / 100,
+        )
+        for i in range(products)
+    ], batch_size=batch_size)
+
+    # Popularité: rang tiré au hasard, poids 1 / rang^skew
+    ranked = catalog_products[:]
+    rng.shuffle(ranked)
+    cum_weights = list(itertools.accumulate(1 / (rank ** skew) for rank in range(1, len(ranked) + 1)))
+
+    now = timezone.now()
+    created_orders = created_lines = 0
+    while created_orders < orders:
+        size = min(batch_size, orders - created_orders)
+        with transaction.atomic():
+            batch, lines_per_order = [], []
+            for _ in range(size):
+                lines = []
+                for product in rng.choices(ranked, cum_weights=cum_weights, k=_line_count(rng, max_lines)):
+                    lines.append(OrderArticle(product=product, quantity=rng.randint(1, 5), unit_price=product.price))
+                batch.append(Order(
+                    customer=rng.choice(customers),
+                    client_name=f'Client {rng.randint(1, 10 * users)}',
+                    total_price=sum(line.quantity * line.unit_price for line in lines),
+                    line_count=len(lines),
+                ))
+                lines_per_order.append(lines)
+            Order.objects.bulk_create(batch)
+
+            # created_at est forcé à « maintenant » par auto_now_add: on l'étale ensuite
+            for order in batch:
+                order.created_at = now - datetime.timedelta(seconds=rng.uniform(0, days * 86400))
+            Order.objects.bulk_update(batch, ['created_at'], batch_size=batch_size)
+
+            all_lines = []
+            for order, lines in zip(batch, lines_per_order):
+                for line in lines:
+                    line.order = order
+                all_lines.extend(lines)
+            OrderArticle.objects.bulk_create(all_lines, batch_size=batch_size)
+
+        created_orders += size
+        created_lines += len(all_lines)
+        if progress:
+            progress(created_orders, created_lines)
+
+    # bulk_create n'émet pas de signaux: dérivés reconstruits une fois
+    metrics.rebuild()
+    search.get_backend().rebuild()
+    catalog.invalidate()
+    fragments.invalidate(Product, Order, OrderArticle)
+    return {
+        'users': users + 1,
+        'products': products,
+        'orders': created_orders,
+        'order_lines': created_lines,
+        'elapsed_s': round(time.perf_counter() - started, 2),
+    }
+
+
+def dataset():
+    """Identifiants utiles au banc d'essai; lève LookupError si aucun jeu n'a été généré."""
+    customer_ids = list(
+        User.objects.filter(username__startswith=BENCH_USER_PREFIX, is_staff=False).values_list('id', flat=True)
+    )
+    product_ids = list(Product.objects.filter(label__startswith=BENCH_LABEL_PREFIX).values_list('id', flat=True))
+    staff = User.objects.filter(username=BENCH_STAFF_USERNAME).first()
+    if not customer_ids or not product_ids or staff is None:
+        raise LookupError("Aucun jeu de données synthétique: lancez d'abord « manage.py generate_data ».")
+    return {'customer_ids': customer_ids, 'product_ids': product_ids, 'staff': staff}
@@ -0,0 +1,149 @@
+"""
+Panier côté serveur, conservé dans la session (moteur cached_db avec un
+cache partagé: lu depuis le cache, écrit aussi en base).
+
+Chaque modification est validée aussitôt contre la table des prix en
+cache (catalog.get_prices): un produit supprimé ou un prix modifié est
+signalé à l'ajout, pas à la validation de la commande. Chaque ligne garde
+le prix et le libellé vus par le client; le total est recalculé à partir
+des lignes, sans requête.
+
+À la validation, les produits du panier sont relus en base (une requête,
+in_bulk) dans la transaction qui écrit la commande: la table des prix en
+cache est propre à chaque processus et peut retarder sur une écriture faite
+ailleurs. Un prix modifié ou un produit supprimé lève CartChanged.
+"""
+from decimal import Decimal
+
+from django.db import transaction
+
+from . import catalog, orders
+from .models import Product
+
+CART_SESSION_KEY = 'food_app_cart'
+MAX_LINES = 100
+MAX_QUANTITY = 1000
+
+
+class CartChanged(Exception):
+    """Le catalogue a changé depuis l'ajout de certaines lignes; `changes` les décrit."""
+
+    def __init__(self, changes):
+        super().__init__("Le panier a changé: vérifiez les prix avant de valider.")
+        self.changes = changes
+
+
+def _parse(product_id, quantity):
+    try:
+        product_id, quantity = int(product_id), int(quantity)
+    except (TypeError, ValueError):
+        raise ValueError("Identifiant de produit et quantité entiers attendus.")
+    if not 0 <= quantity <= MAX_QUANTITY:
+        raise ValueError(f"Quantité hors limites (0 à {MAX_QUANTITY}).")
+    return product_id, quantity
+
+
+class Cart:
+    """Lignes {product_id (texte): {'quantity', 'price', 'label'}} d'une session."""
+
+    def __init__(self, session):
+        self.session = session
+        self.lines = session.get(CART_SESSION_KEY, {})
+
+    def save(self):
+        self.session[CART_SESSION_KEY] = self.lines
+        self.session.modified = True
+
+    def set(self, product_id, quantity):
+        """Fixe la quantité d'une ligne (0 la retire). Lève ValueError si la ligne est invalide."""
+        product_id, quantity = _parse(product_id, quantity)
+        if quantity == 0:
+            self.remove(product_id)
+            return
+        entry = catalog.get_prices([product_id]).get(product_id)
+        if entry is None:
+            raise ValueError(f"Produit inconnu: {product_id}.")
+        if str(product_id) not in self.lines and len(self.lines) >= MAX_LINES:
+            raise ValueError(f"Panier plein ({MAX_LINES} lignes au plus).")
+        label, price, _ = entry
+        self.lines[str(product_id)] = {'quantity': quantity, 'price': str(price), 'label': label}
+        self.save()
+
+    def add(self, product_id, quantity=1):
+        product_id, quantity = _parse(product_id, quantity)
+        current = self.lines.get(str(product_id), {}).get('quantity', 0)
+        self.set(product_id, min(current + quantity, MAX_QUANTITY))
+
+    def remove(self, product_id):
+        if self.lines.pop(str(product_id), None) is not None:
+            self.save()
+
+    def clear(self):
+        self.lines = {}
+        self.save()
+
+    @property
+    def total(self):
+        return sum((line['quantity'] * Decimal(line['price']) for line in self.lines.values()), Decimal('0.00'))
+
+    def refresh(self, prices=None):
+        """
+        Aligne les lignes sur `prices` ({id: (label, prix, catégorie)}, par
+        défaut la table des prix en cache). Retourne les
+        changements: [{'product_id', 'label', 'old_price', 'new_price'}],
+        new_price valant None pour un produit retiré du catalogue.
+        """
+        if prices is None:
+            prices = catalog.get_prices([int(pk) for pk in self.lines])
+        changes = []
+        for pk, line in list(self.lines.items()):
+            entry = prices.get(int(pk))
+            if entry is None:
+                del self.lines[pk]
+                changes.append({'product_id': int(pk), 'label': line['label'], 'old_price': line['price'],
+                                'new_price': None})
+            elif str(entry[1]) != line['price']:
+                changes.append({'product_id': int(pk), 'label': line['label'], 'old_price': line['price'],
+                                'new_price': str(entry[1])})
+                line.update(price=str(entry[1]), label=entry[0])
+        if changes:
+            self.save()
+        return changes
+
+    def checkout(self, customer, client_name=None):
+        """
+        Enregistre la commande du panier et le vide. Lève CartChanged si un
+        prix a changé ou un produit a disparu (le panier est alors mis à
+        jour), ValueError si le panier est vide.
+        """
+        if not self.lines:
+            raise ValueError("Le panier est vide.")
+        with transaction.atomic():
+            # Prix de la base, pas du cache: ceux facturés sont ceux de la transaction
+            product_map = Product.objects.in_bulk([int(pk) for pk in self.lines])
+            changes = self.refresh({
+                pk: (product.label, product.price, product.Categorie) for pk, product in product_map.items()
+            })
+            if changes:
+                raise CartChanged(changes)
+            items = [{'product_id': int(pk), 'quantity': line['quantity']} for pk, line in self.lines.items()]
+            order_articles, total_price = orders.build_lines(items, product_map)
+            order = orders.place_order(customer, client_name, order_articles, total_price)
+        self.clear()
+        return order
+
+    def as_dict(self):
+        return {
+            'lines': [
+                {
+                    'product_id': int(pk),
+                    'label': line['label'],
+                    'quantity': line['quantity'],
+                    'unit_price': line['price'],
+                    'subtotal': str(line['quantity'] * Decimal(line['price'])),
+                }
+                for pk, line in self.lines.items()
+            ],
+            'line_count': len(self.lines),
+            'total': str(self.total),
+        }
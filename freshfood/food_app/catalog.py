@@ -0,0 +1,114 @@
+"""
+Catalogue produits en JSON, servi depuis le cache avec un ETag fort.
+
+Le document complet (corps JSON + ETag) est mis en cache sous une seule
+clé: tant que le catalogue ne change pas, une requête coûte une lecture de
+cache et, si le client présente le bon If-None-Match, une réponse 304 vide.
+Toute écriture sur Product invalide la clé après validation de la
+transaction (signaux, ou appel explicite après une écriture en masse).
+
+L'invalidation ne touche que le cache du processus qui a écrit si ce cache
+lui est propre (LocMem): les entrées vivent alors
+FOOD_APP_CATALOG_CACHE_SECONDS secondes seulement (voir les réglages), et
+un cache partagé (Redis) est nécessaire pour les garder une journée.
+
+Le nombre de produits par catégorie (navigation et pagination par
+catégorie) suit le même cycle de vie, de même que la table des prix lue
+par le panier (une entrée par produit, voir get_prices).
+"""
+import hashlib
+import json
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, Max
+
+from .models import Product
+
+CATALOG_VERSION = 'v1'
+CATALOG_CACHE_KEY = f'food_app:catalog:{CATALOG_VERSION}'
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 24
+CATALOG_FIELDS = ('id', 'label', 'description', 'price', 'Categorie')
+CATEGORY_COUNTS_CACHE_KEY = f'food_app:catalog:{CATALOG_VERSION}:category_counts'
+# Les entrées de prix portent ce jeton: le supprimer les rend toutes caduques
+PRICES_GENERATION_KEY = f'food_app:catalog:{CATALOG_VERSION}:prices:generation'
+
+
+def cache_timeout():
+    return getattr(settings, 'FOOD_APP_CATALOG_CACHE_SECONDS', CATALOG_CACHE_TIMEOUT)
+
+
+def invalidate():
+    """Supprime le catalogue en cache une fois la transaction courante validée."""
+    transaction.on_commit(lambda: cache.delete_many([
+        CATALOG_CACHE_KEY, CATEGORY_COUNTS_CACHE_KEY, PRICES_GENERATION_KEY,
+    ]))
+
+
+def compute_etag(max_updated_at, count):
+    """ETag fort dérivé de max(updated_at) et du nombre de produits."""
+    stamp = max_updated_at.isoformat() if max_updated_at else '-'
+    digest = hashlib.sha1(f'{CATALOG_VERSION}:{stamp}:{count}'.encode()).hexdigest()[:20]
+    return f'"{digest}"'
+
+
+def _build():
+    # Même instantané de la base pour l'ETag et le contenu
+    with transaction.atomic():
+        state = Product.objects.aggregate(max_updated_at=Max('updated_at'), count=Count('id'))
+        products = list(Product.objects.order_by('label', 'id').values(*CATALOG_FIELDS))
+    etag = compute_etag(state['max_updated_at'], state['count'])
+    body = json.dumps(
+        {'version': CATALOG_VERSION, 'etag': etag.strip('"'), 'products': products},
+        cls=DjangoJSONEncoder,
+    ).encode()
+    return {'etag': etag, 'body': body}
+
+
+def get_catalog():
+    """Retourne {'etag', 'body'} depuis le cache (reconstruit en 2 requêtes au besoin)."""
+    return cache.get_or_set(CATALOG_CACHE_KEY, _build, cache_timeout())
+
+
+def _count_by_category():
+    counts = dict(Product.objects.values_list('Categorie').annotate(count=Count('id')).order_by())
+    return [
+        {'code': code, 'label': label, 'count': counts.get(code, 0)}
+        for code, label in sorted(Product.CATEGORIE_CHOICES)
+    ]
+
+
+def get_category_counts():
+    """[{'code', 'label', 'count'}] pour chaque catégorie, triées par code (une requête agrégée au besoin)."""
+    return cache.get_or_set(CATEGORY_COUNTS_CACHE_KEY, _count_by_category, cache_timeout())
+
+
+def get_prices(product_ids):
+    """
+    {id: (label, prix, catégorie)} des produits existants parmi `product_ids`.
+    Lecture par entrée de cache (get_many): le coût suit la taille du panier,
+    pas celle du catalogue; les absents sont chargés en une requête.
+    """
+    generation = cache.get(PRICES_GENERATION_KEY)
+    if generation is None:
+        # add(): deux processus qui créent le jeton en même temps retiennent le même
+        cache.add(PRICES_GENERATION_KEY, uuid.uuid4().hex, None)
+        generation = cache.get(PRICES_GENERATION_KEY)
+    keys = {pk: f'food_app:catalog:{CATALOG_VERSION}:prices:{generation}:{pk}' for pk in product_ids}
+    found = cache.get_many(keys.values())
+    prices = {pk: found[key] for pk, key in keys.items() if key in found}
+
+    missing = [pk for pk in keys if pk not in prices]
+    if missing:
+        loaded = {
+            pk: (label, price, categorie)
+            for pk, label, price, categorie in Product.objects.filter(pk__in=missing).values_list(
+                'id', 'label', 'price', 'Categorie',
+            )
+        }
+        cache.set_many({keys[pk]: entry for pk, entry in loaded.items()}, cache_timeout())
+        prices.update(loaded)
+    return prices
@@ -0,0 +1,202 @@
+"""
+Import en masse du catalogue fournisseur (CSV ou JSON), par upsert sur le SKU.
+
+Le fichier est lu ligne à ligne (csv.DictReader, JSON Lines) et les
+produits valides sont écrits par blocs de taille fixe: un bloc = une
+transaction = un bulk_create(update_conflicts=True) sur la clé naturelle
+`sku`. Un bloc refusé par la base (IntegrityError...) est annulé et ses
+lignes comptées comme rejetées; l'import continue avec le bloc suivant.
+Les blocs validés restent acquis et relancer l'import du même fichier ne
+crée aucun doublon.
+
+bulk_create n'émet pas de signaux: le cache du catalogue et des
+fragments, le résumé du tableau de bord et l'index de recherche sont mis
+à jour une seule fois, à la fin de l'import, même interrompu, dès qu'un
+bloc a été écrit.
+
+Colonnes attendues: sku, label, price, Categorie (code ou libellé,
+« aut » par défaut) et description (optionnelle).
+"""
+import csv
+import io
+import json
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.db import DatabaseError, transaction
+
+from . import catalog, fragments, metrics, search
+from .models import Product
+
+FORMATS = ('csv', 'json')
+DEFAULT_CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 50
+UPDATE_FIELDS = ['label', 'description', 'price', 'Categorie', 'updated_at']
+
+_SKU_MAX_LENGTH = Product._meta.get_field('sku').max_length
+_LABEL_MAX_LENGTH = Product._meta.get_field('label').max_length
+_MAX_PRICE = Decimal(10) ** (
+    Product._meta.get_field('price').max_digits - Product._meta.get_field('price').decimal_places
+)
+_CATEGORIES = {
+    **{label.lower(): code for code, label in Product.CATEGORIE_CHOICES},
+    **{code: code for code, _ in Product.CATEGORIE_CHOICES},
+}
+
+
+class ImportReport:
+    """Compteurs d'un import et premières erreurs (numéro de ligne, message)."""
+
+    def __init__(self):
+        self.inserted = 0
+        self.updated = 0
+        self.rejected = 0
+        self.errors = []
+        self.elapsed = 0.0
+
+    def reject(self, line, message):
+        self.rejected += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    @property
+    def rows(self):
+        return self.inserted + self.updated + self.rejected
+
+    @property
+    def rows_per_sec(self):
+        return round(self.rows / self.elapsed, 1) if self.elapsed else None
+
+    def as_dict(self):
+        return {
+            'inserted': self.inserted,
+            'updated': self.updated,
+            'rejected': self.rejected,
+            'rows_per_sec': self.rows_per_sec,
+            'elapsed_s': round(self.elapsed, 3),
+            'errors': self.errors,
+        }
+
+
+def guess_format(filename):
+    return 'json' if filename.lower().endswith(('.json', '.jsonl', '.ndjson')) else 'csv'
+
+
+def read_rows(fileobj, fmt='csv'):
+    """
+    Itère sur (numéro de ligne, dict) d'un fichier binaire.
+
+    CSV et JSON Lines sont lus en flux. Un tableau JSON (« [ {...}, ... ] »)
+    est aussi accepté, mais il est chargé entièrement en mémoire.
+    """
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for row in reader:
+            yield reader.line_num, row
+        return
+
+    first = text.read(1)
+    while first.isspace():
+        first = text.read(1)
+    if first == '[':
+        for number, row in enumerate(json.loads(first + text.read()), start=1):
+            yield number, row
+        return
+    for number, line in enumerate(text, start=1):
+        if number == 1:
+            line = first + line
+        if line.strip():
+            try:
+                yield number, json.loads(line)
+            except json.JSONDecodeError:
+                yield number, None
+
+
+def validate_row(row):
+    """Retourne un Product non enregistré, ou lève ValueError avec le motif du rejet."""
+    if not isinstance(row, dict):
+        raise ValueError("Ligne illisible.")
+    sku = str(row.get('sku') or '').strip()
+    label = str(row.get('label') or '').strip()
+    if not sku or len(sku) > _SKU_MAX_LENGTH:
+        raise ValueError("SKU manquant ou trop long.")
+    if not label or len(label) > _LABEL_MAX_LENGTH:
+        raise ValueError("Libellé manquant ou trop long.")
+    try:
+        price = Decimal(str(row.get('price')).strip().replace(',', '.')).quantize(Decimal('0.01'))
+    except (InvalidOperation, ValueError):
+        raise ValueError(f"Prix invalide: {row.get('price')!r}.")
+    if not price.is_finite() or not 0 <= price < _MAX_PRICE:
+        raise ValueError(f"Prix hors limites: {price}.")
+    categorie = _CATEGORIES.get(str(row.get('Categorie') or 'aut').strip().lower())
+    if categorie is None:
+        raise ValueError(f"Catégorie inconnue: {row.get('Categorie')!r}.")
+    return Product(
+        sku=sku, label=label, price=price, Categorie=categorie,
+        description=str(row.get('description') or ''),
+    )
+
+
+@transaction.atomic
+def _upsert(products):
+    """Écrit un bloc; retourne le nombre de produits qui existaient déjà."""
+    existing = Product.objects.filter(sku__in=[p.sku for p in products]).count()
+    Product.objects.bulk_create(
+        products, update_conflicts=True, unique_fields=['sku'], update_fields=UPDATE_FIELDS,
+    )
+    return existing
+
+
+def import_products(rows, chunk_size=DEFAULT_CHUNK_SIZE, progress=None):
+    """
+    Valide et upserte les lignes de `rows` (itérable de (numéro, dict)).
+
+    Un SKU déjà vu plus haut dans le fichier est rejeté: le fichier fait foi
+    dans l'ordre, sans écraser silencieusement une ligne par une autre.
+    Un bloc refusé par la base rejette ses lignes, pas l'import.
+    `progress(report)` est appelé après chaque bloc.
+    """
+    report = ImportReport()
+    seen, chunk = set(), []
+    started = time.perf_counter()
+
+    def flush():
+        try:
+            existing = _upsert([product for _, product in chunk])
+        except DatabaseError as e:
+            for number, _ in chunk:
+                report.reject(number, f"Bloc refusé par la base: {e}")
+        else:
+            report.updated += existing
+            report.inserted += len(chunk) - existing
+        chunk.clear()
+        report.elapsed = time.perf_counter() - started
+        if progress:
+            progress(report)
+
+    try:
+        for number, row in rows:
+            try:
+                product = validate_row(row)
+            except ValueError as e:
+                report.reject(number, str(e))
+                continue
+            if product.sku in seen:
+                report.reject(number, f"SKU en double dans le fichier: {product.sku}.")
+                continue
+            seen.add(product.sku)
+            chunk.append((number, product))
+            if len(chunk) >= chunk_size:
+                flush()
+        if chunk:
+            flush()
+    finally:
+        if report.inserted or report.updated:
+            # Une seule invalidation pour tout l'import (bulk_create n'émet pas de signaux)
+            catalog.invalidate()
+            fragments.invalidate(Product)
+            metrics.invalidate_summary()
+            search.get_backend().rebuild()
+    report.elapsed = time.perf_counter() - started
+    return report
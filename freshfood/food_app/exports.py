@@ -0,0 +1,174 @@
+"""
+Export en flux des commandes et de leurs lignes (CSV ou NDJSON).
+
+Une ligne exportée par OrderArticle, avec les colonnes de la commande
+répétées (une commande sans ligne sort une fois, colonnes de ligne vides).
+Les lignes sont lues par values_list().iterator(chunk_size): aucun objet
+modèle n'est construit et seul un lot de lignes est en mémoire à la fois,
+que l'export contienne mille ou dix millions de lignes. La sortie est
+regroupée en blocs d'environ 64 Kio, éventuellement compressés en gzip à
+la volée.
+
+Les commandes archivées (voir archive.py) sortent en premier, dans le même
+format. Utilisé par OrderExportView (StreamingHttpResponse) et par la
+commande export_orders.
+"""
+import csv
+import datetime
+import itertools
+import json
+import zlib
+from decimal import Decimal
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import F
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import ArchivedOrder, ArchivedOrderArticle, Order, OrderArticle, Product
+
+FORMATS = ('csv', 'ndjson')
+CONTENT_TYPES = {'csv': 'text/csv; charset=utf-8', 'ndjson': 'application/x-ndjson'}
+DEFAULT_CHUNK_SIZE = 2000
+BUFFER_SIZE = 64 * 1024
+CENT = Decimal('0.01')
+
+COLUMNS = (
+    'order_id', 'created_at', 'customer', 'client_name', 'order_total', 'order_line_count',
+    'line_id', 'product_id', 'product_label', 'category', 'quantity', 'unit_price', 'subtotal',
+)
+
+
+def _fields(lines):
+    return (
+        'id', 'created_at', 'customer__username', 'client_name', 'total_price', 'line_count',
+        f'{lines}__id', f'{lines}__product_id', f'{lines}__product__label',
+        f'{lines}__product__Categorie', f'{lines}__quantity', 'line_unit_price', 'line_subtotal',
+    )
+
+
+def _day_start(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def export_queryset(start=None, end=None, categories=None, using=None, archived=False):
+    """
+    Tuples (dans l'ordre de COLUMNS) des commandes passées entre `start` et
+    `end` (dates incluses), limitées aux lignes des catégories données.
+    Les bornes sont converties en instants pour garder l'index sur created_at.
+    `using` choisit la base lue (une réplique, voir replicas.py);
+    `archived` lit les commandes archivées (voir archive.py).
+    """
+    model, line_model, lines = (
+        (ArchivedOrder, ArchivedOrderArticle, 'archivedorderarticle') if archived
+        else (Order, OrderArticle, 'orderarticle')
+    )
+    queryset = model.objects.using(using)
+    if start:
+        queryset = queryset.filter(created_at__gte=_day_start(start))
+    if end:
+        queryset = queryset.filter(created_at__lt=_day_start(end + datetime.timedelta(days=1)))
+    if categories:
+        queryset = queryset.filter(**{f'{lines}__product__Categorie__in': categories})
+    unit_price = F(f'{lines}__unit_price')
+    if not archived:
+        unit_price = Coalesce(unit_price, F(f'{lines}__product__price'))
+    return (
+        queryset.annotate(line_unit_price=unit_price, line_subtotal=line_model.subtotal_expression(f'{lines}__'))
+        .order_by('created_at', 'id', f'{lines}__id')
+        .values_list(*_fields(lines))
+    )
+
+
+def parse_filters(start=None, end=None, categories=None):
+    """
+    Valide les filtres reçus sous forme de texte (requête HTTP, ligne de
+    commande). Retourne (start, end, categories); lève ValueError sinon.
+    """
+    try:
+        start = datetime.date.fromisoformat(start) if start else None
+        end = datetime.date.fromisoformat(end) if end else None
+    except ValueError:
+        raise ValueError("Date invalide (format attendu: AAAA-MM-JJ).")
+    if start and end and start > end:
+        raise ValueError("La date de début est postérieure à la date de fin.")
+    categories = [c for c in categories or [] if c]
+    unknown = set(categories) - {code for code, _ in Product.CATEGORIE_CHOICES}
+    if unknown:
+        raise ValueError(f"Catégorie inconnue: {', '.join(sorted(unknown))}.")
+    return start, end, categories
+
+
+def _rows(queryset, chunk_size):
+    """
+    Parcourt le queryset par lots. SQLite ne fixe pas l'échelle des
+    décimaux calculés (2.5 au lieu de 2.50): on la rétablit ici.
+    """
+    for row in queryset.iterator(chunk_size=chunk_size):
+        *head, unit_price, subtotal = row
+        yield (
+            *head,
+            unit_price.quantize(CENT) if unit_price is not None else None,
+            subtotal.quantize(CENT) if subtotal is not None else None,
+        )
+
+
+class _Echo:
+    """Pseudo-fichier pour csv.writer: write() renvoie la ligne au lieu de la stocker."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(COLUMNS)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def _ndjson_lines(rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(dict(zip(COLUMNS, row))) + '\n'
+
+
+def _buffered(lines, size=BUFFER_SIZE):
+    """Regroupe les petites lignes en blocs d'octets d'environ `size`."""
+    buffer, length = [], 0
+    for line in lines:
+        data = line.encode()
+        buffer.append(data)
+        length += len(data)
+        if length >= size:
+            yield b''.join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def _gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: conteneur gzip
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream(fmt='csv', start=None, end=None, categories=None, compress=False, chunk_size=DEFAULT_CHUNK_SIZE,
+           using=None):
+    """Générateur de blocs d'octets de l'export, prêt pour StreamingHttpResponse."""
+    # Les commandes archivées sont toutes plus anciennes que les autres: l'ordre chronologique est gardé
+    rows = itertools.chain(
+        _rows(export_queryset(start, end, categories, using=using, archived=True), chunk_size),
+        _rows(export_queryset(start, end, categories, using=using), chunk_size),
+    )
+    lines = _csv_lines(rows) if fmt == 'csv' else _ndjson_lines(rows)
+    chunks = _buffered(lines)
+    return _gzipped(chunks) if compress else chunks
+
+
+def filename(fmt, start=None, end=None, compress=False):
+    span = '_'.join(str(day) for day in (start, end) if day) or 'all'
+    return f"orders_{span}.{fmt}{'.gz' if compress else ''}"
@@ -0,0 +1,177 @@
+"""
+Prévision de la demande par produit, pour le réapprovisionnement quotidien
+des produits frais.
+
+Les quantités vendues par produit et par jour sont lues en une requête
+agrégée et rangées dans une matrice produits × jours. Le calcul porte sur
+la matrice entière, sans boucle par produit:
+
+- saisonnalité hebdomadaire: pour chaque produit, moyenne de chaque jour
+  de la semaine rapportée à la moyenne globale (produit de la matrice par
+  l'indicatrice jours × jours de la semaine);
+- niveau: moyenne pondérée de l'historique désaisonnalisé, soit un produit
+  matrice-vecteur. Poids égaux sur les `window` derniers jours (moyenne
+  mobile) ou décroissants en (1 - alpha)^âge (lissage exponentiel);
+- prévision du jour J: niveau × coefficient du jour de la semaine de J.
+
+Les prévisions sont enregistrées dans DemandForecast et affichées au
+tableau de bord. NumPy est une dépendance optionnelle: sans lui, seule la
+lecture des prévisions enregistrées (upcoming) fonctionne.
+"""
+import datetime
+from decimal import Decimal
+
+from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import fragments
+from .models import DemandForecast, OrderArticle
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Produits réapprovisionnés chaque jour: viande fraîche, légumes, fruits
+FRESH_CATEGORIES = ('vf', 'leg', 'fru')
+METHODS = [code for code, _ in DemandForecast.METHOD_CHOICES]
+DEFAULT_METHOD = 'exponential-smoothing'
+DEFAULT_HISTORY_DAYS = 84
+DEFAULT_WINDOW = 28
+DEFAULT_ALPHA = 0.3
+
+
+def require_numpy():
+    if np is None:
+        raise ImproperlyConfigured("La prévision de la demande nécessite NumPy (pip install numpy).")
+
+
+def _midnight(day):
+    return timezone.make_aware(datetime.datetime.combine(day, datetime.time.min))
+
+
+def load_history(end, days=DEFAULT_HISTORY_DAYS, categories=FRESH_CATEGORIES):
+    """
+    Quantités vendues par produit et par jour sur les `days` jours qui
+    précèdent `end` (exclu), en une requête agrégée par la base. Retourne
+    (identifiants des produits triés, matrice produits × jours).
+    """
+    require_numpy()
+    start = end - datetime.timedelta(days=days)
+    rows = list(
+        OrderArticle.objects
+        .filter(order__created_at__gte=_midnight(start), order__created_at__lt=_midnight(end),
+                product__Categorie__in=categories)
+        .annotate(day=TruncDate('order__created_at'))
+        .values('product_id', 'day')
+        .annotate(quantity=Sum('quantity'))
+        .values_list('product_id', 'day', 'quantity')
+        .order_by()
+    )
+    start_ordinal = start.toordinal()
+    product_column = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    day_column = np.fromiter((row[1].toordinal() - start_ordinal for row in rows), dtype=np.int64, count=len(rows))
+    quantities = np.fromiter((row[2] for row in rows), dtype=np.float64, count=len(rows))
+    product_ids, product_rows = np.unique(product_column, return_inverse=True)
+    history = np.zeros((len(product_ids), days))
+    history[product_rows, day_column] = quantities
+    return product_ids, history
+
+
+def seasonal_factors(history, weekdays):
+    """
+    Coefficients par jour de la semaine (produits × 7): moyenne du jour
+    rapportée à la moyenne globale. 1 pour un produit sans vente.
+    """
+    indicator = np.eye(7)[weekdays]
+    per_weekday = (history @ indicator) / np.maximum(indicator.sum(axis=0), 1)
+    overall = history.mean(axis=1, keepdims=True)
+    return np.divide(per_weekday, overall, out=np.ones_like(per_weekday), where=overall > 0)
+
+
+def level_weights(days, method, window=DEFAULT_WINDOW, alpha=DEFAULT_ALPHA):
+    """Poids de chaque jour d'historique (le plus récent en dernier) dans le niveau."""
+    if method == 'moving-average':
+        weights = np.zeros(days)
+        weights[-min(window, days):] = 1.0
+        return weights
+    if method == 'exponential-smoothing':
+        return alpha * (1 - alpha) ** np.arange(days - 1, -1, -1)
+    raise ValueError(f"Méthode inconnue: {method}.")
+
+
+def forecast_matrix(history, start, first_day, horizon=1, method=DEFAULT_METHOD,
+                    window=DEFAULT_WINDOW, alpha=DEFAULT_ALPHA):
+    """
+    Prévisions (produits × horizon) des jours first_day, first_day + 1...
+    à partir de l'historique commençant le jour `start`.
+    """
+    days = history.shape[1]
+    weekdays = (start.weekday() + np.arange(days)) % 7
+    factors = seasonal_factors(history, weekdays)
+
+    # Historique désaisonnalisé; un jour de coefficient nul (jamais de vente
+    # ce jour de la semaine) ne renseigne pas sur le niveau et est ignoré
+    daily_factors = factors[:, weekdays]
+    known = daily_factors > 0
+    deseasonalized = np.divide(history, daily_factors, out=np.zeros_like(history), where=known)
+    weights = level_weights(days, method, window, alpha)
+    total_weight = known @ weights
+    level = np.divide(deseasonalized @ weights, total_weight, out=np.zeros(len(history)), where=total_weight > 0)
+
+    target_weekdays = (first_day.weekday() + np.arange(horizon)) % 7
+    return level[:, None] * factors[:, target_weekdays]
+
+
+def compute(today=None, horizon=1, method=DEFAULT_METHOD, history_days=DEFAULT_HISTORY_DAYS,
+            window=DEFAULT_WINDOW, alpha=DEFAULT_ALPHA, categories=FRESH_CATEGORIES):
+    """
+    Prévoit les `horizon` jours qui suivent `today` (aujourd'hui par défaut)
+    à partir des jours complets qui le précèdent. Retourne (identifiants
+    des produits, jours prévus, matrice produits × horizon).
+    """
+    today = today or timezone.localdate()
+    product_ids, history = load_history(today, history_days, categories)
+    start = today - datetime.timedelta(days=history_days)
+    first_day = today + datetime.timedelta(days=1)
+    predictions = forecast_matrix(history, start, first_day, horizon, method, window, alpha)
+    days = [first_day + datetime.timedelta(days=offset) for offset in range(horizon)]
+    return product_ids, days, predictions
+
+
+@transaction.atomic
+def store(product_ids, days, predictions, method):
+    """
+    Remplace les prévisions enregistrées pour ces jours et ces produits
+    (celles des autres catégories restent); les quantités nulles ne sont
+    pas écrites. Retourne le nombre de lignes écrites.
+    """
+    DemandForecast.objects.filter(day__in=days, product_id__in=product_ids.tolist()).delete()
+    rounded = np.round(predictions, 2)
+    rows, columns = np.nonzero(rounded > 0)
+    forecasts = [
+        DemandForecast(product_id=product_id, day=days[column], quantity=Decimal(str(quantity)), method=method)
+        for product_id, column, quantity in zip(
+            product_ids[rows].tolist(), columns.tolist(), rounded[rows, columns].tolist(),
+        )
+    ]
+    DemandForecast.objects.bulk_create(forecasts, batch_size=2000)
+    # bulk_create n'émet pas de signaux: le bloc du tableau de bord change de clé
+    fragments.invalidate(DemandForecast)
+    return len(forecasts)
+
+
+def tomorrow():
+    return timezone.localdate() + datetime.timedelta(days=1)
+
+
+def upcoming(day=None, limit=10):
+    """Prévisions enregistrées pour `day` (demain par défaut), les plus fortes d'abord."""
+    day = day or tomorrow()
+    return (
+        DemandForecast.objects.filter(day=day, quantity__gt=0)
+        .select_related('product').order_by('-quantity', 'product_id')[:limit]
+    )
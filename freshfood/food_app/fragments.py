@@ -0,0 +1,94 @@
+"""
+Cache de fragments de gabarits, en « poupées russes ».
+
+Un fragment est mis en cache sous une clé dérivée de son nom et des objets
+qu'il affiche: pour un objet de modèle, sa clé primaire et son updated_at.
+Modifier un produit change donc la clé de sa carte, sans suppression
+explicite; les cartes des autres produits restent en cache.
+
+Un fragment englobant (une page de la liste, un bloc du tableau de bord)
+déclare en plus les modèles dont il dépend. Chaque modèle a un jeton de
+génération, supprimé après chaque écriture (signaux post_save /
+post_delete, ou appel explicite après une écriture en masse): les clés
+englobantes changent, et au nouveau rendu les fragments internes encore
+valides sont relus depuis le cache.
+
+Les fragments vont dans le cache « fragments » s'il est configuré (voir
+CACHES dans les réglages), sinon dans le cache par défaut. Les jetons y
+sont rangés aussi: avec plusieurs processus, ce cache doit être partagé,
+sans quoi une écriture n'invalide que les fragments du processus qui l'a
+faite. Les succès et
+échecs sont comptés par l'instrumentation quand elle est active.
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+from . import instrumentation, replicas
+
+FRAGMENT_VERSION = 'v1'
+FRAGMENT_CACHE_TIMEOUT = 60 * 60
+FRAGMENT_CACHE_ALIAS = 'fragments'
+
+
+def get_cache():
+    return caches[FRAGMENT_CACHE_ALIAS if FRAGMENT_CACHE_ALIAS in settings.CACHES else 'default']
+
+
+def _generation_key(model_name):
+    return f'food_app:fragments:{FRAGMENT_VERSION}:generation:{model_name}'
+
+
+def invalidate(*models):
+    """Change la génération des modèles donnés une fois la transaction courante validée."""
+    keys = [_generation_key(model._meta.model_name) for model in models]
+    transaction.on_commit(lambda: get_cache().delete_many(keys))
+
+
+def generations(model_names):
+    """Jetons de génération des modèles (noms en minuscules), créés au besoin."""
+    cache = get_cache()
+    keys = {name: _generation_key(name) for name in model_names}
+    found = cache.get_many(keys.values())
+    tokens = {}
+    for name, key in keys.items():
+        if key not in found:
+            # add(): deux processus qui créent le jeton en même temps retiennent le même
+            cache.add(key, uuid.uuid4().hex, None)
+            found[key] = cache.get(key)
+        tokens[name] = found[key]
+    return tokens
+
+
+def _stamp(part):
+    meta = getattr(part, '_meta', None)
+    if meta is not None:
+        updated_at = getattr(part, 'updated_at', None)
+        return f'{meta.label_lower}:{part.pk}:{updated_at.isoformat() if updated_at else "-"}'
+    return str(part)
+
+
+def fragment_key(name, vary_on=(), depends=()):
+    parts = [_stamp(part) for part in vary_on]
+    parts += [f'{model}={token}' for model, token in sorted(generations(depends).items())]
+    digest = hashlib.sha1('|'.join(parts).encode()).hexdigest()
+    return f'food_app:fragments:{FRAGMENT_VERSION}:{name}:{digest}'
+
+
+def get_or_render(name, render, vary_on=(), depends=()):
+    """Retourne le fragment en cache, ou l'obtient de render() et le met en cache."""
+    cache = get_cache()
+    key = fragment_key(name, vary_on, depends)
+    content = cache.get(key)
+    hit = content is not None
+    if not hit:
+        # Rendu partagé par tous les lecteurs: jamais depuis une réplique en retard
+        with replicas.primary_reads():
+            content = render()
+        cache.set(key, content, FRAGMENT_CACHE_TIMEOUT)
+    if instrumentation.is_enabled():
+        instrumentation.record_fragment(name, hit)
+    return content
@@ -0,0 +1,220 @@
+"""
+Instrumentation des vues: temps de réponse, nombre et durée des requêtes
+SQL, requêtes répétées (N+1), agrégés par nom d'URL dans le processus.
+
+Activée par le réglage FOOD_APP_INSTRUMENTATION (par défaut égal à DEBUG).
+Désactivée, InstrumentationMiddleware lève MiddlewareNotUsed au démarrage:
+Django la retire de la chaîne et elle ne coûte rien par requête.
+
+Chaque réponse instrumentée porte un en-tête Server-Timing (visible dans
+l'onglet réseau du navigateur); le cumul par vue est consultable par le
+personnel sur /instrumentation/ (HTML ou JSON). Les statistiques sont
+propres à chaque processus et remises à zéro au redémarrage.
+
+Le rapport donne aussi le taux de succès du cache de fragments de
+gabarits (voir fragments.py), par nom de fragment.
+
+Vues async: l'ORM y passe par sync_to_async, dans un fil d'exécution
+propre à la requête dont les connexions ne sont pas celles de la boucle
+d'événements. Le compteur de requêtes y est installé, dans ce même fil.
+"""
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+SAMPLE_SIZE = 500
+TOP_DUPLICATES = 5
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+
+
+def fingerprint(sql):
+    """Forme normalisée d'une requête: valeurs et listes IN (...) remplacées."""
+    return _LITERALS.sub('?', _IN_LIST.sub('IN (...)', sql))
+
+
+class QueryRecorder:
+    """Enregistre (empreinte, durée) de chaque requête SQL exécutée pendant capture()."""
+
+    def __init__(self):
+        self.queries = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((fingerprint(sql), time.perf_counter() - started))
+
+    def capture(self):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+    @property
+    def sql_time(self):
+        return sum(duration for _, duration in self.queries)
+
+    def duplicates(self):
+        """Empreintes exécutées plus d'une fois, avec leur nombre d'exécutions."""
+        return {fp: n for fp, n in Counter(fp for fp, _ in self.queries).items() if n > 1}
+
+
+class ViewStats:
+    """Cumul pour un nom d'URL, avec un échantillon borné des temps de réponse."""
+
+    def __init__(self):
+        self.requests = 0
+        self.wall_time = 0.0
+        self.queries = 0
+        self.sql_time = 0.0
+        self.max_queries = 0
+        self.samples = deque(maxlen=SAMPLE_SIZE)
+        self.duplicates = Counter()
+
+    def add(self, wall_time, recorder):
+        count = len(recorder.queries)
+        self.requests += 1
+        self.wall_time += wall_time
+        self.queries += count
+        self.sql_time += recorder.sql_time
+        self.max_queries = max(self.max_queries, count)
+        self.samples.append(wall_time)
+        # Exécutions en trop (au-delà de la première) par empreinte
+        self.duplicates.update({fp: n - 1 for fp, n in recorder.duplicates().items()})
+
+    def as_dict(self, name):
+        samples = sorted(self.samples)
+
+        def percentile(p):
+            return round(samples[min(len(samples) - 1, int(len(samples) * p))] * 1000, 2)
+
+        return {
+            'view': name,
+            'requests': self.requests,
+            'avg_ms': round(self.wall_time / self.requests * 1000, 2),
+            'p50_ms': percentile(0.5),
+            'p95_ms': percentile(0.95),
+            'avg_queries': round(self.queries / self.requests, 1),
+            'max_queries': self.max_queries,
+            'avg_sql_ms': round(self.sql_time / self.requests * 1000, 2),
+            'duplicate_queries': [
+                {'sql': fp, 'extra_executions': n} for fp, n in self.duplicates.most_common(TOP_DUPLICATES)
+            ],
+        }
+
+
+class FragmentStats:
+    """Succès et échecs du cache pour un nom de fragment."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+
+    def as_dict(self, name):
+        return {
+            'fragment': name,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / (self.hits + self.misses), 3),
+        }
+
+
+_lock = threading.Lock()
+_stats = {}
+_fragments = {}
+
+
+def record(name, wall_time, recorder):
+    with _lock:
+        _stats.setdefault(name, ViewStats()).add(wall_time, recorder)
+
+
+def record_fragment(name, hit):
+    with _lock:
+        stats = _fragments.setdefault(name, FragmentStats())
+        if hit:
+            stats.hits += 1
+        else:
+            stats.misses += 1
+
+
+def report():
+    """Statistiques par vue, les plus coûteuses (temps total) en premier."""
+    with _lock:
+        ordered = sorted(_stats.items(), key=lambda item: item[1].wall_time, reverse=True)
+        return [stats.as_dict(name) for name, stats in ordered]
+
+
+def fragment_report():
+    """Taux de succès du cache par fragment, les plus sollicités en premier."""
+    with _lock:
+        ordered = sorted(_fragments.items(), key=lambda item: item[1].hits + item[1].misses, reverse=True)
+        return [stats.as_dict(name) for name, stats in ordered]
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+        _fragments.clear()
+
+
+def is_enabled():
+    return getattr(settings, 'FOOD_APP_INSTRUMENTATION', settings.DEBUG)
+
+
+class InstrumentationMiddleware:
+    """
+    Mesure chaque requête et l'agrège sous le nom de l'URL résolue.
+    Pour une réponse en flux, seul le temps jusqu'au premier octet est compté.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not is_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with recorder.capture():
+            response = self.get_response(request)
+        return self.finish(request, response, recorder, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        # Connexions propres à chaque fil: le compteur est posé sur celles du fil
+        # (thread_sensitive) où la requête exécute son code synchrone et l'ORM
+        capture = await sync_to_async(recorder.capture)()
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(capture.close)()
+        return self.finish(request, response, recorder, time.perf_counter() - started)
+
+    def finish(self, request, response, recorder, wall_time):
+        match = request.resolver_match
+        record(match.view_name if match else '<non résolue>', wall_time, recorder)
+        response['Server-Timing'] = (
+            f'app;dur={wall_time * 1000:.1f}, '
+            f'db;dur={recorder.sql_time * 1000:.1f};desc="{len(recorder.queries)} SQL"'
+        )
+        return response
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from food_app import archive, forecasting
+from food_app.models import ArchivedOrder, Order
+
+
+class Command(BaseCommand):
+    """
+    Déplace les commandes anciennes et leurs lignes vers les tables
+    d'archives (voir archive.py), par lots d'une transaction chacun. Peut
+    être interrompue et relancée à tout moment, par exemple chaque nuit
+    depuis cron.
+    """
+
+    help = "Archive les commandes de plus de FOOD_APP_ARCHIVE_AFTER_DAYS jours (tables chaudes réduites)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--older-than', type=int, default=None,
+                            help="Âge minimal en jours (défaut: FOOD_APP_ARCHIVE_AFTER_DAYS).")
+        parser.add_argument('--batch-size', type=int, default=archive.DEFAULT_BATCH_SIZE,
+                            help="Commandes déplacées par transaction.")
+        parser.add_argument('--max-batches', type=int, default=None,
+                            help="S'arrête après ce nombre de lots (la suite à la prochaine exécution).")
+        parser.add_argument('--dry-run', action='store_true',
+                            help="Compte les commandes à archiver sans rien déplacer.")
+
+    def handle(self, *args, **options):
+        days = archive.archive_after_days() if options['older_than'] is None else options['older_than']
+        if days < 1 or options['batch_size'] < 1:
+            raise CommandError("Il faut --older-than >= 1 et --batch-size >= 1.")
+        if days < forecasting.DEFAULT_HISTORY_DAYS:
+            self.stderr.write(
+                f"Attention: les prévisions de demande lisent {forecasting.DEFAULT_HISTORY_DAYS} jours "
+                f"de commandes; les commandes archivées n'y comptent plus."
+            )
+
+        if options['dry_run']:
+            count = archive.eligible(archive.cutoff(days)).count()
+            self.stdout.write(f"{count} commande(s) de plus de {days} jours à archiver.")
+            return
+
+        started = time.perf_counter()
+
+        def progress(orders, lines):
+            rate = orders / (time.perf_counter() - started)
+            self.stdout.write(f"  {orders} commande(s), {lines} ligne(s) archivée(s) ({rate:.0f} commandes/s)")
+
+        orders, lines = archive.archive(
+            days, batch_size=options['batch_size'], max_batches=options['max_batches'], progress=progress,
+        )
+        self.stdout.write(
+            f"{orders} commande(s) et {lines} ligne(s) archivée(s) en {time.perf_counter() - started:.1f}s. "
+            f"Commandes courantes: {Order.objects.count()}, archivées: {ArchivedOrder.objects.count()}."
+        )
@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from food_app.models import OrderArticle
+
+
+class Command(BaseCommand):
+    """
+    Renseigne OrderArticle.unit_price pour les lignes antérieures à la colonne.
+
+    Les lignes sont traitées par blocs de taille fixe, parcourus par clé
+    primaire croissante: seul un bloc est en mémoire à la fois, et chaque
+    bloc est écrit avec un unique bulk_update dans sa propre transaction,
+    ce qui rend la commande interruptible et relançable.
+    """
+
+    help = "Fige le prix unitaire des lignes de commande existantes (par blocs, via bulk_update)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--chunk-size', type=int, default=5000,
+            help="Nombre de lignes par bloc (défaut: 5000).",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        pending = OrderArticle.objects.filter(unit_price__isnull=True)
+
+        last_pk = 0
+        updated = 0
+        started = time.perf_counter()
+
+        while True:
+            # Seules les colonnes utiles sont chargées (pk + prix du produit)
+            chunk = list(
+                pending.filter(pk__gt=last_pk)
+                .select_related('product')
+                .only('pk', 'product__price')
+                .order_by('pk')[:chunk_size]
+            )
+            if not chunk:
+                break
+            last_pk = chunk[-1].pk
+
+            for article in chunk:
+                article.unit_price = article.product.price
+            with transaction.atomic():
+                OrderArticle.objects.bulk_update(chunk, ['unit_price'], batch_size=chunk_size)
+
+            updated += len(chunk)
+            elapsed = time.perf_counter() - started
+            self.stdout.write(f"{updated} ligne(s) mises à jour ({updated / elapsed:,.0f} lignes/s)")
+
+        elapsed = time.perf_counter() - started
+        rate = updated / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Terminé: {updated} ligne(s) en {elapsed:.2f}s ({rate:,.0f} lignes/s)."
+        ))
@@ -0,0 +1,152 @@
+import json
+import random
+import subprocess
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from food_app import benchmarking
+from food_app.models import Order, OrderArticle, Product
+
+# nom du scénario -> (profil de l'utilisateur, statut HTTP attendu)
+SCENARIOS = {
+    'product-list': ('anonymous', 200),
+    'product-search': ('anonymous', 200),
+    'order-view-get': ('customer', 200),
+    'order-view-post': ('customer', 201),
+    'order-list': ('staff', 200),
+    'dashboard': ('staff', 200),
+    'orders-user': ('customer', 200),
+}
+
+
+class Command(BaseCommand):
+    """
+    Banc d'essai des routes principales, en processus: chaque scénario est
+    joué par --concurrency threads, chacun avec son client de test et son
+    utilisateur, sur le jeu de données de generate_data.
+
+    Le rapport JSON (débit, p50/p95/p99, codes HTTP, commit git, taille du
+    jeu de données) peut être écrit dans un fichier avec --output pour
+    comparer deux commits. order-view-post crée de vraies commandes,
+    rattachées aux utilisateurs synthétiques.
+    """
+
+    help = "Mesure débit et latences (p50/p95/p99) des routes principales sur le jeu synthétique."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scenarios', nargs='+', choices=list(SCENARIOS), default=list(SCENARIOS),
+            help="Scénarios à jouer (défaut: tous).",
+        )
+        parser.add_argument('--requests', type=int, default=200, help="Requêtes mesurées par scénario.")
+        parser.add_argument('--concurrency', type=int, default=4, help="Threads simultanés.")
+        parser.add_argument('--warmup', type=int, default=10, help="Requêtes non mesurées par scénario.")
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('-o', '--output', help="Écrit aussi le rapport JSON dans ce fichier.")
+
+    def handle(self, *args, **options):
+        try:
+            self.data = benchmarking.dataset()
+        except LookupError as e:
+            raise CommandError(e)
+        self.pages = max(1, Product.objects.count() // 10)
+
+        with benchmarking.test_client_hosts():
+            results = [
+                self.run_scenario(name, options['requests'], options['concurrency'],
+                                  options['warmup'], options['seed'])
+                for name in options['scenarios']
+            ]
+
+        report = json.dumps({
+            'commit': self.git_commit(),
+            'date': timezone.now().isoformat(),
+            'database': connection.vendor,
+            'dataset': {
+                'products': Product.objects.count(),
+                'orders': Order.objects.count(),
+                'order_lines': OrderArticle.objects.count(),
+            },
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'results': results,
+        }, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(report)
+        self.stdout.write(report)
+
+    def git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def run_scenario(self, name, requests, concurrency, warmup, seed):
+        role, expected = SCENARIOS[name]
+
+        def worker(index):
+            rng = random.Random(seed * 1000 + index)
+            client, user = Client(), None
+            if role == 'staff':
+                user = self.data['staff']
+            elif role == 'customer':
+                user = User.objects.get(pk=rng.choice(self.data['customer_ids']))
+            if user is not None:
+                client.force_login(user)
+
+            count = requests // concurrency + (index < requests % concurrency)
+            latencies, statuses = [], Counter()
+            try:
+                for _ in range(warmup // concurrency):
+                    self.send(name, client, user, rng)
+                for _ in range(count):
+                    started = time.perf_counter()
+                    response = self.send(name, client, user, rng)
+                    statuses[response.status_code] += 1
+                    if response.status_code == expected:
+                        latencies.append(time.perf_counter() - started)
+            finally:
+                # Le client de test ne ferme pas les connexions: une par thread
+                connections.close_all()
+            return latencies, statuses
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(worker, range(concurrency)))
+        elapsed = time.perf_counter() - started
+        latencies = [lat for lats, _ in outcomes for lat in lats]
+        statuses = sum((s for _, s in outcomes), Counter())
+        return benchmarking.summarize(name, latencies, statuses, elapsed, success=expected)
+
+    def send(self, name, client, user, rng):
+        if name == 'product-list':
+            return client.get(reverse('product-list'), {'page': rng.randint(1, min(self.pages, 50))})
+        if name == 'product-search':
+            return client.get(reverse('product-search'), {'q': rng.choice(benchmarking.WORDS)[:rng.randint(3, 6)]})
+        if name == 'order-view-get':
+            return client.get(reverse('order-view'))
+        if name == 'order-view-post':
+            cart = [
+                {'product_id': pid, 'quantity': rng.randint(1, 5)}
+                for pid in rng.sample(self.data['product_ids'], min(rng.randint(1, 5), len(self.data['product_ids'])))
+            ]
+            return client.post(
+                reverse('order-view'), data=json.dumps({'client_name': 'bench', 'cart_items': cart}),
+                content_type='application/json',
+            )
+        if name == 'order-list':
+            return client.get(reverse('order-list'))
+        if name == 'dashboard':
+            return client.get(reverse('dashboard'))
+        return client.get(reverse('orders-user', args=[user.pk]))
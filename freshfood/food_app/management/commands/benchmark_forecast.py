@@ -0,0 +1,95 @@
+import datetime
+import statistics
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from food_app import forecasting
+
+
+def forecast_one(series, start, first_day, horizon, method, window, alpha):
+    """Même calcul que forecasting.forecast_matrix pour un seul produit, en Python pur (référence)."""
+    days = len(series)
+    weekdays = [(start.weekday() + offset) % 7 for offset in range(days)]
+    sums, counts = [0.0] * 7, [0] * 7
+    for quantity, weekday in zip(series, weekdays):
+        sums[weekday] += quantity
+        counts[weekday] += 1
+    overall = sum(series) / days
+    factors = [(sums[w] / max(counts[w], 1)) / overall if overall > 0 else 1.0 for w in range(7)]
+
+    weighted = total_weight = 0.0
+    for age, (quantity, weekday) in enumerate(zip(reversed(series), reversed(weekdays))):
+        if method == 'moving-average':
+            weight = 1.0 if age < window else 0.0
+        else:
+            weight = alpha * (1 - alpha) ** age
+        if factors[weekday] > 0:
+            weighted += weight * quantity / factors[weekday]
+            total_weight += weight
+    level = weighted / total_weight if total_weight > 0 else 0.0
+    return [level * factors[(first_day.weekday() + offset) % 7] for offset in range(horizon)]
+
+
+class Command(BaseCommand):
+    """
+    Mesure le calcul des prévisions (forecasting.forecast_matrix) sur un
+    historique synthétique, par défaut 10 000 produits × 2 ans: ventes de
+    Poisson avec un profil hebdomadaire propre à chaque produit.
+
+    Le calcul vectorisé est comparé à la même méthode écrite produit par
+    produit en Python (référence mesurée sur --loop-sample produits et
+    extrapolée), dont il doit retrouver les résultats. La base n'est pas
+    lue: pour la requête d'historique, voir la durée affichée par
+    forecast_demand après generate_data.
+    """
+
+    help = "Banc d'essai des prévisions de demande (NumPy vectorisé vs boucle par produit)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=10_000)
+        parser.add_argument('--days', type=int, default=730, help="Jours d'historique (défaut: 2 ans).")
+        parser.add_argument('--horizon', type=int, default=7)
+        parser.add_argument('--repeat', type=int, default=5, help="Calculs mesurés par méthode.")
+        parser.add_argument('--loop-sample', type=int, default=200, help="Produits calculés par la référence.")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        try:
+            forecasting.require_numpy()
+        except ImproperlyConfigured as e:
+            raise CommandError(e)
+        np = forecasting.np
+
+        rng = np.random.default_rng(options['seed'])
+        products, days, horizon = options['products'], options['days'], options['horizon']
+        start = datetime.date.today() - datetime.timedelta(days=days)
+        first_day = datetime.date.today() + datetime.timedelta(days=1)
+        weekdays = (start.weekday() + np.arange(days)) % 7
+        base = rng.gamma(2.0, 3.0, size=(products, 1))
+        profile = rng.uniform(0.4, 1.6, size=(products, 7))
+        history = rng.poisson(base * profile[:, weekdays]).astype(np.float64)
+        sample = min(options['loop_sample'], products)
+        self.stdout.write(
+            f"{products} produits × {days} jours ({history.nbytes / 1e6:.0f} Mo), horizon {horizon} jours"
+        )
+
+        self.stdout.write(f"{'méthode':<24} {'vectorisé p50':>14} {'boucle (extrapolée)':>20} {'gain':>8}")
+        for method in forecasting.METHODS:
+            args = (start, first_day, horizon, method, forecasting.DEFAULT_WINDOW, forecasting.DEFAULT_ALPHA)
+            runs = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                predictions = forecasting.forecast_matrix(history, *args)
+                runs.append(time.perf_counter() - started)
+            vectorized = statistics.median(runs)
+
+            started = time.perf_counter()
+            reference = [forecast_one(history[i].tolist(), *args) for i in range(sample)]
+            loop = (time.perf_counter() - started) * products / sample
+            if not np.allclose(predictions[:sample], reference):
+                raise CommandError(f"{method}: le calcul vectorisé diffère de la référence.")
+            self.stdout.write(
+                f"{method:<24} {vectorized * 1000:>12.0f}ms {loop * 1000:>18.0f}ms {loop / vectorized:>7.0f}x"
+            )
@@ -0,0 +1,100 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from food_app.models import Order, OrderArticle, Product
+
+INDEXED_MODELS = (Product, Order, OrderArticle)
+
+
+class Rollback(Exception):
+    """Annule la transaction: les index supprimés pour la mesure « sans » sont rétablis."""
+
+
+class Command(BaseCommand):
+    """
+    Affiche le plan d'exécution (EXPLAIN) et la durée des requêtes des
+    principales vues, avec puis sans les index déclarés dans les Meta de
+    Product, Order et OrderArticle.
+
+    La mesure « sans » supprime les index dans une transaction annulée à la
+    fin (DDL transactionnel sous SQLite et PostgreSQL): la base n'est pas
+    modifiée. À lancer sur un gros jeu de données, par exemple après
+    ``manage.py generate_data --products 100000 --orders 500000``.
+    """
+
+    help = "EXPLAIN et durées des chemins d'accès principaux, avec et sans les index."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help="Exécutions mesurées par requête.")
+        parser.add_argument('--no-explain', action='store_true', help="N'affiche que les durées.")
+
+    def access_paths(self):
+        """Requêtes émises par les vues, avec des paramètres représentatifs."""
+        customer_id = Order.objects.values_list('customer_id', flat=True).order_by('-id').first()
+        order_ids = list(Order.objects.order_by('-created_at', '-id').values_list('id', flat=True)[:20])
+        if customer_id is None:
+            raise CommandError("Aucune commande: lancez d'abord « manage.py generate_data ».")
+        middle = Product.objects.count() // 2
+        return [
+            ('product-list (page du milieu)',
+             Product.objects.order_by('Categorie', 'label', 'id')[middle:middle + 10]),
+            ('produits par catégorie', Product.objects.filter(Categorie='fru').order_by('label', 'id')[:10]),
+            ('catalog-api (début du catalogue)', Product.objects.order_by('label', 'id')[:100]),
+            ('order-list (première page)', Order.objects.order_by('-created_at', '-id')[:21]),
+            ('orders-user (première page)',
+             Order.objects.filter(customer_id=customer_id).order_by('-created_at', '-id')[:21]),
+            ('with_lines (lignes de 20 commandes)',
+             OrderArticle.objects.filter(order_id__in=order_ids).values_list('order_id', 'product_id')),
+        ]
+
+    def handle(self, *args, **options):
+        paths = self.access_paths()
+        self.stdout.write(
+            f"{connection.vendor}: {Product.objects.count()} produits, {Order.objects.count()} commandes, "
+            f"{OrderArticle.objects.count()} lignes\n"
+        )
+        with_indexes = self.measure(paths, options, phase='avec index')
+        try:
+            with transaction.atomic():
+                # DROP INDEX direct: l'éditeur de schéma SQLite refuse de s'ouvrir dans atomic()
+                with connection.cursor() as cursor:
+                    for model in INDEXED_MODELS:
+                        for index in model._meta.indexes:
+                            cursor.execute(f'DROP INDEX {connection.ops.quote_name(index.name)}')
+                self.stdout.write(self.style.MIGRATE_HEADING("\nSans les index:"))
+                without_indexes = self.measure(paths, options, phase='sans index')
+                raise Rollback
+        except Rollback:
+            pass
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\nRésumé (médiane):"))
+        self.stdout.write(f"{'requête':<40} {'sans index':>12} {'avec index':>12}")
+        for (name, _), before, after in zip(paths, without_indexes, with_indexes):
+            self.stdout.write(f"{name:<40} {before:>10.2f}ms {after:>10.2f}ms")
+
+    def explain(self, queryset, phase):
+        if connection.vendor != 'sqlite':
+            return queryset.explain()
+        # SQLite garde le plan d'un EXPLAIN en cache (par texte SQL) même après
+        # un DROP INDEX: le commentaire rend le texte propre à chaque phase.
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql} /* {phase} */', params)
+            return '\n'.join(' '.join(str(column) for column in row) for row in cursor.fetchall())
+
+    def measure(self, paths, options, phase):
+        timings = []
+        for name, queryset in paths:
+            if not options['no_explain']:
+                self.stdout.write(self.style.SQL_KEYWORD(name))
+                self.stdout.write(self.explain(queryset, phase))
+            runs = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                list(queryset.all())
+                runs.append((time.perf_counter() - started) * 1000)
+            timings.append(statistics.median(runs))
+        return timings
@@ -0,0 +1,85 @@
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from food_app import search
+from food_app.benchmarking import WORDS
+from food_app.models import Product
+
+
+class Rollback(Exception):
+    """Annule la transaction du banc d'essai: aucune donnée synthétique n'est conservée."""
+
+
+class Command(BaseCommand):
+    """
+    Compare la latence de la recherche icontains actuelle et du moteur
+    plein texte sur des catalogues synthétiques de tailles croissantes.
+
+    Les produits sont insérés dans une transaction annulée à la fin: la
+    base n'est pas modifiée. Chaque mesure couvre ce que fait
+    ProductSearchView: le comptage et la première page de 10 résultats.
+    """
+
+    help = "Banc d'essai de la recherche produits (icontains vs index plein texte)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000],
+            help="Tailles de catalogue à mesurer (défaut: 10000 100000 1000000).",
+        )
+        parser.add_argument('--repeat', type=int, default=20, help="Requêtes mesurées par taille.")
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        backend = search.get_backend()
+        baseline = search.IContainsSearchBackend()
+        queries = [rng.choice(WORDS)[:rng.randint(3, 6)] for _ in range(options['repeat'])]
+
+        self.stdout.write(f"Moteur: {type(backend).__name__}")
+        self.stdout.write(f"{'produits':>10} {'icontains p50':>14} {'p95':>9} {'index p50':>11} {'p95':>9}")
+        try:
+            with transaction.atomic():
+                created = Product.objects.count()
+                for size in sorted(options['sizes']):
+                    self._grow(rng, size - created)
+                    created = max(created, size)
+                    backend.rebuild()
+                    slow = self._measure(baseline, queries)
+                    fast = self._measure(backend, queries)
+                    self.stdout.write(
+                        f"{size:>10} {slow[0]:>12.2f}ms {slow[1]:>7.2f}ms {fast[0]:>9.2f}ms {fast[1]:>7.2f}ms"
+                    )
+                raise Rollback
+        except Rollback:
+            pass
+        # L'index a été reconstruit dans la transaction annulée: il est revenu à son état initial.
+
+    def _grow(self, rng, count, batch_size=10_000):
+        while count > 0:
+            step = min(batch_size, count)
+            Product.objects.bulk_create([
+                Product(
+                    label=' '.join(rng.sample(WORDS, 3)),
+                    description=' '.join(rng.choices(WORDS, k=12)),
+                    Categorie=rng.choice(Product.CATEGORIE_CHOICES)[0],
+                    price=rng.randint(100, 50_000),
+                )
+                for _ in range(step)
+            ])
+            count -= step
+
+    def _measure(self, backend, queries):
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            results = backend.search(query)
+            results.count()
+            list(results[:10])
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        return statistics.median(timings), timings[int(len(timings) * 0.95) - 1]
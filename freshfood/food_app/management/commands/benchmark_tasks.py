@@ -0,0 +1,98 @@
+import multiprocessing
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.test.utils import override_settings
+
+from food_app import tasks
+from food_app.models import Task
+
+
+@tasks.register
+def benchmark_task(work_ms=0):
+    """Tâche du banc d'essai: ne fait rien, ou attend work_ms millisecondes (travail simulé)."""
+    if work_ms:
+        time.sleep(work_ms / 1000)
+
+
+def drain(batch_size):
+    """Exécute des lots jusqu'à ce que la file soit vide (corps d'un worker du banc d'essai)."""
+    done = 0
+    while True:
+        succeeded, failed = tasks.run_batch(batch_size)
+        if not succeeded and not failed:
+            break
+        done += succeeded
+    connections.close_all()
+    return done
+
+
+class Command(BaseCommand):
+    """
+    Mesure la file de tâches (tasks.py) sur la base configurée:
+
+    - le coût d'une mise en file, payé par la requête qui la fait (une
+      insertion après validation de sa transaction);
+    - le débit de « manage.py worker » pour chaque taille de lot et chaque
+      nombre de workers (processus), sur --tasks tâches insérées d'avance.
+
+    La file doit être vide au départ; les tâches du banc d'essai sont
+    supprimées à la fin. La mesure suppose un worker (FOOD_APP_TASK_WORKER
+    forcé à vrai le temps du banc).
+    """
+
+    help = "Banc d'essai de la file de tâches: coût de la mise en file et débit des workers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=5000, help="Tâches exécutées par mesure.")
+        parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 10, 50, 200])
+        parser.add_argument('--workers', type=int, nargs='+', default=[1, 4], help="Processus workers.")
+        parser.add_argument('--work-ms', type=float, default=0, help="Durée simulée de chaque tâche (ms).")
+        parser.add_argument('--enqueue-sample', type=int, default=500, help="Mises en file chronométrées.")
+
+    @override_settings(FOOD_APP_TASK_WORKER=True)
+    def handle(self, *args, **options):
+        if Task.objects.exclude(name=tasks.task_name(benchmark_task)).exclude(status=Task.FAILED).exists():
+            raise CommandError("La file contient des tâches: lancer d'abord « manage.py worker --once ».")
+        name = tasks.task_name(benchmark_task)
+        try:
+            self.measure_enqueue(options['enqueue_sample'], options['work_ms'])
+            self.stdout.write(f"{'lot':>6} {'workers':>8} {'durée':>9} {'tâches/s':>10}")
+            for workers in options['workers']:
+                for batch_size in options['batch_sizes']:
+                    Task.objects.filter(name=name).delete()
+                    Task.objects.bulk_create(
+                        [Task(name=name, payload={'work_ms': options['work_ms']}) for _ in range(options['tasks'])],
+                        batch_size=1000,
+                    )
+                    elapsed, done = self.run_workers(workers, batch_size)
+                    if done != options['tasks']:
+                        raise CommandError(f"{done} tâche(s) exécutée(s) sur {options['tasks']}.")
+                    self.stdout.write(f"{batch_size:>6} {workers:>8} {elapsed:>8.2f}s {done / elapsed:>10.0f}")
+        finally:
+            Task.objects.filter(name=name).delete()
+
+    def measure_enqueue(self, sample, work_ms):
+        runs = []
+        for _ in range(sample):
+            started = time.perf_counter()
+            with transaction.atomic():
+                tasks.enqueue(benchmark_task, work_ms=work_ms)
+            runs.append(time.perf_counter() - started)
+        self.stdout.write(
+            f"Mise en file (transaction + insertion après validation), {sample} fois: "
+            f"p50 {statistics.median(runs) * 1000:.2f}ms, max {max(runs) * 1000:.2f}ms"
+        )
+
+    def run_workers(self, workers, batch_size):
+        started = time.perf_counter()
+        if workers == 1:
+            done = drain(batch_size)
+        else:
+            # Connexions fermées avant fork: chaque processus ouvre la sienne
+            connections.close_all()
+            with multiprocessing.get_context('fork').Pool(workers) as pool:
+                done = sum(pool.map(drain, [batch_size] * workers))
+        return time.perf_counter() - started, done
@@ -0,0 +1,67 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from food_app import exports, replicas
+
+
+class Command(BaseCommand):
+    """
+    Exporte les commandes et leurs lignes (CSV ou NDJSON) vers un fichier
+    ou la sortie standard, pour les extractions quotidiennes de la comptabilité.
+
+    Même flux que la vue /orders/export/ (voir exports.py): la mémoire reste
+    constante quelle que soit la taille de l'export. Exemple pour la veille:
+    ``manage.py export_orders --start 2024-05-01 --end 2024-05-01 --gzip -o ventes.csv.gz``
+    """
+
+    help = "Export en flux des commandes et lignes de commande (CSV/NDJSON, gzip optionnel)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=exports.FORMATS, default='csv')
+        parser.add_argument('--start', help="Première date incluse (AAAA-MM-JJ).")
+        parser.add_argument('--end', help="Dernière date incluse (AAAA-MM-JJ).")
+        parser.add_argument(
+            '--category', action='append', default=[],
+            help="Code de catégorie à inclure (répétable).",
+        )
+        parser.add_argument('--gzip', action='store_true', help="Compresse la sortie en gzip.")
+        parser.add_argument('-o', '--output', help="Fichier de sortie (défaut: sortie standard).")
+        parser.add_argument(
+            '--database', default=replicas.read_database(),
+            help="Base lue (défaut: la réplique en lecture si elle est configurée).",
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=exports.DEFAULT_CHUNK_SIZE,
+            help=f"Lignes lues par aller-retour avec la base (défaut: {exports.DEFAULT_CHUNK_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            start, end, categories = exports.parse_filters(options['start'], options['end'], options['category'])
+        except ValueError as e:
+            raise CommandError(e)
+
+        chunks = exports.stream(
+            options['format'], start, end, categories,
+            compress=options['gzip'], chunk_size=options['chunk_size'], using=options['database'],
+        )
+        started = time.perf_counter()
+        written = 0
+        output = open(options['output'], 'wb') if options['output'] else sys.stdout.buffer
+        try:
+            for chunk in chunks:
+                output.write(chunk)
+                written += len(chunk)
+        finally:
+            if options['output']:
+                output.close()
+            else:
+                output.flush()
+
+        if options['output']:
+            elapsed = time.perf_counter() - started
+            self.stdout.write(self.style.SUCCESS(
+                f"{options['output']}: {written:,} octets écrits en {elapsed:.2f}s."
+            ))
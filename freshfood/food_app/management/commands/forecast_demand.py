@@ -0,0 +1,63 @@
+import time
+
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management.base import BaseCommand, CommandError
+
+from food_app import forecasting
+from food_app.models import Product
+
+
+class Command(BaseCommand):
+    """
+    Calcule et enregistre les prévisions de demande des produits frais pour
+    les jours qui suivent (voir forecasting.py), puis affiche les plus
+    fortes. À lancer chaque jour avant la commande aux fournisseurs, par
+    exemple depuis cron. Nécessite NumPy.
+    """
+
+    help = "Prévisions de demande par produit (moyenne mobile ou lissage exponentiel, saisonnalité hebdomadaire)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--method', choices=forecasting.METHODS, default=forecasting.DEFAULT_METHOD)
+        parser.add_argument('--horizon', type=int, default=1, help="Jours prévus à partir de demain.")
+        parser.add_argument('--history', type=int, default=forecasting.DEFAULT_HISTORY_DAYS,
+                            help="Jours d'historique lus (au moins 7 pour la saisonnalité).")
+        parser.add_argument('--window', type=int, default=forecasting.DEFAULT_WINDOW,
+                            help="Jours de la moyenne mobile.")
+        parser.add_argument('--alpha', type=float, default=forecasting.DEFAULT_ALPHA,
+                            help="Coefficient du lissage exponentiel (0 < alpha <= 1).")
+        parser.add_argument('--categories', nargs='+', default=list(forecasting.FRESH_CATEGORIES),
+                            choices=[code for code, _ in Product.CATEGORIE_CHOICES])
+        parser.add_argument('--top', type=int, default=10, help="Prévisions affichées.")
+        parser.add_argument('--dry-run', action='store_true', help="Calcule et affiche sans enregistrer.")
+
+    def handle(self, *args, **options):
+        if options['history'] < 7 or options['horizon'] < 1 or not 0 < options['alpha'] <= 1:
+            raise CommandError("Il faut --history >= 7, --horizon >= 1 et 0 < --alpha <= 1.")
+        try:
+            forecasting.require_numpy()
+        except ImproperlyConfigured as e:
+            raise CommandError(e)
+
+        started = time.perf_counter()
+        product_ids, days, predictions = forecasting.compute(
+            horizon=options['horizon'], method=options['method'], history_days=options['history'],
+            window=options['window'], alpha=options['alpha'], categories=options['categories'],
+        )
+        computed = time.perf_counter()
+        stored = 0
+        if not options['dry_run']:
+            stored = forecasting.store(product_ids, days, predictions, options['method'])
+        finished = time.perf_counter()
+
+        self.stdout.write(
+            f"{len(product_ids)} produit(s) avec historique, {options['history']} jours: "
+            f"lecture et calcul {(computed - started) * 1000:.0f}ms, "
+            f"enregistrement {(finished - computed) * 1000:.0f}ms ({stored} prévision(s))."
+        )
+        top = predictions[:, 0].argsort()[::-1][:options['top']]
+        labels = Product.objects.in_bulk([int(product_ids[i]) for i in top])
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Prévisions du {days[0]:%d/%m/%Y}:"))
+        for i in top:
+            product = labels.get(int(product_ids[i]))
+            self.stdout.write(f"  {product.label if product else product_ids[i]:<40} {predictions[i, 0]:>8.1f}")
@@ -0,0 +1,47 @@
+import json
+
+from django.core.management.base import BaseCommand
+
+from food_app import benchmarking
+
+
+class Command(BaseCommand):
+    """
+    Génère un jeu de données synthétique reproductible pour le banc
+    d'essai (commande benchmark): utilisateurs, produits de toutes les
+    catégories et commandes au nombre de lignes très inégal, le tout par
+    bulk_create. Le jeu précédent est supprimé d'abord; les autres données
+    de la base ne sont pas touchées.
+    """
+
+    help = "Génère utilisateurs, produits et commandes synthétiques (bulk_create, graine fixe)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--products', type=int, default=2000)
+        parser.add_argument('--orders', type=int, default=20_000)
+        parser.add_argument('--max-lines', type=int, default=40, help="Lignes maximum par commande.")
+        parser.add_argument(
+            '--skew', type=float, default=1.1,
+            help="Exposant de Zipf de la popularité des produits (0 = uniforme).",
+        )
+        parser.add_argument('--days', type=int, default=90, help="Période couverte par les commandes.")
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--clear', action='store_true', help="Supprime le jeu synthétique sans en générer.")
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            benchmarking.clear()
+            self.stdout.write(self.style.SUCCESS("Jeu de données synthétique supprimé."))
+            return
+
+        def progress(orders, lines):
+            self.stderr.write(f"{orders} commande(s), {lines} ligne(s)")
+
+        summary = benchmarking.generate(
+            users=options['users'], products=options['products'], orders=options['orders'],
+            max_lines=options['max_lines'], skew=options['skew'], days=options['days'],
+            seed=options['seed'], batch_size=options['batch_size'], progress=progress,
+        )
+        self.stdout.write(json.dumps(summary, indent=2))
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from food_app import catalog_import
+
+
+class Command(BaseCommand):
+    """
+    Importe le fichier catalogue du fournisseur (CSV ou JSON / JSON Lines)
+    par upsert sur le SKU, en blocs transactionnels (voir catalog_import.py).
+    Le fichier est lu en flux: sa taille n'influe pas sur la mémoire utilisée.
+    """
+
+    help = "Import en masse des produits (upsert par SKU, par blocs transactionnels)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fichier CSV, JSON ou JSON Lines.")
+        parser.add_argument(
+            '--format', choices=catalog_import.FORMATS,
+            help="Format du fichier (défaut: déduit de l'extension).",
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=catalog_import.DEFAULT_CHUNK_SIZE,
+            help=f"Produits par transaction (défaut: {catalog_import.DEFAULT_CHUNK_SIZE}).",
+        )
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or catalog_import.guess_format(options['path'])
+        try:
+            f = open(options['path'], 'rb')
+        except OSError as e:
+            raise CommandError(e)
+
+        def progress(report):
+            self.stdout.write(f"{report.rows} ligne(s) traitées ({report.rows_per_sec or 0:,.0f} lignes/s)")
+
+        with f:
+            report = catalog_import.import_products(
+                catalog_import.read_rows(f, fmt), chunk_size=options['chunk_size'], progress=progress,
+            )
+
+        for error in report.errors:
+            self.stderr.write(f"Ligne {error['line']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Terminé: {report.inserted} ajouté(s), {report.updated} mis à jour, {report.rejected} rejeté(s) "
+            f"en {report.elapsed:.2f}s ({report.rows_per_sec or 0:,.0f} lignes/s)."
+        ))
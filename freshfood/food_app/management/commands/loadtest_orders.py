@@ -0,0 +1,207 @@
+import asyncio
+import json
+import random
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import AsyncClient, Client
+from django.urls import reverse
+
+from food_app.benchmarking import summarize, test_client_hosts
+from food_app.models import Product
+
+LOADTEST_USERNAME = 'loadtest_orders'
+LOADTEST_LABEL = '[loadtest] '
+
+
+class Command(BaseCommand):
+    """
+    Compare la prise de commande synchrone (OrderView, pile WSGI) et
+    asynchrone (AsyncOrderView, pile ASGI) sous charge concurrente.
+
+    Les deux chemins sont exercés en processus, avec la pile complète de
+    middlewares: le client de test WSGI dans un pool de threads, le client
+    ASGI (AsyncClient) dans une boucle asyncio. Les données créées (un
+    utilisateur et quelques produits marqués « [loadtest] ») sont supprimées
+    à la fin, avec les commandes associées.
+
+    Avec --batch-size, mesure aussi le débit de l'API par lots
+    (OrderBatchView) face au même nombre d'appels unitaires séquentiels.
+
+    Avec --sqlite-baseline, rejoue le chemin WSGI avec les options de
+    connexion SQLite par défaut de Django (journal classique, transactions
+    différées, attente de 5 s) pour comparer aux réglages de SQLITE_OPTIONS
+    (voir settings.py): débit et erreurs « database is locked » sous
+    écritures concurrentes.
+
+    Pour mesurer derrière un vrai serveur, lancer par exemple
+    ``gunicorn freshfood.wsgi`` puis ``uvicorn freshfood.asgi:application``
+    et pointer un outil HTTP sur /orders/new/ et /api/v1/orders/.
+    """
+
+    help = "Test de charge de la prise de commande: WSGI (OrderView) contre ASGI (AsyncOrderView)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help="Commandes envoyées par chemin.")
+        parser.add_argument('--concurrency', type=int, default=16, help="Requêtes simultanées.")
+        parser.add_argument('--products', type=int, default=50, help="Produits synthétiques au catalogue.")
+        parser.add_argument('--lines', type=int, default=5, help="Lignes par panier.")
+        parser.add_argument(
+            '--batch-size', type=int, default=0,
+            help="Si > 0, compare aussi des lots de cette taille à des appels unitaires séquentiels.",
+        )
+        parser.add_argument(
+            '--sqlite-baseline', action='store_true',
+            help="Compare aussi aux options de connexion SQLite par défaut de Django.",
+        )
+        parser.add_argument('--seed', type=int, default=42)
+
+    def handle(self, *args, **options):
+        if options['sqlite_baseline'] and connection.vendor != 'sqlite':
+            raise CommandError("--sqlite-baseline ne s'applique qu'à SQLite.")
+        rng = random.Random(options['seed'])
+        user, _ = User.objects.get_or_create(username=LOADTEST_USERNAME)
+        Product.objects.bulk_create([
+            Product(label=f'{LOADTEST_LABEL}{i}', description='', price=rng.randint(100, 5000))
+            for i in range(options['products'])
+        ])
+        product_ids = list(Product.objects.filter(label__startswith=LOADTEST_LABEL).values_list('id', flat=True))
+        payloads = [
+            json.dumps({
+                'client_name': 'loadtest',
+                'cart_items': [
+                    {'product_id': pid, 'quantity': rng.randint(1, 5)}
+                    for pid in rng.sample(product_ids, min(options['lines'], len(product_ids)))
+                ],
+            })
+            for _ in range(options['requests'])
+        ]
+
+        try:
+            with test_client_hosts():
+                results = []
+                if options['sqlite_baseline']:
+                    with self._sqlite_defaults():
+                        results.append(self._run_wsgi(
+                            user, payloads, options['concurrency'], name='wsgi:order-view (SQLite par défaut)',
+                        ))
+                results += [
+                    self._run_wsgi(user, payloads, options['concurrency']),
+                    asyncio.run(self._run_asgi(user, payloads, options['concurrency'])),
+                ]
+                if options['batch_size'] > 0:
+                    results += [
+                        self._run_wsgi(user, payloads, 1, name='wsgi:order-view (séquentiel)'),
+                        self._run_batch(user, payloads, options['batch_size']),
+                    ]
+        finally:
+            # Supprime aussi, en cascade, les commandes et lignes créées
+            Product.objects.filter(label__startswith=LOADTEST_LABEL).delete()
+            user.delete()
+
+        self.stdout.write(json.dumps({
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'lines_per_order': options['lines'],
+            'results': results,
+        }, indent=2))
+
+    def _run_wsgi(self, user, payloads, concurrency, name='wsgi:order-view'):
+        url = reverse('order-view')
+
+        def worker(chunk):
+            client = Client()
+            client.force_login(user)
+            latencies, statuses = [], Counter()
+            try:
+                for body in chunk:
+                    started = time.perf_counter()
+                    response = client.post(url, data=body, content_type='application/json')
+                    statuses[response.status_code] += 1
+                    if response.status_code == 201:
+                        latencies.append(time.perf_counter() - started)
+            finally:
+                # Le client de test ne ferme pas les connexions: une par thread
+                connections.close_all()
+            return latencies, statuses
+
+        chunks = [payloads[i::concurrency] for i in range(concurrency)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            outcomes = list(pool.map(worker, chunks))
+        elapsed = time.perf_counter() - started
+        latencies = [lat for lats, _ in outcomes for lat in lats]
+        return summarize(name, latencies, sum((s for _, s in outcomes), Counter()), elapsed)
+
+    @contextmanager
+    def _sqlite_defaults(self):
+        """
+        Connexions ouvertes sans les OPTIONS des réglages, le temps du bloc.
+        Le mode WAL étant enregistré dans le fichier, on repasse d'abord en
+        journal classique, puis on le rétablit à la fin.
+        """
+        settings_dict = connection.settings_dict
+        tuned = settings_dict['OPTIONS']
+        connections.close_all()
+        settings_dict['OPTIONS'] = {}
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode=DELETE')
+            yield
+        finally:
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode=WAL')
+            connections.close_all()
+            settings_dict['OPTIONS'] = tuned
+
+    def _run_batch(self, user, payloads, batch_size):
+        """Envoie les mêmes paniers par lots; « rps » compte ici des commandes par seconde."""
+        url = reverse('order-batch-api')
+        client = Client()
+        client.force_login(user)
+        run_id = time.time_ns()
+        carts = [
+            {**json.loads(body), 'idempotency_key': f'loadtest-{run_id}-{index}'}
+            for index, body in enumerate(payloads)
+        ]
+        latencies, statuses, created = [], Counter(), 0
+        started = time.perf_counter()
+        for offset in range(0, len(carts), batch_size):
+            batch_started = time.perf_counter()
+            response = client.post(
+                url, data=json.dumps({'orders': carts[offset:offset + batch_size]}), content_type='application/json',
+            )
+            statuses[response.status_code] += 1
+            if response.status_code == 200:
+                latencies.append(time.perf_counter() - batch_started)
+                created += response.json()['summary']['created']
+        elapsed = time.perf_counter() - started
+        result = summarize(f'wsgi:order-batch-api (lots de {batch_size})', latencies, statuses, elapsed, success=200)
+        result['rps'] = round(created / elapsed, 1) if elapsed else None
+        result['orders_created'] = created
+        return result
+
+    async def _run_asgi(self, user, payloads, concurrency):
+        url = reverse('order-api')
+        client = AsyncClient()
+        await client.aforce_login(user)
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies, statuses = [], Counter()
+
+        async def send(body):
+            async with semaphore:
+                started = time.perf_counter()
+                response = await client.post(url, data=body, content_type='application/json')
+                statuses[response.status_code] += 1
+                if response.status_code == 201:
+                    latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(send(body) for body in payloads))
+        elapsed = time.perf_counter() - started
+        return summarize('asgi:order-api', latencies, statuses, elapsed)
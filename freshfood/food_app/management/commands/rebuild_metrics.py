@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from food_app import metrics
+
+
+class Command(BaseCommand):
+    """
+    Reconstruit les compteurs DailyStats / DailyCategoryStats à partir des
+    commandes existantes. À lancer une fois après la migration, puis en cas
+    de doute: en temps normal les compteurs sont tenus à jour à l'écriture.
+    """
+
+    help = "Reconstruit les métriques journalières (commandes, lignes, chiffre d'affaires par catégorie)."
+
+    def handle(self, *args, **options):
+        days, category_rows = metrics.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"{days} jour(s) et {category_rows} ligne(s) jour/catégorie reconstruits."
+        ))
@@ -0,0 +1,71 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from food_app.models import Order
+
+
+class Command(BaseCommand):
+    """
+    Recalcule (ou vérifie) les totaux dénormalisés Order.total_price et
+    Order.line_count à partir des OrderArticle existants.
+
+    Les commandes sont parcourues par lots de clés primaires croissantes
+    (pagination par clé, sans OFFSET) et chaque lot est agrégé en une seule
+    requête SQL.
+    """
+
+    help = "Rattrape et vérifie les totaux dénormalisés des commandes (total_price, line_count)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help="N'écrit rien: signale les commandes incohérentes et sort en erreur s'il y en a.",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Nombre de commandes traitées par lot (défaut: 1000).",
+        )
+
+    def handle(self, *args, **options):
+        check_only = options['check']
+        batch_size = options['batch_size']
+
+        last_pk = 0
+        scanned = 0
+        mismatched = 0
+
+        while True:
+            batch = list(
+                Order.objects.filter(pk__gt=last_pk)
+                .order_by('pk')
+                .with_totals()
+                .only('pk', 'total_price', 'line_count')[:batch_size]
+            )
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+            scanned += len(batch)
+
+            stale = []
+            for order in batch:
+                if (order.total_price != order.computed_total
+                        or order.line_count != order.computed_line_count):
+                    if check_only:
+                        self.stdout.write(
+                            f"Commande #{order.pk}: stocké {order.total_price} / {order.line_count} ligne(s), "
+                            f"attendu {order.computed_total} / {order.computed_line_count} ligne(s)"
+                        )
+                    order.total_price = order.computed_total
+                    order.line_count = order.computed_line_count
+                    stale.append(order)
+
+            mismatched += len(stale)
+            if stale and not check_only:
+                with transaction.atomic():
+                    Order.objects.bulk_update(stale, ['total_price', 'line_count'])
+
+        verb = "incohérente(s)" if check_only else "corrigée(s)"
+        summary = f"{scanned} commande(s) analysée(s), {mismatched} {verb}."
+        if check_only and mismatched:
+            raise CommandError(summary)
+        self.stdout.write(self.style.SUCCESS(summary))
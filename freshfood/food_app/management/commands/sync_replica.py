@@ -0,0 +1,42 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from food_app import replicas
+
+
+class Command(BaseCommand):
+    """
+    Recopie la base SQLite principale dans le fichier de la réplique
+    (FOOD_APP_READ_REPLICA), pour essayer le routage en local avec deux
+    fichiers SQLite. Entre deux recopies, la réplique « retarde »: c'est le
+    cas que l'épinglage après écriture doit couvrir.
+
+    Avec PostgreSQL, la réplication est l'affaire du serveur: la commande
+    refuse de s'exécuter.
+    """
+
+    help = "Recopie la base SQLite principale vers la réplique en lecture (essais en local)."
+
+    def handle(self, *args, **options):
+        alias = replicas.replica_alias()
+        if alias is None:
+            raise CommandError("Aucune réplique configurée (DATABASE_REPLICA_URL).")
+        primary, replica = connections[DEFAULT_DB_ALIAS], connections[alias]
+        if primary.vendor != 'sqlite' or replica.vendor != 'sqlite':
+            raise CommandError("La recopie ne concerne que deux bases SQLite.")
+
+        started = time.perf_counter()
+        replica.close()
+        primary.ensure_connection()
+        target = sqlite3.connect(replica.settings_dict['NAME'])
+        try:
+            # API de sauvegarde en ligne: copie cohérente même pendant des écritures
+            primary.connection.backup(target)
+        finally:
+            target.close()
+        self.stdout.write(self.style.SUCCESS(
+            f"Réplique {replica.settings_dict['NAME']} à jour en {time.perf_counter() - started:.2f}s."
+        ))
@@ -0,0 +1,62 @@
+import signal
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from food_app import tasks
+
+
+class Command(BaseCommand):
+    """
+    Exécute les tâches de fond de food_app (voir tasks.py): réclame un lot
+    de tâches dues, les exécute une par une, et recommence; s'endort
+    --idle secondes quand la file est vide. Plusieurs workers peuvent
+    tourner en parallèle. SIGTERM ou Ctrl-C arrêtent le worker après la
+    tâche en cours; les autres tâches du lot sont rendues à la file.
+
+    Avec --once, vide la file puis s'arrête (cron, tests).
+
+    Processus requis quand FOOD_APP_TASK_WORKER est vrai: sans lui, les
+    tâches s'accumulent. Sinon les tâches s'exécutent dans les requêtes et
+    la file ne reçoit que celles qui y ont échoué.
+    """
+
+    help = "Exécute les tâches de fond en file (commandes: compteurs du tableau de bord...)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=tasks.DEFAULT_BATCH_SIZE,
+                            help="Tâches réclamées à la fois.")
+        parser.add_argument('--lease', type=int, default=tasks.LEASE_SECONDS,
+                            help="Secondes après lesquelles un lot non terminé peut être repris.")
+        parser.add_argument('--idle', type=float, default=1.0, help="Attente (s) quand la file est vide.")
+        parser.add_argument('--once', action='store_true', help="Vide la file puis s'arrête.")
+        parser.add_argument('--retry-failed', action='store_true',
+                            help="Remet d'abord en file les tâches échouées.")
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['lease'] < 1:
+            raise CommandError("Il faut --batch-size >= 1 et --lease >= 1.")
+        if options['retry_failed']:
+            self.stdout.write(f"{tasks.retry_failed()} tâche(s) échouée(s) remise(s) en file.")
+
+        self.stopping = False
+        previous = {sig: signal.signal(sig, self.stop) for sig in (signal.SIGTERM, signal.SIGINT)}
+        succeeded = failed = 0
+        try:
+            while not self.stopping:
+                close_old_connections()
+                done, errors = tasks.run_batch(options['batch_size'], options['lease'], lambda: self.stopping)
+                succeeded, failed = succeeded + done, failed + errors
+                if done or errors:
+                    continue
+                if options['once']:
+                    break
+                time.sleep(options['idle'])
+        finally:
+            for sig, handler in previous.items():
+                signal.signal(sig, handler)
+        self.stdout.write(f"{succeeded} tâche(s) exécutée(s), {failed} en échec.")
+
+    def stop(self, signum, frame):
+        self.stopping = True
@@ -0,0 +1,238 @@
+"""
+Métriques agrégées du tableau de bord.
+
+Les compteurs (commandes, lignes, chiffre d'affaires par jour et par
+catégorie) sont tenus à jour de façon incrémentale au moment de l'écriture:
+par les signaux pour les écritures unitaires (voir signals.py) et
+explicitement par orders.py pour les bulk_create, qui n'émettent pas de
+signaux. À la prise de commande (orders.place_order), les lignes sont
+comptées par une tâche de fond (defer_lines): avec un worker, après la
+réponse, et le tableau de bord les voit quelques instants plus tard; sans
+worker, dans la requête juste après sa validation (voir tasks.py). La lecture passe par
+le cache de Django et le résumé est invalidé après chaque transaction qui
+modifie les compteurs.
+"""
+from collections import defaultdict
+from datetime import date
+from decimal import Decimal
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import replicas, tasks
+from .models import (
+    ArchivedOrder, ArchivedOrderArticle, DailyCategoryStats, DailyStats, Order, OrderArticle, Product,
+)
+
+SUMMARY_CACHE_KEY = 'food_app:metrics:summary'
+SUMMARY_CACHE_TIMEOUT = 300
+RECENT_DAYS = 7
+
+
+def invalidate_summary():
+    """Supprime le résumé en cache une fois la transaction courante validée."""
+    transaction.on_commit(lambda: cache.delete(SUMMARY_CACHE_KEY))
+
+
+def _bump(model, lookup, **deltas):
+    """Incrémente atomiquement (F()) les compteurs de la ligne `lookup`, créée au besoin."""
+    deltas = {name: value for name, value in deltas.items() if value}
+    if not deltas:
+        return
+    updates = {name: F(name) + value for name, value in deltas.items()}
+    if not model.objects.filter(**lookup).update(**updates):
+        model.objects.get_or_create(**lookup)
+        model.objects.filter(**lookup).update(**updates)
+
+
+def record_order(order, sign=1):
+    """Compte (ou décompte avec sign=-1) une commande dans les statistiques de son jour."""
+    record_orders([order], sign=sign)
+
+
+def record_orders(orders, sign=1):
+    """Compte plusieurs commandes (bulk_create): une mise à jour par jour concerné."""
+    per_day = defaultdict(int)
+    for order in orders:
+        per_day[timezone.localdate(order.created_at)] += 1
+    for day, count in per_day.items():
+        _bump(DailyStats, {'day': day}, order_count=sign * count)
+    if per_day:
+        invalidate_summary()
+
+
+def _line_deltas(articles, sign=1):
+    """
+    Contribution de lignes de commande aux compteurs, regroupée en mémoire
+    par jour et par (jour, catégorie).
+    """
+    per_day = defaultdict(lambda: [0, Decimal('0.00')])
+    per_category = defaultdict(lambda: [0, 0, Decimal('0.00')])
+    for article in articles:
+        day = timezone.localdate(article.order.created_at)
+        subtotal = article.get_subtotal()
+        per_day[day][0] += sign
+        per_day[day][1] += sign * subtotal
+        bucket = per_category[(day, article.product.Categorie)]
+        bucket[0] += sign
+        bucket[1] += sign * article.quantity
+        bucket[2] += sign * subtotal
+    return per_day, per_category
+
+
+def _apply_line_deltas(per_day, per_category):
+    """Une mise à jour par jour et par (jour, catégorie), quel que soit le nombre de lignes."""
+    for day, (lines, revenue) in per_day.items():
+        _bump(DailyStats, {'day': day}, line_count=lines, revenue=revenue)
+    for (day, categorie), (lines, quantity, revenue) in per_category.items():
+        _bump(
+            DailyCategoryStats, {'day': day, 'Categorie': categorie},
+            line_count=lines, quantity=quantity, revenue=revenue,
+        )
+    if per_day:
+        invalidate_summary()
+
+
+def record_lines(articles, sign=1):
+    """Ajoute (ou retire avec sign=-1) des lignes de commande aux compteurs."""
+    _apply_line_deltas(*_line_deltas(articles, sign))
+
+
+def remove_lines(articles):
+    """
+    Retire des compteurs les lignes du queryset `articles` avant leur
+    suppression en cascade (commande ou produit supprimé): une requête
+    d'agrégation par jour et catégorie, au lieu de charger la commande et
+    le produit de chaque ligne.
+    """
+    per_day = defaultdict(lambda: [0, Decimal('0.00')])
+    per_category = {}
+    for row in (
+        articles.annotate(day=TruncDate('order__created_at'), cat=F('product__Categorie'))
+        .values('day', 'cat')
+        .annotate(lines=Count('id'), qty=Sum('quantity'), revenue=Sum(OrderArticle.subtotal_expression()))
+        .order_by()
+    ):
+        per_day[row['day']][0] -= row['lines']
+        per_day[row['day']][1] -= row['revenue']
+        per_category[(row['day'], row['cat'])] = (-row['lines'], -row['qty'], -row['revenue'])
+    _apply_line_deltas(per_day, per_category)
+
+
+def defer_lines(articles):
+    """
+    Comme record_lines, mais hors de la transaction de la requête: la
+    contribution des lignes est calculée tout de suite et appliquée par une
+    tâche de fond (voir tasks.py). Les compteurs sont des sommes: qu'une modification ou une
+    suppression de ces lignes (signaux) soit comptée avant la tâche ne
+    change pas le résultat.
+    """
+    per_day, per_category = _line_deltas(articles)
+    if per_day:
+        tasks.enqueue(
+            apply_line_deltas,
+            days=[[day.isoformat(), lines, str(revenue)] for day, (lines, revenue) in per_day.items()],
+            categories=[
+                [day.isoformat(), categorie, lines, quantity, str(revenue)]
+                for (day, categorie), (lines, quantity, revenue) in per_category.items()
+            ],
+        )
+
+
+@tasks.register
+def apply_line_deltas(days, categories):
+    """Tâche de defer_lines: applique une contribution sérialisée en JSON."""
+    _apply_line_deltas(
+        {date.fromisoformat(day): (lines, Decimal(revenue)) for day, lines, revenue in days},
+        {
+            (date.fromisoformat(day), categorie): (lines, quantity, Decimal(revenue))
+            for day, categorie, lines, quantity, revenue in categories
+        },
+    )
+
+
+def _compute_summary():
+    totals = DailyStats.objects.aggregate(
+        orders=Sum('order_count'), lines=Sum('line_count'), revenue=Sum('revenue'),
+    )
+    category_labels = dict(Product.CATEGORIE_CHOICES)
+    categories = [
+        {
+            'code': row['Categorie'],
+            'label': category_labels.get(row['Categorie'], row['Categorie']),
+            'quantity': row['quantity'],
+            'revenue': row['revenue'],
+        }
+        for row in DailyCategoryStats.objects.values('Categorie')
+        .annotate(quantity=Sum('quantity'), revenue=Sum('revenue'))
+        .order_by('-revenue')
+    ]
+    recent_days = list(
+        DailyStats.objects.order_by('-day').values('day', 'order_count', 'line_count', 'revenue')[:RECENT_DAYS]
+    )
+    return {
+        'total_products': Product.objects.count(),
+        'total_orders': totals['orders'] or 0,
+        'total_order_articles': totals['lines'] or 0,
+        'total_revenue': totals['revenue'] or Decimal('0.00'),
+        'revenue_by_category': categories,
+        'recent_days': recent_days,
+    }
+
+
+def get_summary():
+    """
+    Résumé du tableau de bord, lu depuis le cache (recalculé en 4 requêtes
+    au plus, sur la base principale).
+    """
+    summary = cache.get(SUMMARY_CACHE_KEY)
+    if summary is None:
+        with replicas.primary_reads():
+            summary = _compute_summary()
+        cache.set(SUMMARY_CACHE_KEY, summary, SUMMARY_CACHE_TIMEOUT)
+    return summary
+
+
+@transaction.atomic
+def rebuild():
+    """
+    Reconstruit tous les compteurs à partir des commandes existantes,
+    archives comprises (4 requêtes d'agrégation).
+    """
+    DailyStats.objects.all().delete()
+    DailyCategoryStats.objects.all().delete()
+
+    days = {}
+    for model in (Order, ArchivedOrder):
+        for row in (
+            model.objects.annotate(day=TruncDate('created_at')).values('day').annotate(orders=Count('id')).order_by()
+        ):
+            stats = days.setdefault(row['day'], DailyStats(day=row['day']))
+            stats.order_count += row['orders']
+
+    # Un même jour peut être en partie archivé: les lignes des deux tables s'additionnent
+    categories = {}
+    for model in (OrderArticle, ArchivedOrderArticle):
+        for row in (
+            model.objects.annotate(day=TruncDate('order__created_at'), cat=F('product__Categorie'))
+            .values('day', 'cat')
+            .annotate(lines=Count('id'), qty=Sum('quantity'), revenue=Sum(model.subtotal_expression()))
+            .order_by()
+        ):
+            bucket = categories.setdefault(
+                (row['day'], row['cat']), DailyCategoryStats(day=row['day'], Categorie=row['cat']),
+            )
+            bucket.line_count += row['lines']
+            bucket.quantity += row['qty']
+            bucket.revenue += row['revenue']
+            stats = days.setdefault(row['day'], DailyStats(day=row['day']))
+            stats.line_count += row['lines']
+            stats.revenue += row['revenue']
+
+    DailyStats.objects.bulk_create(days.values())
+    DailyCategoryStats.objects.bulk_create(categories.values())
+    invalidate_summary()
+    return len(days), len(categories)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food_app', '0003_order_total_price_line_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderarticle',
+            name='unit_price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True),
+        ),
+    ]
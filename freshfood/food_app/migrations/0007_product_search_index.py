@@ -0,0 +1,55 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    """Crée la table d'index adaptée à la base, puis l'alimente avec les produits existants."""
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS food_app_product_fts "
+            "USING fts5(label, description, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            "INSERT INTO food_app_product_fts (rowid, label, description) "
+            "SELECT id, label, description FROM food_app_product"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        schema_editor.execute(
+            "CREATE TABLE IF NOT EXISTS food_app_product_search ("
+            "product_id integer PRIMARY KEY REFERENCES food_app_product (id) ON DELETE CASCADE, "
+            "document tsvector NOT NULL)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS food_app_product_search_document_gin "
+            "ON food_app_product_search USING GIN (document)"
+        )
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS food_app_product_label_trgm "
+            "ON food_app_product USING GIN (label gin_trgm_ops)"
+        )
+        schema_editor.execute(
+            "INSERT INTO food_app_product_search (product_id, document) "
+            "SELECT id, setweight(to_tsvector('simple', label), 'A') "
+            "|| setweight(to_tsvector('simple', description), 'B') FROM food_app_product"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS food_app_product_fts")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS food_app_product_label_trgm")
+        schema_editor.execute("DROP TABLE IF EXISTS food_app_product_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food_app', '0006_daily_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food_app', '0009_product_sku'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='orderarticle',
+            index=models.Index(fields=['order', 'product'], name='orderarticle_order_product_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['label', 'id'], name='product_label_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['Categorie', 'label'], name='product_categorie_label_idx'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.5 on 2026-10-18 11:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food_app', '0010_access_path_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_categorie_label_idx',
+        ),
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['Categorie', 'label', 'id'], name='product_categorie_label_idx'),
+        ),
+    ]
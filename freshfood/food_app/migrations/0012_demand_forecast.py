@@ -0,0 +1,28 @@
+# Generated by Django 5.2.5 on 2026-10-18 12:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('food_app', '0011_product_categorie_label_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DemandForecast',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('quantity', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('method', models.CharField(choices=[('moving-average', 'moyenne mobile'), ('exponential-smoothing', 'lissage exponentiel')], max_length=30)),
+                ('computed_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='forecasts', to='food_app.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('day', 'product'), name='demand_forecast_unique')],
+            },
+        ),
+    ]
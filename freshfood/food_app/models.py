@@ -1,5 +1,10 @@
+from decimal import Decimal
+
 from django.db import models
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Prefetch, Sum, Value
+from django.db.models.functions import Coalesce
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 # Create your models here.
 
@@ -12,46 +17,288 @@ class Product(models.Model):
         ('aut', 'autre'),
     )
     label = models.CharField(max_length=100)
+    # Référence fournisseur: clé naturelle de l'import de catalogue (import_products)
+    sku = models.CharField(max_length=64, unique=True, blank=True, null=True)
     Categorie = models.CharField(choices=CATEGORIE_CHOICES, max_length=50, default='aut')
     price = models.DecimalField(max_digits=10, decimal_places=2, default=0) # Changement: Utiliser DecimalField pour la monnaie
     description = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        # Tri du catalogue JSON (label, id); liste regroupée et pages par catégorie (Categorie, label, id)
+        indexes = [
+            models.Index(fields=['label', 'id'], name='product_label_idx'),
+            models.Index(fields=['Categorie', 'label', 'id'], name='product_categorie_label_idx'),
+        ]
+
     def __str__(self):
         return self.label
     
+class OrderQuerySet(models.QuerySet):
+    """QuerySet réutilisable des commandes, sans N+1 sur les lignes et les totaux."""
+
+    def with_totals(self):
+        """Annote computed_total (somme quantité * prix) et computed_line_count en SQL."""
+        return self.annotate(**Order.computed_totals_expressions())
+
+    def with_lines(self):
+        """Pré-charge les lignes et leurs produits dans order.articles (2 requêtes au total)."""
+        return self.prefetch_related(
+            Prefetch(
+                'orderarticle_set',
+                queryset=OrderArticle.objects.select_related('product').order_by('pk'),
+                to_attr='articles',
+            )
+        )
+
+
 class Order(models.Model):
     customer = models.ForeignKey(User, on_delete=models.CASCADE)
     client_name = models.CharField(max_length=100, blank=True, null=True) 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+    # Totaux dénormalisés: maintenus à l'écriture (OrderView.post, vues OrderArticle)
+    # pour qu'une liste de N commandes ne coûte qu'une seule requête.
+    total_price = models.DecimalField(max_digits=12, decimal_places=2, default=0, db_index=True)
+    line_count = models.PositiveIntegerField(default=0)
+    # Clé fournie par le client (terminal de caisse) pour rendre la soumission
+    # idempotente: un renvoi après expiration ne crée pas de doublon.
+    idempotency_key = models.CharField(max_length=64, blank=True, null=True)
+
+    objects = OrderQuerySet.as_manager()
+
+    class Meta:
+        # Index alignés sur la pagination par clé (-created_at, -id)
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='order_created_id_idx'),
+            models.Index(fields=['customer', '-created_at', '-id'], name='order_customer_created_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['customer', 'idempotency_key'],
+                condition=models.Q(idempotency_key__isnull=False),
+                name='order_customer_idempotency_key_unique',
+            ),
+        ]
 
     def __str__(self):
         return self.client_name if self.client_name else f"Order {self.id}"
 
     # NOUVELLE MÉTHODE: Calcule le prix total de la commande
     def get_total_price(self):
-        """Calcule le prix total en sommant les sous-totaux de tous les articles."""
-        total = sum(article.get_subtotal() for article in self.orderarticle_set.all())
-        return total
+        """
+        Retourne le prix total sans requête supplémentaire, par ordre de priorité:
+        l'annotation de with_totals(), les lignes pré-chargées par with_lines(),
+        puis la valeur dénormalisée stockée.
+        """
+        if hasattr(self, 'computed_total'):
+            return self.computed_total
+        if hasattr(self, 'articles'):
+            return sum((article.get_subtotal() for article in self.articles), Decimal('0.00'))
+        return self.total_price
+
+    @staticmethod
+    def computed_totals_expressions(prefix='orderarticle__'):
+        """
+        Expressions d'agrégation (total, nombre de lignes) calculées en SQL
+        à partir des OrderArticle. Réutilisées par refresh_totals() et par
+        la commande de rattrapage.
+        """
+        return {
+            'computed_total': Coalesce(
+                Sum(OrderArticle.subtotal_expression(prefix)), Value(Decimal('0.00')),
+                output_field=DecimalField(max_digits=12, decimal_places=2),
+            ),
+            'computed_line_count': Count(f'{prefix}id'),
+        }
+
+    def refresh_totals(self, save=True):
+        """Recalcule total_price et line_count en une seule requête d'agrégation."""
+        totals = OrderArticle.objects.filter(order=self).aggregate(
+            **Order.computed_totals_expressions(prefix='')
+        )
+        self.total_price = totals['computed_total']
+        self.line_count = totals['computed_line_count']
+        if save:
+            # update() évite de toucher aux autres champs modifiés en parallèle;
+            # updated_at suit les lignes (clé des fragments en cache de la commande)
+            self.updated_at = timezone.now()
+            Order.objects.filter(pk=self.pk).update(
+                total_price=self.total_price, line_count=self.line_count, updated_at=self.updated_at
+            )
+        return self.total_price
 
 class OrderArticle(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField()
     order = models.ForeignKey(Order, on_delete=models.CASCADE)
+    # Prix unitaire figé au moment de la commande: modifier Product.price
+    # ne change plus les commandes passées. Nul uniquement pour les lignes
+    # antérieures non encore rattrapées (commande backfill_unit_prices).
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2, null=True, blank=True)
+
+    class Meta:
+        # Lignes d'un lot de commandes (with_lines) jointes à leur produit
+        # sans relire la table: order_id et product_id sont dans l'index
+        indexes = [
+            models.Index(fields=['order', 'product'], name='orderarticle_order_product_idx'),
+        ]
 
     def __str__(self):
         return f"{self.quantity} x {self.product.label}"
 
+    def save(self, *args, **kwargs):
+        if self.unit_price is None:
+            self.unit_price = self.product.price
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def subtotal_expression(prefix=''):
+        """Expression SQL quantité * prix unitaire figé (prix produit à défaut)."""
+        return ExpressionWrapper(
+            F(f'{prefix}quantity') * Coalesce(F(f'{prefix}unit_price'), F(f'{prefix}product__price')),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        )
+
     # NOUVELLE MÉTHODE: Calcule le sous-total de cet article
     def get_subtotal(self):
-        """Calcule le sous-total: quantité * prix du produit au moment de la commande (actuel ici)."""
-        # Dans un scénario réel, vous devriez stocker le prix au moment de l'achat dans OrderArticle.
-        # Ici, nous utilisons le prix actuel du produit.
-        return self.quantity * self.product.price
-    
-    # PROPRIÉTÉ: Pour simuler l'accès à l'unit_price dans le template
-    @property
-    def unit_price(self):
-        return self.product.price
\ No newline at end of file
+        """Calcule le sous-total: quantité * prix unitaire figé lors de la commande."""
+        unit_price = self.unit_price if self.unit_price is not None else self.product.price
+        return self.quantity * unit_price
+
+
+class DailyStats(models.Model):
+    """Compteurs journaliers des commandes, maintenus de façon incrémentale (voir metrics.py)."""
+    day = models.DateField(unique=True)
+    order_count = models.PositiveIntegerField(default=0)
+    line_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    def __str__(self):
+        return f"{self.day}: {self.order_count} commande(s), {self.revenue}"
+
+
+class DailyCategoryStats(models.Model):
+    """Ventes journalières par catégorie de produit."""
+    day = models.DateField()
+    Categorie = models.CharField(choices=Product.CATEGORIE_CHOICES, max_length=50)
+    line_count = models.IntegerField(default=0)
+    quantity = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['day', 'Categorie'], name='daily_category_stats_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} / {self.get_Categorie_display()}: {self.revenue}"
+
+
+class DemandForecast(models.Model):
+    """Quantité prévue d'un produit pour un jour (voir forecasting.py)."""
+    METHOD_CHOICES = (
+        ('moving-average', 'moyenne mobile'),
+        ('exponential-smoothing', 'lissage exponentiel'),
+    )
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='forecasts')
+    day = models.DateField()
+    quantity = models.DecimalField(max_digits=10, decimal_places=2)
+    method = models.CharField(choices=METHOD_CHOICES, max_length=30)
+    computed_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # Sert aussi d'index pour le tableau de bord (prévisions d'un jour)
+            models.UniqueConstraint(fields=['day', 'product'], name='demand_forecast_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.day} / {self.product_id}: {self.quantity}"
+
+
+class Task(models.Model):
+    """Tâche de fond en file, exécutée par « manage.py worker » (voir tasks.py)."""
+    PENDING = 'pending'
+    RUNNING = 'running'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, 'en attente'),
+        (RUNNING, 'en cours'),
+        (FAILED, 'échouée'),
+    )
+    name = models.CharField(max_length=200)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(choices=STATUS_CHOICES, max_length=10, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    # Due à partir de cet instant; pour une tâche en cours, fin du bail du worker
+    run_after = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Réclamation des tâches dues: status IN (...) AND run_after <= maintenant
+            models.Index(fields=['status', 'run_after'], name='task_status_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()}, {self.attempts} tentative(s))"
+
+
+class ArchivedOrder(models.Model):
+    """
+    Commande ancienne déplacée hors de Order (voir archive.py), en lecture
+    seule. Elle garde son identifiant: /orders/<id>/ la retrouve.
+    """
+    id = models.IntegerField(primary_key=True)
+    customer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_orders')
+    client_name = models.CharField(max_length=100, blank=True, null=True)
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    total_price = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    line_count = models.PositiveIntegerField(default=0)
+    idempotency_key = models.CharField(max_length=64, blank=True, null=True)
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Exports par période et reconstruction des statistiques
+            models.Index(fields=['created_at', 'id'], name='archived_order_created_idx'),
+        ]
+
+    def __str__(self):
+        return self.client_name if self.client_name else f"Order {self.id}"
+
+    def get_total_price(self):
+        return self.total_price
+
+
+class ArchivedOrderArticle(models.Model):
+    """Ligne d'une commande archivée, prix unitaire toujours figé."""
+    id = models.IntegerField(primary_key=True)
+    order = models.ForeignKey(ArchivedOrder, on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, on_delete=models.CASCADE)
+    quantity = models.PositiveIntegerField()
+    unit_price = models.DecimalField(max_digits=10, decimal_places=2)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['order', 'product'], name='archived_article_order_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.product.label}"
+
+    @staticmethod
+    def subtotal_expression(prefix=''):
+        """Expression SQL quantité * prix unitaire (même sortie qu'OrderArticle.subtotal_expression)."""
+        return ExpressionWrapper(
+            F(f'{prefix}quantity') * F(f'{prefix}unit_price'),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        )
+
+    def get_subtotal(self):
+        return self.quantity * self.unit_price
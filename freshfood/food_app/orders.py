@@ -0,0 +1,165 @@
+"""
+Logique de prise de commande partagée par les points d'entrée
+(OrderView synchrone, AsyncOrderView, API par lots OrderBatchView).
+
+La validation du panier est séparée de l'écriture: les produits peuvent
+être chargés par n'importe quel moyen (ORM synchrone ou asynchrone, une
+requête pour tout un lot), puis place_order() écrit la commande et ses
+lignes dans une seule transaction.
+"""
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+
+from . import fragments, metrics
+from .models import ArchivedOrder, Order, OrderArticle, Product
+
+MAX_BATCH_SIZE = 500
+IDEMPOTENCY_KEY_MAX_LENGTH = Order._meta.get_field('idempotency_key').max_length
+
+
+def cart_product_ids(cart_items):
+    """IDs de produits référencés par un panier (sans doublon)."""
+    return list({item.get('product_id') for item in cart_items if item.get('product_id') is not None})
+
+
+def build_lines(cart_items, product_map):
+    """
+    Construit les OrderArticle (non enregistrés) d'un panier à partir d'un
+    dictionnaire {id: Product} déjà chargé. Les lignes de quantité nulle ou
+    de produit inconnu sont ignorées.
+
+    Retourne (lignes, total). Lève ValueError si aucune ligne n'est valide.
+    """
+    order_articles = []
+    total_price = Decimal('0.00')
+    for item in cart_items:
+        product_id = item.get('product_id')
+        quantity = int(item.get('quantity', 0))
+
+        if quantity > 0 and product_id in product_map:
+            product = product_map[product_id]
+            total_price += quantity * product.price
+            order_articles.append(
+                OrderArticle(product=product, quantity=quantity, unit_price=product.price)
+            )
+
+    if not order_articles:
+        raise ValueError("Aucun article valide trouvé dans le panier.")
+    return order_articles, total_price
+
+
+@transaction.atomic
+def place_order(customer, client_name, order_articles, total_price):
+    """
+    Enregistre la commande (totaux dénormalisés inclus) et ses lignes,
+    atomiquement. Le comptage des lignes dans les statistiques est mis en
+    file pour après la validation (metrics.defer_lines).
+    """
+    order = Order.objects.create(
+        customer=customer,
+        client_name=client_name or customer.username,
+        total_price=total_price,
+        line_count=len(order_articles),
+    )
+    for article in order_articles:
+        article.order = order
+
+    OrderArticle.objects.bulk_create(order_articles)
+    # bulk_create n'émet pas de signaux: compteurs et fragments mis à jour explicitement
+    metrics.defer_lines(order_articles)
+    fragments.invalidate(OrderArticle)
+    return order
+
+
+def place_orders_batch(customer, carts):
+    """
+    Enregistre un lot de paniers pour un même client, de façon idempotente.
+
+    Chaque panier porte une « idempotency_key »: une clé déjà enregistrée
+    pour ce client renvoie la commande existante au lieu d'en créer une
+    autre, y compris si elle a été archivée depuis. Le coût en requêtes ne
+    dépend pas de la taille du lot: une requête pour les clés existantes
+    (commandes courantes et archivées), une pour tous les produits, un
+    bulk_create pour les commandes et un pour toutes les lignes.
+
+    Retourne un résultat par panier, dans l'ordre:
+    {'idempotency_key', 'status': 'created' | 'existing' | 'rejected', 'order_id' | 'error'}.
+    """
+    try:
+        return _place_orders_batch(customer, carts)
+    except IntegrityError:
+        # Lot concurrent avec les mêmes clés: elles existent désormais, on les relit
+        return _place_orders_batch(customer, carts)
+
+
+@transaction.atomic
+def _place_orders_batch(customer, carts):
+    results = [None] * len(carts)
+    first_index_by_key = {}
+    for index, cart in enumerate(carts):
+        key = cart.get('idempotency_key') if isinstance(cart, dict) else None
+        if not isinstance(key, str) or not key or len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            results[index] = {'idempotency_key': key, 'status': 'rejected',
+                              'error': "Clé d'idempotence manquante ou invalide."}
+        elif key in first_index_by_key:
+            results[index] = {'idempotency_key': key, 'status': 'rejected',
+                              'error': "Clé d'idempotence en double dans le lot."}
+        else:
+            first_index_by_key[key] = index
+
+    keys = list(first_index_by_key)
+    existing = dict(
+        Order.objects.filter(customer=customer, idempotency_key__in=keys).values_list('idempotency_key', 'id')
+        .union(
+            ArchivedOrder.objects.filter(customer=customer, idempotency_key__in=keys)
+            .values_list('idempotency_key', 'id')
+        )
+    )
+    for key, order_id in existing.items():
+        results[first_index_by_key.pop(key)] = {'idempotency_key': key, 'status': 'existing', 'order_id': order_id}
+
+    # Une seule requête pour tous les produits du lot
+    # (les paniers mal formés sont rejetés plus bas, par build_lines)
+    product_ids = set()
+    for index in first_index_by_key.values():
+        items = carts[index].get('cart_items')
+        if isinstance(items, list):
+            product_ids.update(
+                item['product_id'] for item in items
+                if isinstance(item, dict) and isinstance(item.get('product_id'), int)
+            )
+    product_map = Product.objects.in_bulk(list(product_ids))
+
+    new_orders, lines_by_order = [], []
+    for key, index in first_index_by_key.items():
+        cart = carts[index]
+        try:
+            order_articles, total_price = build_lines(cart.get('cart_items') or [], product_map)
+        except (ValueError, TypeError, AttributeError) as e:
+            results[index] = {'idempotency_key': key, 'status': 'rejected', 'error': str(e)}
+            continue
+        new_orders.append(Order(
+            customer=customer,
+            client_name=cart.get('client_name') or customer.username,
+            total_price=total_price,
+            line_count=len(order_articles),
+            idempotency_key=key,
+        ))
+        lines_by_order.append((index, order_articles))
+
+    if new_orders:
+        Order.objects.bulk_create(new_orders)
+        all_lines = []
+        for order, (index, order_articles) in zip(new_orders, lines_by_order):
+            for article in order_articles:
+                article.order = order
+            all_lines.extend(order_articles)
+            results[index] = {'idempotency_key': order.idempotency_key, 'status': 'created', 'order_id': order.id}
+        OrderArticle.objects.bulk_create(all_lines, batch_size=1000)
+        # bulk_create n'émet pas de signaux: compteurs et fragments mis à jour explicitement,
+        # les lignes par une tâche de fond comme pour une commande seule
+        metrics.record_orders(new_orders)
+        metrics.defer_lines(all_lines)
+        fragments.invalidate(Order, OrderArticle)
+    return results
@@ -0,0 +1,173 @@
+"""
+Pagination par clé (« keyset ») pour les listes volumineuses.
+
+Contrairement à la pagination par OFFSET (ListView.paginate_by), la page
+suivante est décrite par les valeurs de tri de la dernière ligne affichée:
+la base lit directement l'index à partir de ce point, si bien qu'une page
+profonde coûte autant que la première. Les jetons « after » / « before »
+sont signés et ne dépendent que de la ligne de référence: ils restent
+stables même si de nouvelles commandes sont insérées entre-temps.
+"""
+import datetime
+
+from django.core import signing
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.http import Http404, JsonResponse
+
+CURSOR_SALT = 'food_app.pagination.cursor'
+
+
+def encode_cursor(values):
+    """Encode les valeurs de tri d'une ligne en jeton opaque et signé."""
+    payload = [v.isoformat() if isinstance(v, (datetime.date, datetime.datetime)) else v for v in values]
+    return signing.dumps(payload, salt=CURSOR_SALT)
+
+
+def decode_cursor(token, fields):
+    """Décode un jeton et reconvertit chaque valeur avec le champ de modèle correspondant."""
+    try:
+        payload = signing.loads(token, salt=CURSOR_SALT)
+    except signing.BadSignature:
+        raise Http404("Curseur de pagination invalide.")
+    if not isinstance(payload, list) or len(payload) != len(fields):
+        raise Http404("Curseur de pagination invalide.")
+    return [field.to_python(value) for field, value in zip(fields, payload)]
+
+
+class CountedPaginator(Paginator):
+    """Pagination par OFFSET dont le nombre total est déjà connu (compteur en cache): pas de COUNT(*)."""
+
+    def __init__(self, object_list, per_page, count, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count = count
+
+
+class KeysetPage:
+    """Page de résultats, compatible avec l'usage de page_obj dans les templates."""
+
+    def __init__(self, object_list, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    Pagine un QuerySet selon un tri strict et total, par exemple
+    ('-created_at', '-id'). Le dernier champ doit être unique (la clé primaire).
+    """
+
+    def __init__(self, queryset, ordering, per_page):
+        self.queryset = queryset
+        self.ordering = tuple(ordering)
+        self.per_page = per_page
+        self.names = [name.lstrip('-') for name in self.ordering]
+        self.fields = [self._resolve_field(name) for name in self.names]
+
+    def _resolve_field(self, name):
+        model = self.queryset.model
+        *path, last = name.split('__')
+        for part in path:
+            model = model._meta.get_field(part).related_model
+        return model._meta.get_field(last)
+
+    def _seek(self, values, forward):
+        """Condition lexicographique « strictement après » (ou avant) la ligne de référence."""
+        condition = Q()
+        for index, (spec, value) in enumerate(zip(self.ordering, values)):
+            descending = spec.startswith('-')
+            lookup = 'lt' if descending == forward else 'gt'
+            name = self.names[index]
+            term = Q(**{f'{name}__{lookup}': value})
+            for prev_name, prev_value in zip(self.names[:index], values[:index]):
+                term &= Q(**{prev_name: prev_value})
+            condition |= term
+        return condition
+
+    def _key(self, obj):
+        values = []
+        for name in self.names:
+            value = obj
+            for part in name.split('__'):
+                value = getattr(value, part)
+            values.append(value)
+        return values
+
+    def page(self, after=None, before=None):
+        if before:
+            values = decode_cursor(before, self.fields)
+            reversed_ordering = [name[1:] if name.startswith('-') else f'-{name}' for name in self.ordering]
+            rows = list(
+                self.queryset.filter(self._seek(values, forward=False))
+                .order_by(*reversed_ordering)[:self.per_page + 1]
+            )
+            has_more = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            has_previous, has_next = has_more, True
+        else:
+            queryset = self.queryset
+            if after:
+                queryset = queryset.filter(self._seek(decode_cursor(after, self.fields), forward=True))
+            rows = list(queryset.order_by(*self.ordering)[:self.per_page + 1])
+            has_next = len(rows) > self.per_page
+            rows = rows[:self.per_page]
+            has_previous = bool(after)
+
+        next_cursor = encode_cursor(self._key(rows[-1])) if rows and has_next else None
+        previous_cursor = encode_cursor(self._key(rows[0])) if rows and has_previous else None
+        return KeysetPage(rows, next_cursor, previous_cursor)
+
+
+class KeysetPaginationMixin:
+    """
+    Mixin pour ListView: remplace la pagination par OFFSET par une pagination
+    par clé (paramètres GET « after » et « before ») et sert la même page en
+    JSON quand le client le demande (?format=json ou en-tête Accept).
+    """
+
+    keyset_ordering = ('-created_at', '-id')
+    paginate_by = 20
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(queryset, self.keyset_ordering, page_size)
+        page = paginator.page(
+            after=self.request.GET.get('after'),
+            before=self.request.GET.get('before'),
+        )
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+    def wants_json(self):
+        if self.request.GET.get('format') == 'json':
+            return True
+        accept = self.request.headers.get('Accept', '')
+        return 'application/json' in accept and 'text/html' not in accept
+
+    def serialize_object(self, obj):
+        """Représentation JSON d'un élément; à surcharger par chaque vue."""
+        return {'id': obj.pk}
+
+    def render_to_response(self, context, **response_kwargs):
+        if not self.wants_json():
+            return super().render_to_response(context, **response_kwargs)
+        page = context['page_obj']
+        return JsonResponse({
+            'results': [self.serialize_object(obj) for obj in page.object_list],
+            'next': page.next_cursor,
+            'previous': page.previous_cursor,
+        })
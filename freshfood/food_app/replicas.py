@@ -0,0 +1,152 @@
+"""
+Lectures des vues de consultation sur une réplique de la base.
+
+Les vues qui ne font que lire (liste des commandes, historique client,
+exports) héritent de ReplicaReadMixin: pendant une
+requête GET, les lectures des modèles de food_app partent vers l'alias
+désigné par le réglage FOOD_APP_READ_REPLICA. Tout le reste (écritures,
+sessions, utilisateurs, vues sans le mixin) reste sur la base principale.
+
+Lecture de ses propres écritures: dès qu'une requête écrit dans un modèle
+de food_app, ReplicaRoutingMiddleware pose un cookie qui ramène les
+lectures de ce navigateur sur la base principale pendant
+FOOD_APP_REPLICA_PIN_SECONDS secondes, le temps que la réplique rattrape
+son retard.
+
+Ce qui part dans un cache partagé (fragments de gabarits, résumé du
+tableau de bord) est calculé sur la base principale (primary_reads): lu
+sur une réplique en retard juste après une invalidation, il resterait
+périmé pour tous, auteur de l'écriture compris. Le tableau de bord, fait
+de ces seuls éléments, ne lit donc pas la réplique.
+
+Sans réplique configurée, le middleware se retire au démarrage et le
+routeur laisse tout sur la base par défaut.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS
+
+PIN_COOKIE_NAME = 'food_app_primary'
+DEFAULT_PIN_SECONDS = 10
+
+# État de la requête en cours (dict mutable: les threads de sync_to_async
+# copient le contexte mais partagent l'objet)
+_request_state = ContextVar('food_app_replica_request', default=None)
+
+
+def replica_alias():
+    return getattr(settings, 'FOOD_APP_READ_REPLICA', None)
+
+
+def pin_seconds():
+    return getattr(settings, 'FOOD_APP_REPLICA_PIN_SECONDS', DEFAULT_PIN_SECONDS)
+
+
+def read_database(request=None):
+    """Alias à utiliser pour les lectures de cette requête (la réplique sauf si épinglée)."""
+    alias = replica_alias()
+    if alias is None or (request is not None and PIN_COOKIE_NAME in request.COOKIES):
+        return DEFAULT_DB_ALIAS
+    return alias
+
+
+@contextmanager
+def primary_reads():
+    """Ramène les lectures sur la base principale le temps du bloc (valeurs mises en cache)."""
+    state = _request_state.get()
+    if state is None or not state['replica']:
+        yield
+        return
+    replica, state['replica'] = state['replica'], None
+    try:
+        yield
+    finally:
+        state['replica'] = replica
+
+
+class ReplicaRouter:
+    """Routeur: lectures de food_app sur la réplique pour les requêtes marquées par ReplicaReadMixin."""
+
+    def db_for_read(self, model, **hints):
+        state = _request_state.get()
+        if state and state['replica'] and model._meta.app_label == 'food_app':
+            return state['replica']
+        return None
+
+    def db_for_write(self, model, **hints):
+        state = _request_state.get()
+        if state is not None and model._meta.app_label == 'food_app':
+            state['wrote'] = True
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Mêmes données sur la principale et la réplique
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # La réplique reçoit le schéma par réplication, jamais par migrate
+        return db != replica_alias()
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Délimite l'état de routage de chaque requête (rendu des gabarits compris)
+    et épingle le navigateur sur la base principale après une écriture.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if replica_alias() is None:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        state = {'replica': None, 'wrote': False}
+        token = _request_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self.finish(state, response)
+
+    async def __acall__(self, request):
+        state = {'replica': None, 'wrote': False}
+        token = _request_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _request_state.reset(token)
+        return self.finish(state, response)
+
+    def finish(self, state, response):
+        if state['wrote']:
+            response.set_cookie(PIN_COOKIE_NAME, '1', max_age=pin_seconds(), httponly=True, samesite='Lax')
+        return response
+
+
+class ReplicaReadMixin:
+    """
+    Vue de consultation: ses lectures (GET/HEAD) vont sur la réplique.
+    self.read_db donne l'alias retenu, pour les lectures faites hors de la
+    requête (réponse en flux consommée après le middleware).
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        self.read_db = DEFAULT_DB_ALIAS
+        state = _request_state.get()
+        if state is not None and request.method in ('GET', 'HEAD'):
+            self.read_db = read_database(request)
+            if self.read_db != DEFAULT_DB_ALIAS:
+                state['replica'] = self.read_db
+        return super().dispatch(request, *args, **kwargs)
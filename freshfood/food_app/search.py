@@ -0,0 +1,215 @@
+"""
+Recherche plein texte des produits, avec un moteur adapté à la base utilisée.
+
+- SQLite: table virtuelle FTS5 ``food_app_product_fts`` (classement bm25).
+- PostgreSQL: table ``food_app_product_search`` (tsvector + index GIN) et
+  index trigramme sur le libellé pour la tolérance aux fautes de frappe.
+- Autres bases: repli sur ``icontains`` (balayage complet, sans classement).
+
+Les tables d'index sont créées par la migration 0007 et tenues à jour par
+les signaux post_save / post_delete de Product (voir signals.py). Les
+écritures en masse doivent appeler ``get_backend().rebuild()`` ensuite.
+
+Le moteur peut être forcé avec le réglage ``FOOD_APP_SEARCH_BACKEND``
+(chemin pointé vers une classe de ce module ou d'ailleurs).
+"""
+import re
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils.module_loading import import_string
+
+from .models import Product
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def tokenize(query):
+    """Découpe la saisie en mots; la ponctuation n'est jamais transmise au moteur."""
+    return TOKEN_RE.findall(query or '')[:10]
+
+
+class SearchResults:
+    """
+    Résultats classés, paginables par django.core.paginator.Paginator:
+    count() et le découpage par tranche ne lisent que la page demandée.
+    """
+
+    model = Product
+
+    def __init__(self, backend, tokens):
+        self.backend = backend
+        self.tokens = tokens
+        self._count = None
+
+    def count(self):
+        if self._count is None:
+            self._count = self.backend.count(self.tokens)
+        return self._count
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice):
+            return self[key:key + 1][0]
+        offset = key.start or 0
+        limit = (key.stop if key.stop is not None else self.count()) - offset
+        if limit <= 0:
+            return []
+        ids = self.backend.ranked_ids(self.tokens, limit, offset)
+        products = Product.objects.in_bulk(ids)
+        return [products[pk] for pk in ids if pk in products]
+
+
+class IContainsSearchBackend:
+    """Repli sans index: recherche par sous-chaîne sur le libellé et la description."""
+
+    def search(self, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return Product.objects.none()
+        condition = Q()
+        for token in tokens:
+            condition &= Q(label__icontains=token) | Q(description__icontains=token)
+        return Product.objects.filter(condition).order_by('label', 'id')
+
+    def index(self, product):
+        pass
+
+    def remove(self, product_id):
+        pass
+
+    def rebuild(self):
+        pass
+
+
+class SQLiteFTSSearchBackend:
+    """Index FTS5: préfixes (« pom » trouve « pomme »), accents ignorés, libellé pondéré x10."""
+
+    table = 'food_app_product_fts'
+
+    def _match(self, tokens):
+        return ' '.join(f'"{token}"*' for token in tokens)
+
+    def search(self, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return Product.objects.none()
+        return SearchResults(self, tokens)
+
+    def count(self, tokens):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {self.table} WHERE {self.table} MATCH %s', [self._match(tokens)])
+            return cursor.fetchone()[0]
+
+    def ranked_ids(self, tokens, limit, offset):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s '
+                f'ORDER BY bm25({self.table}, 10.0, 1.0), rowid LIMIT %s OFFSET %s',
+                [self._match(tokens), limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def index(self, product):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [product.pk])
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, label, description) VALUES (%s, %s, %s)',
+                [product.pk, product.label, product.description],
+            )
+
+    def remove(self, product_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [product_id])
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, label, description) '
+                f'SELECT id, label, description FROM {Product._meta.db_table}'
+            )
+
+
+class PostgresSearchBackend:
+    """tsvector (config 'simple', préfixes) + similarité trigramme sur le libellé."""
+
+    table = 'food_app_product_search'
+    document_sql = "setweight(to_tsvector('simple', %s), 'A') || setweight(to_tsvector('simple', %s), 'B')"
+    # Commandes d'un côté, fautes de frappe sur le libellé de l'autre
+    where_sql = 's.document @@ to_tsquery(\'simple\', %s) OR p.label %% %s'
+
+    def _tsquery(self, tokens):
+        return ' & '.join(f'{token}:*' for token in tokens)
+
+    def search(self, query):
+        tokens = tokenize(query)
+        if not tokens:
+            return Product.objects.none()
+        return SearchResults(self, tokens)
+
+    def _params(self, tokens):
+        return [self._tsquery(tokens), ' '.join(tokens)]
+
+    def count(self, tokens):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'SELECT COUNT(*) FROM {self.table} s JOIN {Product._meta.db_table} p ON p.id = s.product_id '
+                f'WHERE {self.where_sql}',
+                self._params(tokens),
+            )
+            return cursor.fetchone()[0]
+
+    def ranked_ids(self, tokens, limit, offset):
+        tsquery, text = self._params(tokens)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT p.id FROM {self.table} s JOIN {Product._meta.db_table} p ON p.id = s.product_id "
+                f"WHERE {self.where_sql} "
+                f"ORDER BY ts_rank(s.document, to_tsquery('simple', %s)) + similarity(p.label, %s) DESC, p.id "
+                f"LIMIT %s OFFSET %s",
+                [tsquery, text, tsquery, text, limit, offset],
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    def index(self, product):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {self.table} (product_id, document) VALUES (%s, {self.document_sql}) '
+                f'ON CONFLICT (product_id) DO UPDATE SET document = EXCLUDED.document',
+                [product.pk, product.label, product.description],
+            )
+
+    def remove(self, product_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE product_id = %s', [product_id])
+
+    def rebuild(self):
+        document = self.document_sql % ('label', 'description')
+        with connection.cursor() as cursor:
+            cursor.execute(f'TRUNCATE {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table} (product_id, document) '
+                f'SELECT id, {document} FROM {Product._meta.db_table}'
+            )
+
+
+BACKENDS_BY_VENDOR = {
+    'sqlite': SQLiteFTSSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+_backend = None
+
+
+def get_backend():
+    """Retourne le moteur configuré (réglage explicite, sinon selon la base par défaut)."""
+    global _backend
+    if _backend is None:
+        path = getattr(settings, 'FOOD_APP_SEARCH_BACKEND', None)
+        backend_class = import_string(path) if path else BACKENDS_BY_VENDOR.get(connection.vendor, IContainsSearchBackend)
+        _backend = backend_class()
+    return _backend
@@ -0,0 +1,151 @@
+"""
+Récepteurs de signaux de food_app.
+
+Ils couvrent les écritures unitaires (vues, admin, shell). Les écritures en
+masse (bulk_create, update) n'émettent pas de signaux: le code qui les
+effectue doit appeler explicitement les fonctions correspondantes.
+
+Dans un bloc suspended(), les récepteurs des commandes et de leurs lignes
+ne font rien: le code qui supprime ainsi des commandes par l'ORM
+(archivage) met lui-même à jour ce qui doit l'être.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_in, user_logged_out
+from django.db import connections
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from . import auth, catalog, fragments, metrics, search
+from .models import Order, OrderArticle, Product
+
+_suspended = ContextVar('food_app_signals_suspended', default=False)
+
+
+@contextmanager
+def suspended():
+    """Désactive les récepteurs de Order et OrderArticle le temps du bloc."""
+    token = _suspended.set(True)
+    try:
+        yield
+    finally:
+        _suspended.reset(token)
+
+
+@receiver(post_save, sender=Order)
+def order_saved(sender, instance, created, **kwargs):
+    if created and not _suspended.get():
+        metrics.record_order(instance)
+
+
+@receiver(post_delete, sender=Order)
+def order_deleted(sender, instance, **kwargs):
+    if not _suspended.get():
+        metrics.record_order(instance, sign=-1)
+
+
+@receiver(pre_delete, sender=Order)
+def order_before_delete(sender, instance, **kwargs):
+    # Lignes supprimées en cascade (commande supprimée seule, ou avec son client):
+    # retirées en une agrégation, voir order_article_deleted
+    if not _suspended.get():
+        metrics.remove_lines(OrderArticle.objects.filter(order=instance))
+
+
+@receiver(pre_delete, sender=Product)
+def product_before_delete(sender, instance, **kwargs):
+    if not _suspended.get():
+        metrics.remove_lines(OrderArticle.objects.filter(product=instance))
+
+
+def _deleted_directly(origin, model):
+    """Vrai si la suppression a été lancée sur une instance ou un queryset de `model` (pas une cascade)."""
+    return origin is None or isinstance(origin, model) or getattr(origin, 'model', None) is model
+
+
+@receiver(pre_save, sender=OrderArticle)
+def order_article_before_save(sender, instance, **kwargs):
+    # Mémorise l'état précédent de la ligne pour en retirer la contribution
+    instance._metrics_previous = None
+    if instance.pk and not _suspended.get():
+        instance._metrics_previous = (
+            OrderArticle.objects.select_related('order', 'product').filter(pk=instance.pk).first()
+        )
+
+
+@receiver(post_save, sender=OrderArticle)
+def order_article_saved(sender, instance, **kwargs):
+    if _suspended.get():
+        return
+    previous = getattr(instance, '_metrics_previous', None)
+    if previous is not None:
+        metrics.record_lines([previous], sign=-1)
+    metrics.record_lines([instance])
+
+
+@receiver(post_delete, sender=OrderArticle)
+def order_article_deleted(sender, instance, origin=None, **kwargs):
+    # Une cascade vient toujours d'une commande ou d'un produit supprimé: ligne déjà
+    # retirée par leur pre_delete
+    if not _suspended.get() and _deleted_directly(origin, OrderArticle):
+        metrics.record_lines([instance], sign=-1)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_changed(sender, **kwargs):
+    # Le nombre de produits fait partie du résumé mis en cache
+    metrics.invalidate_summary()
+    catalog.invalidate()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=Order)
+@receiver(post_delete, sender=Order)
+@receiver(post_save, sender=OrderArticle)
+@receiver(post_delete, sender=OrderArticle)
+def fragments_changed(sender, **kwargs):
+    # Les fragments englobants qui dépendent de ce modèle changent de clé
+    if sender is Product or not _suspended.get():
+        fragments.invalidate(sender)
+
+
+@receiver(post_save, sender=Product)
+def product_indexed(sender, instance, **kwargs):
+    search.get_backend().index(instance)
+
+
+@receiver(post_delete, sender=Product)
+def product_unindexed(sender, instance, **kwargs):
+    search.get_backend().remove(instance.pk)
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    # Mot de passe, is_staff, is_active...: l'utilisateur en cache est périmé
+    auth.invalidate_user(instance.pk)
+
+
+@receiver(user_logged_in)
+def user_logged_in_cached(sender, request, user, **kwargs):
+    # Après la mise à jour de last_login (récepteur de django.contrib.auth, connecté avant)
+    auth.remember_user(user)
+
+
+@receiver(user_logged_out)
+def user_logged_out_uncached(sender, request, user, **kwargs):
+    if user is not None:
+        auth.invalidate_user(user.pk)
+
+
+@receiver(post_migrate)
+def sqlite_wal(sender, using, **kwargs):
+    # Mode enregistré dans le fichier de la base: posé une fois, pas à chaque connexion
+    connection = connections[using]
+    if sender.name == 'food_app' and connection.vendor == 'sqlite' and not connection.is_in_memory_db():
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode=WAL')
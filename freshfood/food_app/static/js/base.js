@@ -0,0 +1,21 @@
+// Menu mobile de la barre de navigation (base.html)
+document.addEventListener('DOMContentLoaded', () => {
+    const button = document.getElementById('mobile-menu-button');
+    const menu = document.getElementById('mobile-menu');
+    const iconOpen = document.getElementById('icon-open');
+    const iconClose = document.getElementById('icon-close');
+
+    if (button && menu) {
+        button.addEventListener('click', () => {
+            // Toggle visibility of the mobile menu
+            menu.classList.toggle('hidden');
+            // Toggle icons (bars <-> xmark)
+            iconOpen.classList.toggle('hidden');
+            iconClose.classList.toggle('hidden');
+
+            // Set ARIA attribute for accessibility
+            const isExpanded = button.getAttribute('aria-expanded') === 'true' || false;
+            button.setAttribute('aria-expanded', !isExpanded);
+        });
+    }
+});
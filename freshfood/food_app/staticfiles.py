@@ -0,0 +1,202 @@
+"""
+Fichiers statiques empreintés et précompressés, et leur service.
+
+collectstatic (stockage CompressedManifestStaticFilesStorage) écrit chaque
+fichier sous un nom qui contient l'empreinte de son contenu
+(css/styles.3f2a9c1b04de.css) et, à côté, ses variantes compressées .gz et
+.br (brotli si le paquet Brotli est installé). {% static %} renvoie le nom
+empreinté: après un déploiement l'URL change, le navigateur ne garde donc
+jamais une ancienne feuille de style.
+
+StaticAssetMiddleware sert STATIC_ROOT sans passer par les vues: la
+variante choisie selon Accept-Encoding, et pour un nom empreinté un
+Cache-Control « immutable » d'un an (le navigateur ne revalide plus).
+Les autres fichiers sont servis avec une courte durée et un ETag.
+"""
+import gzip
+import json
+import mimetypes
+import os
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.exceptions import MiddlewareNotUsed, SuspiciousFileOperation
+from django.http import FileResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+try:
+    import brotli
+except ImportError:
+    # Dépendance optionnelle: sans elle, seules les variantes .gz sont écrites
+    brotli = None
+
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.mjs', '.json', '.map', '.svg', '.txt', '.xml', '.html')
+# En dessous, l'en-tête gzip coûte plus qu'il ne fait gagner
+MIN_COMPRESS_SIZE = 200
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+DEFAULT_CACHE_CONTROL = 'public, max-age=60'
+
+# Variantes par ordre de préférence: (codage, suffixe)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def _compressors():
+    yield '.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    if brotli is not None:
+        yield '.br', lambda data: brotli.compress(data, quality=11)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Manifeste d'empreintes de Django, plus les variantes .gz/.br de chaque fichier compressible."""
+
+    def __init__(self, *args, manifest_strict=None, **kwargs):
+        # manifest_strict réglable par STORAGES['staticfiles']['OPTIONS']
+        super().__init__(*args, **kwargs)
+        if manifest_strict is not None:
+            self.manifest_strict = manifest_strict
+
+    def stored_name(self, name):
+        if not self.hashed_files and (settings.DEBUG or not self.manifest_strict):
+            # collectstatic pas encore lancé (développement, tests): nom d'origine.
+            # En production (manifest_strict), un manifeste absent reste une erreur.
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        names = set(paths) | set(self.hashed_files.values())
+        for name in sorted(names):
+            if name.endswith(COMPRESSIBLE_EXTENSIONS) and self.exists(name):
+                self.compress(name)
+
+    def compress(self, name):
+        path = self.path(name)
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < MIN_COMPRESS_SIZE:
+            return
+        for suffix, compress in _compressors():
+            compressed = compress(data)
+            # Une variante à peine plus petite ne vaut pas le décodage côté client
+            if len(compressed) < len(data) * 0.95:
+                with open(path + suffix, 'wb') as f:
+                    f.write(compressed)
+
+
+def accepted_encodings(header):
+    """Codages acceptés par le client (q=0 exclu), d'après l'en-tête Accept-Encoding."""
+    accepted = set()
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if coding:
+            accepted.add(coding.strip().lower())
+    return accepted
+
+
+class StaticAssetMiddleware:
+    """
+    Sert les fichiers de STATIC_ROOT (après collectstatic), avant sessions
+    et authentification. Retiré au démarrage si FOOD_APP_SERVE_STATIC est
+    faux (développement: runserver sert les fichiers) ou si STATIC_URL
+    pointe vers un autre domaine (CDN).
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        prefix = settings.STATIC_URL or ''
+        if not getattr(settings, 'FOOD_APP_SERVE_STATIC', False) or not settings.STATIC_ROOT \
+                or not prefix.startswith('/'):
+            raise MiddlewareNotUsed
+        self.prefix = prefix
+        self.root = str(settings.STATIC_ROOT)
+        self.immutable = self.hashed_names()
+        # Fichiers trouvés dans STATIC_ROOT (bornés par son contenu), fixes jusqu'au prochain déploiement
+        self.files = {}
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        response = self.serve(request)
+        if response is None:
+            response = self.get_response(request)
+        return response
+
+    async def __acall__(self, request):
+        response = self.serve(request)
+        if response is None:
+            response = await self.get_response(request)
+        return response
+
+    def hashed_names(self):
+        """Noms empreintés du manifeste de collectstatic (leur contenu ne change jamais)."""
+        try:
+            with open(os.path.join(self.root, ManifestStaticFilesStorage.manifest_name)) as f:
+                return set(json.load(f)['paths'].values())
+        except (OSError, ValueError, KeyError):
+            return set()
+
+    def find(self, name):
+        """(chemin, {codage: (chemin, taille, mtime)}) d'un fichier de STATIC_ROOT, ou None."""
+        entry = self.files.get(name)
+        if entry is not None:
+            return entry
+        try:
+            path = safe_join(self.root, name)
+        except SuspiciousFileOperation:
+            return None
+        if not os.path.isfile(path):
+            # Absences non retenues: les noms demandés sont arbitraires, le dictionnaire grossirait sans fin
+            return None
+        variants = {}
+        for encoding, suffix in (('identity', ''),) + ENCODINGS:
+            if os.path.isfile(path + suffix):
+                stat = os.stat(path + suffix)
+                variants[encoding] = (path + suffix, stat.st_size, stat.st_mtime)
+        entry = self.files[name] = (path, variants)
+        return entry
+
+    def serve(self, request):
+        if request.method not in ('GET', 'HEAD') or not request.path.startswith(self.prefix):
+            return None
+        name = request.path[len(self.prefix):]
+        entry = self.find(name)
+        if entry is None:
+            return None
+        path, variants = entry
+        accepted = accepted_encodings(request.headers.get('Accept-Encoding', ''))
+        encoding = next((coding for coding, _ in ENCODINGS if coding in variants and coding in accepted), 'identity')
+        variant_path, size, mtime = variants[encoding]
+
+        etag = f'"{int(mtime):x}-{size:x}-{encoding}"'
+        response = get_conditional_response(request, etag=etag, last_modified=int(mtime))
+        if response is None:
+            content_type, _ = mimetypes.guess_type(path)
+            response = FileResponse(open(variant_path, 'rb'), content_type=content_type or 'application/octet-stream')
+            # Pas de « inline; filename=styles.css.br »: le navigateur garderait le nom de la variante
+            del response['Content-Disposition']
+            if encoding != 'identity':
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(int(mtime))
+        if len(variants) > 1:
+            response['Vary'] = 'Accept-Encoding'
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL if name in self.immutable else DEFAULT_CACHE_CONTROL
+        return response
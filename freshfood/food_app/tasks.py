@@ -0,0 +1,200 @@
+"""
+File de tâches de fond locale, stockée en base (table food_app_task).
+
+Le travail qui suit une écriture sans être nécessaire à la réponse (mise à
+jour des compteurs du tableau de bord après une commande, par exemple) est
+confié à une tâche. enqueue() l'enregistre une fois la transaction
+courante validée: rien n'est mis en file si elle est annulée. Le
+processus « manage.py worker » l'exécute ensuite; il n'y a pas de
+courtier externe, la base sert de file.
+
+Le worker est un processus à part, déclaré par le réglage
+FOOD_APP_TASK_WORKER. Sans lui, rien ne viderait la file (les compteurs du
+tableau de bord cesseraient d'avancer): la tâche est alors exécutée dans
+le processus qui la crée, juste après la validation. En cas d'échec, elle
+est mise en file pour « manage.py worker --once ».
+
+Réclamation: un worker prend un lot de tâches dues dans une transaction et
+les marque « en cours » pour la durée d'un bail. Sur PostgreSQL,
+select_for_update(skip_locked=True) laisse plusieurs workers se partager
+la file sans s'attendre. SQLite ignore select_for_update, mais ses
+transactions IMMEDIATE (voir DATABASES) prennent le verrou d'écriture dès
+le début: les réclamations y sont sérialisées. Une tâche dont le worker a
+disparu redevient due à la fin de son bail.
+
+Exécution: chaque tâche tourne dans sa propre transaction, qui la retire
+aussi de la file. Un échec annule ses écritures. La tâche est alors
+reprogrammée avec un délai qui double à chaque tentative, puis marquée
+échouée après max_attempts tentatives (« manage.py worker --retry-failed »
+la remet en file).
+
+Seules les fonctions décorées par @register peuvent être exécutées; la
+tâche enregistre le chemin du module et le nom de la fonction, avec ses
+arguments nommés sérialisés en JSON.
+"""
+import importlib
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BATCH_SIZE = 50
+LEASE_SECONDS = 300
+RETRY_BASE_SECONDS = 10
+RETRY_MAX_SECONDS = 3600
+
+_registry = {}
+
+
+class _Reclaimed(Exception):
+    """Le bail a expiré et un autre worker a repris la tâche: ce résultat est abandonné."""
+
+
+def task_name(func):
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def register(func):
+    """Décorateur: autorise l'exécution de la fonction comme tâche."""
+    _registry[task_name(func)] = func
+    return func
+
+
+def get_handler(name):
+    if name not in _registry:
+        # Le module qui déclare la tâche n'est pas forcément encore importé par le worker
+        try:
+            importlib.import_module(name.rpartition('.')[0])
+        except ImportError:
+            pass
+    try:
+        return _registry[name]
+    except KeyError:
+        raise LookupError(f"Tâche inconnue: {name}.") from None
+
+
+def worker_enabled():
+    return getattr(settings, 'FOOD_APP_TASK_WORKER', False)
+
+
+def enqueue(func, *, max_attempts=DEFAULT_MAX_ATTEMPTS, **payload):
+    """
+    Met func(**payload) en file après la validation de la transaction
+    courante (tout de suite hors transaction), ou l'exécute à ce moment-là
+    sans worker déclaré.
+    """
+    name = task_name(func)
+    if name not in _registry:
+        raise ValueError(f"{name} n'est pas enregistrée comme tâche (@tasks.register).")
+
+    def push():
+        Task.objects.create(name=name, payload=payload, max_attempts=max_attempts)
+
+    def run_inline():
+        try:
+            with transaction.atomic():
+                func(**payload)
+        except Exception:
+            logger.exception("Tâche %s en échec, mise en file pour le worker.", name)
+            push()
+
+    # robust: la transaction est déjà validée, un échec ne doit pas faire échouer la requête
+    transaction.on_commit(push if worker_enabled() else run_inline, robust=True)
+
+
+def retry_delay(attempts):
+    """Délai avant la tentative suivante: 10 s, 20 s, 40 s... plafonné à une heure."""
+    return timedelta(seconds=min(RETRY_BASE_SECONDS * 2 ** max(attempts - 1, 0), RETRY_MAX_SECONDS))
+
+
+def claim(batch_size=DEFAULT_BATCH_SIZE, lease=LEASE_SECONDS):
+    """
+    Réclame au plus batch_size tâches dues (en attente, ou en cours avec un
+    bail expiré), les plus anciennes d'abord. Retourne les tâches réclamées.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        ids = list(
+            Task.objects.filter(status__in=[Task.PENDING, Task.RUNNING], run_after__lte=now)
+            .order_by('run_after', 'id')
+            .select_for_update(skip_locked=True)
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+        Task.objects.filter(id__in=ids).update(
+            status=Task.RUNNING, attempts=F('attempts') + 1, run_after=now + timedelta(seconds=lease),
+        )
+        return list(Task.objects.filter(id__in=ids).order_by('id'))
+
+
+def run(task):
+    """Exécute une tâche réclamée. Retourne True si elle a réussi et quitté la file."""
+    try:
+        with transaction.atomic():
+            get_handler(task.name)(**task.payload)
+            # Retirée avec ses effets, sauf si un autre worker l'a reprise entre-temps
+            if not Task.objects.filter(pk=task.pk, attempts=task.attempts).delete()[0]:
+                raise _Reclaimed
+    except _Reclaimed:
+        logger.warning("Tâche %s (%s) reprise par un autre worker, résultat abandonné.", task.pk, task.name)
+        return False
+    except Exception as e:
+        fail(task, e)
+        return False
+    return True
+
+
+def fail(task, error):
+    """Reprogramme la tâche après un échec, ou la marque échouée à la dernière tentative."""
+    now = timezone.now()
+    if task.attempts >= task.max_attempts:
+        status, run_after = Task.FAILED, now
+        logger.error("Tâche %s (%s) échouée après %s tentative(s): %s", task.pk, task.name, task.attempts, error)
+    else:
+        status, run_after = Task.PENDING, now + retry_delay(task.attempts)
+        logger.warning("Tâche %s (%s) en échec, nouvelle tentative à %s: %s", task.pk, task.name, run_after, error)
+    Task.objects.filter(pk=task.pk, attempts=task.attempts).update(
+        status=status, run_after=run_after, last_error=''.join(traceback.format_exception(error)),
+    )
+
+
+def release(claimed):
+    """Rend à la file, sans compter de tentative, des tâches réclamées mais pas exécutées."""
+    for task in claimed:
+        Task.objects.filter(pk=task.pk, attempts=task.attempts).update(
+            status=Task.PENDING, attempts=F('attempts') - 1, run_after=timezone.now(),
+        )
+
+
+def run_batch(batch_size=DEFAULT_BATCH_SIZE, lease=LEASE_SECONDS, should_stop=None):
+    """
+    Réclame et exécute un lot; s'arrête entre deux tâches si should_stop()
+    devient vrai, et rend alors les autres à la file. Retourne (tâches
+    réussies, tâches en échec).
+    """
+    succeeded = failed = 0
+    claimed = claim(batch_size, lease)
+    for index, task in enumerate(claimed):
+        if should_stop is not None and should_stop():
+            release(claimed[index:])
+            break
+        if run(task):
+            succeeded += 1
+        else:
+            failed += 1
+    return succeeded, failed
+
+
+def retry_failed():
+    """Remet en file les tâches échouées, avec un nouveau compte de tentatives."""
+    return Task.objects.filter(status=Task.FAILED).update(status=Task.PENDING, attempts=0, run_after=timezone.now())
@@ -0,0 +1,51 @@
+"""
+{% fragment %}: cache de fragments de gabarits (voir food_app/fragments.py).
+
+    {% load fragment_cache %}
+    {% fragment "product-list-page" page_obj.number depends="product" %}
+        {% for product in products %}
+            {% fragment "product-card" product %}...{% endfragment %}
+        {% endfor %}
+    {% endfragment %}
+
+Les arguments après le nom font varier la clé (un objet de modèle par sa
+clé primaire et son updated_at); depends liste les modèles dont
+l'écriture invalide le fragment.
+"""
+from django import template
+
+from .. import fragments
+
+register = template.Library()
+
+
+class FragmentNode(template.Node):
+    def __init__(self, nodelist, name, vary_on, depends):
+        self.nodelist = nodelist
+        self.name = name
+        self.vary_on = vary_on
+        self.depends = depends
+
+    def render(self, context):
+        depends = self.depends.resolve(context).split() if self.depends else ()
+        return fragments.get_or_render(
+            self.name.resolve(context),
+            lambda: self.nodelist.render(context),
+            vary_on=[var.resolve(context) for var in self.vary_on],
+            depends=depends,
+        )
+
+
+@register.tag('fragment')
+def do_fragment(parser, token):
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' attend au moins un nom de fragment.")
+    nodelist = parser.parse(('endfragment',))
+    parser.delete_first_token()
+    depends = None
+    if bits[-1].startswith('depends='):
+        depends = parser.compile_filter(bits.pop()[len('depends='):])
+    return FragmentNode(
+        nodelist, parser.compile_filter(bits[1]), [parser.compile_filter(bit) for bit in bits[2:]], depends,
+    )
@@ -1,3 +1,1832 @@
-from django.test import TestCase
+import csv
+import datetime
+import gzip
+import json
+import os
+import re
+import tempfile
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.http import HttpResponse
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Sum
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (
+    auth, benchmarking, catalog, catalog_import, exports, forecasting, fragments, instrumentation, metrics, orders,
+    replicas, search, staticfiles, tasks,
+)
+from .models import (
+    ArchivedOrder, DailyCategoryStats, DailyStats, DemandForecast, Order, OrderArticle, Product, Task,
+)
+
+# Configuration de production recommandée: sessions cached_db dans un cache partagé.
+# Dans le processus de test, le cache LocMem « sessions » en tient lieu. Sans lui,
+# lire la session coûte une requête de plus (voir SessionAuthCacheTests).
+shared_session_cache = override_settings(
+    SESSION_ENGINE='django.contrib.sessions.backends.cached_db', SESSION_CACHE_ALIAS='sessions',
+)
+
+
+class OrderTotalsTests(TestCase):
+    """Totaux dénormalisés Order.total_price / Order.line_count."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('client', password='pass1234')
+        cls.staff = User.objects.create_user('admin', password='pass1234', is_staff=True)
+        cls.apple = Product.objects.create(label='Pomme', price=Decimal('2.50'), description='', Categorie='fru')
+        cls.carrot = Product.objects.create(label='Carotte', price=Decimal('1.00'), description='', Categorie='leg')
+
+    def post_order(self, cart_items):
+        self.client.force_login(self.user)
+        return self.client.post(
+            reverse('order-view'),
+            data=json.dumps({'client_name': 'Test', 'cart_items': cart_items}),
+            content_type='application/json',
+        )
+
+    def test_order_view_stores_totals(self):
+        response = self.post_order([
+            {'product_id': self.apple.id, 'quantity': 2},
+            {'product_id': self.carrot.id, 'quantity': 3},
+        ])
+        self.assertEqual(response.status_code, 201)
+        order = Order.objects.get(pk=response.json()['order_id'])
+        self.assertEqual(order.total_price, Decimal('8.00'))
+        self.assertEqual(order.line_count, 2)
+        self.assertEqual(order.get_total_price(), Decimal('8.00'))
+
+    def test_invalid_cart_creates_no_order(self):
+        response = self.post_order([{'product_id': 999, 'quantity': 1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Order.objects.exists())
+
+    def test_order_article_views_refresh_totals(self):
+        order = Order.objects.create(customer=self.user)
+        self.client.force_login(self.user)
+
+        self.client.post(reverse('orderarticle-create'), {
+            'product': self.apple.id, 'quantity': 4, 'order': order.id,
+        })
+        order.refresh_from_db()
+        self.assertEqual((order.total_price, order.line_count), (Decimal('10.00'), 1))
+
+        article = OrderArticle.objects.get(order=order)
+        other = Order.objects.create(customer=self.user)
+        self.client.post(reverse('orderarticle-update', args=[article.id]), {
+            'product': self.carrot.id, 'quantity': 1, 'order': other.id,
+        })
+        order.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual((order.total_price, order.line_count), (Decimal('0.00'), 0))
+        self.assertEqual((other.total_price, other.line_count), (Decimal('1.00'), 1))
+
+        self.client.post(reverse('orderarticle-delete', args=[article.id]))
+        other.refresh_from_db()
+        self.assertEqual((other.total_price, other.line_count), (Decimal('0.00'), 0))
+
+    def test_recompute_command_checks_and_backfills(self):
+        order = Order.objects.create(customer=self.user)
+        OrderArticle.objects.create(order=order, product=self.apple, quantity=2)
+
+        with self.assertRaises(CommandError):
+            call_command('recompute_order_totals', '--check', stdout=StringIO())
+
+        call_command('recompute_order_totals', '--batch-size', '1', stdout=StringIO())
+        order.refresh_from_db()
+        self.assertEqual((order.total_price, order.line_count), (Decimal('5.00'), 1))
+        call_command('recompute_order_totals', '--check', stdout=StringIO())
+
+
+class UnitPriceSnapshotTests(TestCase):
+    """Prix unitaire figé sur OrderArticle."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('client', password='pass1234')
+        cls.product = Product.objects.create(label='Boeuf', price=Decimal('12.00'), description='', Categorie='vf')
+
+    def test_price_change_does_not_alter_past_orders(self):
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse('order-view'),
+            data=json.dumps({'cart_items': [{'product_id': self.product.id, 'quantity': 2}]}),
+            content_type='application/json',
+        )
+        article = OrderArticle.objects.get(order_id=response.json()['order_id'])
+        self.assertEqual(article.unit_price, Decimal('12.00'))
+
+        Product.objects.filter(pk=self.product.pk).update(price=Decimal('20.00'))
+        article = OrderArticle.objects.get(pk=article.pk)
+        self.assertEqual(article.get_subtotal(), Decimal('24.00'))
+        self.assertEqual(article.order.refresh_totals(save=False), Decimal('24.00'))
+
+    def test_backfill_command_fills_missing_prices(self):
+        order = Order.objects.create(customer=self.user)
+        OrderArticle.objects.bulk_create([
+            OrderArticle(order=order, product=self.product, quantity=1) for _ in range(5)
+        ])
+        self.assertEqual(OrderArticle.objects.filter(unit_price__isnull=True).count(), 5)
+
+        out = StringIO()
+        call_command('backfill_unit_prices', '--chunk-size', '2', stdout=out)
+        self.assertFalse(OrderArticle.objects.filter(unit_price__isnull=True).exists())
+        self.assertIn('5 ligne(s)', out.getvalue())
+
+
+@shared_session_cache
+class OrderListQueryCountTests(TestCase):
+    """Les listes de commandes coûtent un nombre fixe de requêtes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('admin', password='pass1234', is_staff=True)
+        cls.products = [
+            Product.objects.create(label=f'Produit {i}', price=Decimal(i + 1), description='')
+            for i in range(4)
+        ]
+
+    def create_orders(self, count, lines):
+        for _ in range(count):
+            order = Order.objects.create(customer=self.staff)
+            for product in self.products[:lines]:
+                OrderArticle.objects.create(order=order, product=product, quantity=2)
+            order.refresh_totals()
+
+    def test_query_count_is_independent_of_volume(self):
+        self.client.force_login(self.staff)
+        # commandes, lignes (+ produits via select_related); session et utilisateur lus dans le cache
+        for count, lines in ((1, 1), (10, 4)):
+            self.create_orders(count, lines)
+            for url in (reverse('order-list'), reverse('orders-user', args=[self.staff.pk])):
+                with self.assertNumQueries(2):
+                    response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+
+    def test_totals_match_between_sources(self):
+        self.create_orders(3, 3)
+        stored = {o.pk: o.get_total_price() for o in Order.objects.all()}
+        annotated = {o.pk: o.get_total_price() for o in Order.objects.with_totals()}
+        prefetched = {o.pk: o.get_total_price() for o in Order.objects.with_lines()}
+        self.assertEqual(stored, annotated)
+        self.assertEqual(stored, prefetched)
+        self.assertEqual(set(stored.values()), {Decimal('12.00')})
+
+
+@shared_session_cache
+class KeysetPaginationTests(TestCase):
+    """Pagination par clé des listes de commandes et d'articles."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('admin', password='pass1234', is_staff=True)
+        product = Product.objects.create(label='Riz', price=Decimal('3.00'), description='', Categorie='sec')
+        orders = Order.objects.bulk_create([Order(customer=cls.staff) for _ in range(45)])
+        OrderArticle.objects.bulk_create([
+            OrderArticle(order=order, product=product, quantity=1, unit_price=product.price)
+            for order in orders
+        ])
+
+    def walk(self, url):
+        """Parcourt toutes les pages en JSON et retourne (ids, réponses)."""
+        ids, pages, params = [], [], {'format': 'json'}
+        while True:
+            payload = self.client.get(url, params).json()
+            pages.append(payload)
+            ids.extend(item['id'] for item in payload['results'])
+            if not payload['next']:
+                return ids, pages
+            params = {'format': 'json', 'after': payload['next']}
+
+    def test_forward_and_backward_navigation(self):
+        self.client.force_login(self.staff)
+        ids, pages = self.walk(reverse('order-list'))
+        expected = list(Order.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+        self.assertEqual([len(p['results']) for p in pages], [20, 20, 5])
+        self.assertIsNone(pages[0]['previous'])
+
+        # Retour arrière depuis la dernière page
+        back = self.client.get(reverse('order-list'), {'format': 'json', 'before': pages[2]['previous']}).json()
+        self.assertEqual(back['results'], pages[1]['results'])
+
+    def test_order_article_list_pages(self):
+        self.client.force_login(self.staff)
+        ids, _ = self.walk(reverse('orderarticle-list'))
+        self.assertEqual(ids, list(OrderArticle.objects.order_by('-order_id', '-id').values_list('id', flat=True)))
+        response = self.client.get(reverse('orderarticle-list'))
+        self.assertContains(response, '?after=')
+
+    def test_deep_page_costs_same_as_first(self):
+        self.client.force_login(self.staff)
+        first = self.client.get(reverse('order-list'), {'format': 'json'}).json()
+        with self.assertNumQueries(2):
+            self.client.get(reverse('order-list'), {'format': 'json', 'after': first['next']})
+
+    def test_tampered_cursor_is_rejected(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('order-list'), {'after': 'abc:def'})
+        self.assertEqual(response.status_code, 404)
+
+
+@shared_session_cache
+class DashboardMetricsTests(TestCase):
+    """Compteurs incrémentaux et tableau de bord en nombre de requêtes constant."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('admin', password='pass1234', is_staff=True)
+        cls.fruit = Product.objects.create(label='Mangue', price=Decimal('4.00'), description='', Categorie='fru')
+        cls.veg = Product.objects.create(label='Chou', price=Decimal('1.50'), description='', Categorie='leg')
+
+    def setUp(self):
+        cache.clear()
+        fragments.get_cache().clear()
+        self.client.force_login(self.staff)
+
+    def post_order(self, cart_items):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('order-view'),
+                data=json.dumps({'cart_items': cart_items}),
+                content_type='application/json',
+            )
+        # Lignes comptées par la tâche de fond mise en file par la commande
+        with self.captureOnCommitCallbacks(execute=True):
+            tasks.run_batch()
+        return response
+
+    def snapshot(self):
+        return (
+            list(DailyStats.objects.order_by('day').values_list('day', 'order_count', 'line_count', 'revenue')),
+            # Les lignes vidées à zéro par une modification sont équivalentes à leur absence
+            list(DailyCategoryStats.objects.exclude(line_count=0).order_by('day', 'Categorie')
+                 .values_list('day', 'Categorie', 'line_count', 'quantity', 'revenue')),
+        )
+
+    def test_incremental_counters_match_rebuild(self):
+        self.post_order([{'product_id': self.fruit.id, 'quantity': 2}, {'product_id': self.veg.id, 'quantity': 4}])
+        self.post_order([{'product_id': self.fruit.id, 'quantity': 1}])
+        article = OrderArticle.objects.filter(product=self.veg).get()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('orderarticle-update', args=[article.id]), {
+                'product': self.fruit.id, 'quantity': 3, 'order': article.order_id,
+            })
+
+        incremental = self.snapshot()
+        metrics.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+
+        summary = metrics.get_summary()
+        self.assertEqual(summary['total_orders'], 2)
+        self.assertEqual(summary['total_order_articles'], 3)
+        self.assertEqual(summary['total_revenue'], Decimal('24.00'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Order.objects.first().delete()
+        self.assertEqual(metrics.get_summary()['total_orders'], 1)
+
+    def test_deletes_match_rebuild_without_per_line_queries(self):
+        def order_with_lines(count, customer=None):
+            order = Order.objects.create(customer=customer or self.staff)
+            for i in range(count):
+                OrderArticle.objects.create(order=order, product=(self.fruit, self.veg)[i % 2], quantity=i + 1)
+            return order
+
+        def delete_queries(obj):
+            with CaptureQueriesContext(connection) as ctx:
+                obj.delete()
+            return len(ctx.captured_queries)
+
+        small, large = order_with_lines(2), order_with_lines(20)
+        # Commande supprimée: ses lignes sont retirées des compteurs en une agrégation
+        self.assertEqual(delete_queries(small), delete_queries(large))
+
+        customer = User.objects.create_user('client', password='pass1234')
+        order_with_lines(3, customer)
+        order_with_lines(3)
+        customer.delete()
+        OrderArticle.objects.filter(order=order_with_lines(2)).first().delete()
+        OrderArticle.objects.filter(order=order_with_lines(2)).delete()
+        Product.objects.get(pk=self.veg.pk).delete()
+
+        incremental = self.snapshot()
+        metrics.rebuild()
+        self.assertEqual(incremental, self.snapshot())
+
+    def test_dashboard_query_count_is_constant(self):
+        self.post_order([{'product_id': self.fruit.id, 'quantity': 1}])
+        self.client.get(reverse('dashboard'))  # remplit le cache
+        # session, utilisateur, résumé, commandes et produits récents en cache
+        with self.assertNumQueries(0):
+            self.client.get(reverse('dashboard'))
+        for _ in range(5):
+            self.post_order([{'product_id': self.veg.id, 'quantity': 2}, {'product_id': self.fruit.id, 'quantity': 1}])
+        self.client.get(reverse('dashboard'))
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['total_orders'], 6)
+
+
+@tasks.register
+def create_product_task(label, fail=False):
+    """Tâche des tests: crée un produit, puis échoue si demandé (l'écriture doit être annulée)."""
+    Product.objects.create(label=label, price=Decimal('1.00'), description='')
+    if fail:
+        raise RuntimeError("Échec demandé.")
+
+
+@override_settings(FOOD_APP_TASK_WORKER=True)
+class TaskQueueTests(TestCase):
+    """File de tâches en base (tasks.py) et worker: mise en file après validation, reprises, bail."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('client', password='pass1234')
+        cls.fruit = Product.objects.create(label='Mangue', price=Decimal('4.00'), description='', Categorie='fru')
+
+    def add_task(self, **payload):
+        return Task.objects.create(name=tasks.task_name(create_product_task), payload=payload, max_attempts=2)
+
+    def test_enqueue_waits_for_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            tasks.enqueue(create_product_task, label='Après validation')
+            self.assertFalse(Task.objects.exists())
+        callbacks[0]()
+        self.assertEqual(Task.objects.get().payload, {'label': 'Après validation'})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                tasks.enqueue(create_product_task, label='Annulée')
+                raise RuntimeError
+        self.assertEqual(Task.objects.count(), 1)
+
+        with self.assertRaises(ValueError):
+            tasks.enqueue(lambda: None)
+
+    def test_checkout_defers_line_counters_to_the_worker(self):
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('order-view'),
+                data=json.dumps({'cart_items': [{'product_id': self.fruit.id, 'quantity': 3}]}),
+                content_type='application/json',
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(DailyStats.objects.values_list('order_count', 'line_count').get(), (1, 0))
+        self.assertEqual(Task.objects.get().name, tasks.task_name(metrics.apply_line_deltas))
+
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('worker', once=True, stdout=out)
+        self.assertIn('1 tâche(s) exécutée(s), 0 en échec', out.getvalue())
+        self.assertFalse(Task.objects.exists())
+        self.assertEqual(
+            DailyStats.objects.values_list('order_count', 'line_count', 'revenue').get(), (1, 1, Decimal('12.00')),
+        )
+        self.assertEqual(DailyCategoryStats.objects.values_list('Categorie', 'quantity').get(), ('fru', 3))
+
+    def test_failures_are_retried_with_backoff_then_marked_failed(self):
+        self.assertEqual([tasks.retry_delay(n).total_seconds() for n in (1, 2, 3, 20)], [10, 20, 40, 3600])
+        task = self.add_task(label='Instable', fail=True)
+
+        self.assertEqual(tasks.run_batch(), (0, 1))
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.PENDING, 1))
+        self.assertGreater(task.run_after, timezone.now() + datetime.timedelta(seconds=9))
+        self.assertIn('Échec demandé', task.last_error)
+        # L'écriture de la tentative a été annulée avec elle
+        self.assertFalse(Product.objects.filter(label='Instable').exists())
+        self.assertEqual(tasks.run_batch(), (0, 0))  # pas encore due
+
+        Task.objects.update(run_after=timezone.now())
+        self.assertEqual(tasks.run_batch(), (0, 1))
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.attempts), (Task.FAILED, 2))
+        Task.objects.update(run_after=timezone.now() - datetime.timedelta(days=1))
+        self.assertEqual(tasks.run_batch(), (0, 0))
+
+        self.assertEqual(tasks.retry_failed(), 1)
+        Task.objects.update(payload={'label': 'Instable'})
+        self.assertEqual(tasks.run_batch(), (1, 0))
+        self.assertFalse(Task.objects.exists())
+        self.assertTrue(Product.objects.filter(label='Instable').exists())
+
+    def test_expired_lease_is_reclaimed_and_late_result_discarded(self):
+        self.add_task(label='Reprise')
+        [first] = tasks.claim(lease=60)
+        self.assertEqual(tasks.claim(), [])  # bail en cours
+
+        Task.objects.update(run_after=timezone.now() - datetime.timedelta(seconds=1))
+        [second] = tasks.claim()
+        self.assertEqual(second.attempts, 2)
+        # Le premier worker termine en retard: son résultat est abandonné
+        self.assertFalse(tasks.run(first))
+        self.assertTrue(tasks.run(second))
+        self.assertEqual(Product.objects.filter(label='Reprise').count(), 1)
+        self.assertFalse(Task.objects.exists())
+
+    def test_unknown_tasks_fail_and_stopped_batches_are_released(self):
+        Task.objects.create(name='food_app.tests.missing_task')
+        self.assertEqual(tasks.run_batch(), (0, 1))
+        self.assertIn('Tâche inconnue', Task.objects.get().last_error)
+        Task.objects.all().delete()
+
+        self.add_task(label='Rendue')
+        self.assertEqual(tasks.run_batch(should_stop=lambda: True), (0, 0))
+        self.assertEqual(Task.objects.values_list('status', 'attempts').get(), (Task.PENDING, 0))
+
+    def test_benchmark_reports_throughput_and_cleans_up(self):
+        out = StringIO()
+        call_command('benchmark_tasks', tasks=20, batch_sizes=[5], workers=[1], enqueue_sample=3, stdout=out)
+        self.assertIn('tâches/s', out.getvalue())
+        self.assertFalse(Task.objects.exists())
+
+    @override_settings(FOOD_APP_TASK_WORKER=False)
+    def test_without_worker_tasks_run_after_commit(self):
+        self.client.force_login(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                reverse('order-view'),
+                data=json.dumps({'cart_items': [{'product_id': self.fruit.id, 'quantity': 3}]}),
+                content_type='application/json',
+            )
+        self.assertFalse(Task.objects.exists())
+        self.assertEqual(
+            DailyStats.objects.values_list('order_count', 'line_count', 'revenue').get(), (1, 1, Decimal('12.00')),
+        )
+
+        # Un échec annule les écritures de la tâche et la confie à la file
+        with self.assertLogs('food_app.tasks', 'ERROR'), self.captureOnCommitCallbacks(execute=True):
+            tasks.enqueue(create_product_task, label='Instable', fail=True)
+        self.assertFalse(Product.objects.filter(label='Instable').exists())
+        self.assertEqual(Task.objects.get().payload, {'label': 'Instable', 'fail': True})
+
+
+class DemandForecastTests(TestCase):
+    """Prévisions de demande: calcul vectorisé (NumPy), enregistrement et affichage au tableau de bord."""
+
+    TODAY = datetime.date(2026, 3, 2)  # un lundi
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('admin', password='pass1234', is_staff=True)
+        cls.mango = Product.objects.create(label='Mangue', price=Decimal('4.00'), description='', Categorie='fru')
+        cls.cabbage = Product.objects.create(label='Chou', price=Decimal('1.50'), description='', Categorie='leg')
+        cls.rice = Product.objects.create(label='Riz', price=Decimal('9.00'), description='', Categorie='sec')
+
+    def setUp(self):
+        fragments.get_cache().clear()
+
+    def sell(self, product, day, quantity):
+        order = Order.objects.create(customer=self.staff)
+        OrderArticle.objects.create(order=order, product=product, quantity=quantity)
+        noon = timezone.make_aware(datetime.datetime.combine(day, datetime.time(12)))
+        Order.objects.filter(pk=order.pk).update(created_at=noon)
+
+    def sell_four_weeks(self, today):
+        for offset in range(1, 29):
+            day = today - datetime.timedelta(days=offset)
+            self.sell(self.cabbage, day, 4)
+            if day.weekday() == 0:
+                self.sell(self.mango, day, 10)
+
+    @skipUnless(forecasting.np is not None, "NumPy non installé")
+    def test_history_is_one_aggregated_query(self):
+        yesterday = self.TODAY - datetime.timedelta(days=1)
+        self.sell(self.mango, yesterday, 3)
+        self.sell(self.mango, yesterday, 2)
+        self.sell(self.cabbage, self.TODAY - datetime.timedelta(days=3), 5)
+        self.sell(self.rice, yesterday, 9)  # pas un produit frais
+        self.sell(self.mango, self.TODAY, 7)  # journée en cours: exclue
+        with self.assertNumQueries(1):
+            product_ids, history = forecasting.load_history(self.TODAY, days=7)
+        self.assertEqual(product_ids.tolist(), sorted([self.mango.pk, self.cabbage.pk]))
+        rows = {pk: row.tolist() for pk, row in zip(product_ids.tolist(), history)}
+        self.assertEqual(rows[self.mango.pk], [0, 0, 0, 0, 0, 0, 5])
+        self.assertEqual(rows[self.cabbage.pk], [0, 0, 0, 0, 5, 0, 0])
+
+    @skipUnless(forecasting.np is not None, "NumPy non installé")
+    def test_weekly_seasonality(self):
+        self.sell_four_weeks(self.TODAY)
+        for method in forecasting.METHODS:
+            with self.subTest(method=method):
+                product_ids, days, predictions = forecasting.compute(
+                    today=self.TODAY, horizon=7, method=method, history_days=28,
+                )
+                # Du mardi au lundi suivant: la mangue ne se vend que le lundi
+                self.assertEqual(days[0].weekday(), 1)
+                rows = dict(zip(product_ids.tolist(), predictions.tolist()))
+                self.assertTrue(forecasting.np.allclose(rows[self.mango.pk], [0, 0, 0, 0, 0, 0, 10]))
+                self.assertTrue(forecasting.np.allclose(rows[self.cabbage.pk], [4] * 7))
+
+    @skipUnless(forecasting.np is not None, "NumPy non installé")
+    def test_command_stores_forecasts_for_dashboard(self):
+        self.sell_four_weeks(timezone.localdate())
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command('forecast_demand', '--horizon', '7', stdout=StringIO())
+        # Relancer remplace les prévisions des mêmes jours; la mangue n'en a que le lundi
+        self.assertEqual(DemandForecast.objects.count(), 8)
+        self.assertEqual(
+            DemandForecast.objects.get(product=self.cabbage, day=forecasting.tomorrow()).quantity, Decimal('4.00'),
+        )
+        self.client.force_login(self.staff)
+        self.assertContains(self.client.get(reverse('dashboard')), 'Chou')
+
+    @skipUnless(forecasting.np is not None, "NumPy non installé")
+    def test_store_replaces_only_forecasted_products(self):
+        day = forecasting.tomorrow()
+        DemandForecast.objects.create(product=self.rice, day=day, quantity=Decimal('2'), method='moving-average')
+        DemandForecast.objects.create(product=self.mango, day=day, quantity=Decimal('1'), method='moving-average')
+        forecasting.store(
+            forecasting.np.array([self.mango.pk]), [day], forecasting.np.array([[6.0]]), 'moving-average',
+        )
+        self.assertEqual(
+            dict(DemandForecast.objects.values_list('product_id', 'quantity')),
+            {self.rice.pk: Decimal('2.00'), self.mango.pk: Decimal('6.00')},
+        )
+
+    def test_dashboard_lists_tomorrow_forecasts(self):
+        self.client.force_login(self.staff)
+        self.assertContains(self.client.get(reverse('dashboard')), 'Aucune prévision')
+        with self.captureOnCommitCallbacks(execute=True):
+            DemandForecast.objects.bulk_create([
+                DemandForecast(product=self.mango, day=forecasting.tomorrow(), quantity=Decimal('12.5'),
+                               method='moving-average'),
+                DemandForecast(product=self.cabbage, day=self.TODAY, quantity=Decimal('3'), method='moving-average'),
+            ])
+            fragments.invalidate(DemandForecast)
+        response = self.client.get(reverse('dashboard'))
+        self.assertEqual([f.product for f in response.context['forecasts']], [self.mango])
+        self.assertContains(response, '12.5 unité(s)')
+
+    def test_command_requires_numpy(self):
+        with mock.patch.object(forecasting, 'np', None):
+            with self.assertRaisesMessage(CommandError, 'NumPy'):
+                call_command('forecast_demand', stdout=StringIO())
+
+
+class ProductSearchTests(TestCase):
+    """Recherche plein texte (index FTS5 sous SQLite)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.mango = Product.objects.create(label='Mangue Kent', description='Fruit sucré', Categorie='fru')
+        cls.juice = Product.objects.create(label='Jus tropical', description='À base de mangue', Categorie='aut')
+        cls.rice = Product.objects.create(label='Riz parfumé', description='Sac de 5 kg', Categorie='sec')
+
+    def search(self, query, **params):
+        return self.client.get(reverse('product-search'), {'q': query, **params})
+
+    def test_prefix_match_ranks_label_before_description(self):
+        response = self.search('mang')
+        self.assertEqual(list(response.context['products']), [self.mango, self.juice])
+
+    def test_index_follows_product_writes(self):
+        self.rice.label = 'Riz basmati'
+        self.rice.save()
+        self.assertEqual(list(self.search('basmati').context['products']), [self.rice])
+        self.assertEqual(list(self.search('parfum').context['products']), [])
+
+        self.mango.delete()
+        self.assertEqual(list(self.search('mangue').context['products']), [self.juice])
+
+    def test_results_are_paginated(self):
+        Product.objects.bulk_create([Product(label=f'Tomate {i}', description='') for i in range(15)])
+        search.get_backend().rebuild()
+        first = self.search('tomate')
+        self.assertEqual(first.context['paginator'].count, 15)
+        self.assertEqual(len(first.context['products']), 10)
+        self.assertEqual(len(self.search('tomate', page=2).context['products']), 5)
+
+    def test_punctuation_and_empty_queries(self):
+        self.assertEqual(list(self.search('"mangue" -*:').context['products']), [self.mango, self.juice])
+        self.assertEqual(list(self.search('   ').context['products']), [])
+
+    def test_benchmark_command_leaves_catalog_untouched(self):
+        out = StringIO()
+        call_command('benchmark_search', '--sizes', '50', '--repeat', '3', stdout=out)
+        self.assertIn('SQLiteFTSSearchBackend', out.getvalue())
+        self.assertEqual(Product.objects.count(), 3)
+        self.assertEqual(len(self.search('riz').context['products']), 1)
+
+
+class CatalogApiTests(TestCase):
+    """Catalogue JSON avec ETag et GET conditionnel."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('client', password='pass1234')
+        cls.product = Product.objects.create(label='Ananas', price=Decimal('3.25'), description='', Categorie='fru')
+
+    def setUp(self):
+        cache.clear()
+
+    @override_settings(FOOD_APP_CATALOG_CACHE_SECONDS=30)
+    def test_entries_expire_after_configured_delay(self):
+        # Cache propre au processus: une écriture faite ailleurs n'y est visible qu'à expiration
+        with mock.patch.object(cache, 'get_or_set', wraps=cache.get_or_set) as get_or_set:
+            catalog.get_catalog()
+            catalog.get_category_counts()
+        self.assertEqual([call.args[2] for call in get_or_set.call_args_list], [30, 30])
+
+    def test_conditional_get(self):
+        response = self.client.get(reverse('catalog-api'))
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(response.json()['products'][0]['price'], '3.25')
+
+        # Catalogue en cache: aucune requête SQL, 304 sans corps
+        with self.assertNumQueries(0):
+            response = self.client.get(reverse('catalog-api'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.price = Decimal('3.50')
+            self.product.save()
+        response = self.client.get(reverse('catalog-api'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_deletion_changes_etag(self):
+        Product.objects.create(label='Goyave', description='')
+        etag = self.client.get(reverse('catalog-api'))['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.delete()
+        self.assertNotEqual(self.client.get(reverse('catalog-api'))['ETag'], etag)
+
+    def test_order_form_no_longer_embeds_products(self):
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('order-view'))
+        self.assertNotContains(response, 'Ananas')
+        self.assertContains(response, reverse('catalog-api'))
+        self.assertIn('csrftoken', response.cookies)
+        # Pas de cache navigateur: la page survivrait à une déconnexion
+        self.assertNotIn('max-age', response.get('Cache-Control', ''))
+
+
+class ProductCategoryListingTests(TestCase):
+    """Liste regroupée triée en SQL, pages par catégorie et compteurs en cache."""
+
+    @classmethod
+    def setUpTestData(cls):
+        for label, categorie in [('Poireau', 'leg'), ('Ananas', 'fru'), ('Carotte', 'leg'),
+                                 ('Banane', 'fru'), ('Riz', 'sec')]:
+            Product.objects.create(label=label, price=Decimal('1.00'), description='', Categorie=categorie)
+
+    def setUp(self):
+        cache.clear()
+        fragments.get_cache().clear()
+
+    def test_list_is_grouped_by_category_in_sql(self):
+        response = self.client.get(reverse('product-list'))
+        labels = [product.label for product in response.context['products']]
+        # Ordre des codes de catégorie (fru, leg, sec), puis du libellé
+        self.assertEqual(labels, ['Ananas', 'Banane', 'Carotte', 'Poireau', 'Riz'])
+        self.assertEqual(response.context['paginator'].count, 5)
+        self.assertContains(response, reverse('product-by-category', args=['leg']))
+
+    def test_category_page(self):
+        response = self.client.get(reverse('product-by-category', args=['leg']))
+        self.assertEqual([product.label for product in response.context['products']], ['Carotte', 'Poireau'])
+        self.assertEqual(response.context['category']['label'], 'legume')
+        self.assertEqual(response.context['paginator'].count, 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(label='Navet', price=Decimal('1.00'), description='', Categorie='leg')
+        response = self.client.get(reverse('product-by-category', args=['leg']))
+        self.assertEqual(response.context['paginator'].count, 3)
+
+    def test_unknown_category(self):
+        self.assertEqual(self.client.get(reverse('product-by-category', args=['xyz'])).status_code, 404)
+
+
+@override_settings(FOOD_APP_INSTRUMENTATION=True)
+class FragmentCacheTests(TestCase):
+    """Fragments de gabarits en cache, invalidés par les écritures."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user('client', password='pass1234')
+        cls.products = [
+            Product.objects.create(label=f'Produit {i}', price=Decimal('2.00'), description='', Categorie='fru')
+            for i in range(3)
+        ]
+        cls.order = Order.objects.create(customer=cls.customer)
+        cls.article = OrderArticle.objects.create(order=cls.order, product=cls.products[0], quantity=1)
+        cls.order.refresh_totals()
+
+    def setUp(self):
+        cache.clear()
+        fragments.get_cache().clear()
+        instrumentation.reset()
+
+    def fragment_stats(self):
+        return {stats['fragment']: stats for stats in instrumentation.fragment_report()}
+
+    def test_product_list_page_is_served_from_cache(self):
+        self.client.get(reverse('product-list'))
+        # Compteurs et page en cache: ni COUNT ni lecture des produits
+        with self.assertNumQueries(0):
+            self.assertContains(self.client.get(reverse('product-list')), 'Produit 1')
+        self.assertEqual(self.fragment_stats()['product-list-page']['hits'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.products[1].label = 'Mangue Kent'
+            self.products[1].save()
+        response = self.client.get(reverse('product-list'))
+        self.assertContains(response, 'Mangue Kent')
+        self.assertNotContains(response, 'Produit 1')
+        # Page reconstruite; seule la carte du produit modifié est rendue à nouveau
+        cards = self.fragment_stats()['product-card']
+        self.assertEqual((cards['hits'], cards['misses']), (2, 4))
+
+    def test_order_lines_follow_line_edits(self):
+        self.client.force_login(self.customer)
+        url = reverse('orders-user', args=[self.customer.pk])
+        self.client.get(url)
+        self.client.get(url)
+        self.assertEqual(self.fragment_stats()['order-lines-table']['hits'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('orderarticle-update', args=[self.article.pk]), {
+                'product': self.products[0].pk, 'quantity': 7, 'order': self.order.pk,
+            })
+        self.assertContains(self.client.get(url), '<td class="px-3 py-2 whitespace-nowrap text-sm text-gray-500">7</td>')
+
+    def test_hit_ratio_in_report(self):
+        staff = User.objects.create_user('admin', password='pass1234', is_staff=True)
+        self.client.force_login(staff)
+        self.client.get(reverse('dashboard'))
+        self.client.get(reverse('dashboard'))
+        data = self.client.get(reverse('instrumentation-report'), {'format': 'json'}).json()
+        self.assertIn({'fragment': 'dashboard-recent-orders', 'hits': 1, 'misses': 1, 'hit_ratio': 0.5},
+                      data['fragments'])
+        self.assertContains(self.client.get(reverse('instrumentation-report')), 'dashboard-recent-products')
+
+
+class AsyncOrderViewTests(TestCase):
+    """Prise de commande asynchrone (AsyncOrderView)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('client', password='pass1234')
+        cls.product = Product.objects.create(label='Poulet', price=Decimal('7.00'), description='', Categorie='vf')
+
+    async def test_async_order_is_created(self):
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.post(
+            reverse('order-api'),
+            data=json.dumps({'cart_items': [{'product_id': self.product.id, 'quantity': 3}]}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        order = await Order.objects.aget(pk=response.json()['order_id'])
+        self.assertEqual((order.total_price, order.line_count), (Decimal('21.00'), 1))
+        self.assertEqual(order.client_name, 'client')
+
+    async def test_async_rejects_anonymous_and_invalid_carts(self):
+        response = await self.async_client.post(reverse('order-api'), data='{}', content_type='application/json')
+        self.assertEqual(response.status_code, 401)
+
+        await self.async_client.aforce_login(self.user)
+        for body in (
+            'not json', '[]', '"panier"', '{"cart_items": []}', '{"cart_items": [{"product_id": 999, "quantity": 1}]}',
+        ):
+            response = await self.async_client.post(reverse('order-api'), data=body, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(await Order.objects.acount(), 0)
+
+
+class CartApiTests(TestCase):
+    """Panier côté serveur: validation contre les prix en cache, commande aux prix de la base."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('client', password='pass1234')
+        cls.mango = Product.objects.create(label='Mangue', price=Decimal('2.50'), description='', Categorie='fru')
+        cls.rice = Product.objects.create(label='Riz', price=Decimal('4.00'), description='', Categorie='sec')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.user)
+
+    def line(self, method, product, quantity=None):
+        body = {'product_id': product.pk if hasattr(product, 'pk') else product}
+        if quantity is not None:
+            body['quantity'] = quantity
+        return getattr(self.client, method)(
+            reverse('cart-line-api'), data=json.dumps(body), content_type='application/json',
+        )
+
+    def checkout(self):
+        return self.client.post(
+            reverse('cart-checkout-api'), data=json.dumps({'client_name': 'Awa'}), content_type='application/json',
+        )
+
+    def test_changes_return_the_running_total(self):
+        self.assertEqual(self.line('post', self.mango, 2).json()['total'], '5.00')
+        self.assertEqual(self.line('post', self.mango, 1).json()['total'], '7.50')
+        self.assertEqual(self.line('post', self.rice, 1).json()['total'], '11.50')
+        self.assertEqual(self.line('put', self.mango, 1).json()['total'], '6.50')
+        response = self.line('delete', self.rice)
+        self.assertEqual((response.json()['line_count'], response.json()['total']), (1, '2.50'))
+        # Le panier survit à la requête: il est dans la session
+        self.assertEqual(self.client.get(reverse('cart-api')).json()['lines'][0]['quantity'], 1)
+
+    def test_invalid_changes_are_rejected(self):
+        for product, quantity in ((999, 1), ('abc', 1), (self.mango, -1), (self.mango, 'deux')):
+            with self.subTest(product=product, quantity=quantity):
+                response = self.line('post', product, quantity)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.json()['line_count'], 0)
+        self.assertEqual(self.checkout().status_code, 400)
+
+    def test_checkout_reads_products_once(self):
+        self.line('post', self.mango, 2)
+        self.line('post', self.rice, 1)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.checkout()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len([q for q in ctx.captured_queries if 'FROM "food_app_product"' in q['sql']]), 1)
+        order = Order.objects.get(pk=response.json()['order_id'])
+        self.assertEqual((order.total_price, order.line_count, order.client_name), (Decimal('9.00'), 2, 'Awa'))
+        self.assertEqual(self.client.get(reverse('cart-api')).json()['line_count'], 0)
+
+    def test_stale_price_cache_does_not_change_what_is_charged(self):
+        # Écritures faites par un autre processus: le cache de celui-ci n'est pas invalidé
+        self.line('post', self.mango, 2)
+        self.line('post', self.rice, 1)
+        Product.objects.filter(pk=self.mango.pk).update(price=Decimal('3.00'))
+        response = self.checkout()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['changes'][0]['new_price'], '3.00')
+
+        Product.objects.filter(pk=self.rice.pk).delete()
+        response = self.checkout()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['changes'], [
+            {'product_id': self.rice.pk, 'label': 'Riz', 'old_price': '4.00', 'new_price': None},
+        ])
+        response = self.checkout()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Order.objects.get().total_price, Decimal('6.00'))
+
+    def test_price_change_blocks_checkout(self):
+        self.line('post', self.mango, 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.mango.price = Decimal('3.00')
+            self.mango.save()
+        response = self.checkout()
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['changes'][0]['new_price'], '3.00')
+        self.assertEqual(response.json()['total'], '6.00')
+        self.assertEqual(Order.objects.count(), 0)
+        # Le panier a été aligné: la validation suivante passe
+        self.assertEqual(self.checkout().status_code, 201)
+
+    def test_anonymous_is_rejected(self):
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('cart-api')).status_code, 401)
+        self.assertEqual(self.line('post', self.mango, 1).status_code, 401)
+
+
+@override_settings(FOOD_APP_TASK_WORKER=True)
+class OrderBatchViewTests(TestCase):
+    """Soumission de commandes par lots, idempotente (OrderBatchView)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('caisse', password='pass1234')
+        cls.products = Product.objects.bulk_create([
+            Product(label=f'Produit {i}', price=Decimal('2.50'), description='', Categorie='fru')
+            for i in range(5)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def post_batch(self, carts):
+        return self.client.post(
+            reverse('order-batch-api'), data=json.dumps({'orders': carts}), content_type='application/json',
+        )
+
+    def make_carts(self, count, prefix='k'):
+        return [
+            {'idempotency_key': f'{prefix}{i}', 'cart_items': [
+                {'product_id': product.id, 'quantity': 2} for product in self.products[:1 + i % 5]
+            ]}
+            for i in range(count)
+        ]
+
+    def test_batch_creates_orders_with_totals(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.post_batch(self.make_carts(3))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['summary'], {'created': 3, 'existing': 0, 'rejected': 0})
+        orders = Order.objects.order_by('idempotency_key')
+        self.assertEqual([o.line_count for o in orders], [1, 2, 3])
+        self.assertEqual([o.total_price for o in orders], [Decimal('5.00'), Decimal('10.00'), Decimal('15.00')])
+        self.assertEqual(DailyStats.objects.get().order_count, 3)
+        # Lignes comptées par la tâche de fond, une pour tout le lot
+        self.assertEqual(DailyStats.objects.get().line_count, 0)
+        self.assertEqual(tasks.run_batch(), (1, 0))
+        stats = DailyStats.objects.get()
+        self.assertEqual((stats.line_count, stats.revenue), (6, Decimal('30.00')))
+
+    def test_resending_a_batch_does_not_duplicate_orders(self):
+        first = self.post_batch(self.make_carts(3)).json()
+        second = self.post_batch(self.make_carts(4)).json()
+        self.assertEqual(second['summary'], {'created': 1, 'existing': 3, 'rejected': 0})
+        self.assertEqual(
+            [r['order_id'] for r in second['results'][:3]], [r['order_id'] for r in first['results']],
+        )
+        self.assertEqual(Order.objects.count(), 4)
+        self.assertEqual(OrderArticle.objects.count(), 1 + 2 + 3 + 4)
+
+    def test_invalid_carts_are_rejected_individually(self):
+        carts = self.make_carts(2) + [
+            {'cart_items': [{'product_id': self.products[0].id, 'quantity': 1}]},
+            {'idempotency_key': 'k0', 'cart_items': [{'product_id': self.products[0].id, 'quantity': 1}]},
+            {'idempotency_key': 'vide', 'cart_items': []},
+            {'idempotency_key': 'inconnu', 'cart_items': [{'product_id': 999999, 'quantity': 1}]},
+            'pas un panier',
+        ]
+        results = self.post_batch(carts).json()['results']
+        self.assertEqual([r['status'] for r in results], ['created'] * 2 + ['rejected'] * 5)
+        self.assertEqual(Order.objects.count(), 2)
+
+    def test_query_count_does_not_depend_on_batch_size(self):
+        def count_queries(carts):
+            with CaptureQueriesContext(connection) as ctx:
+                self.assertEqual(self.post_batch(carts).status_code, 200)
+            return len(ctx.captured_queries)
+
+        count_queries(self.make_carts(1, 'init'))  # crée les lignes de statistiques du jour
+        self.assertEqual(count_queries(self.make_carts(2, 'a')), count_queries(self.make_carts(50, 'b')))
+
+    def test_rejects_anonymous_and_malformed_requests(self):
+        self.client.logout()
+        self.assertEqual(self.post_batch(self.make_carts(1)).status_code, 401)
+
+        self.client.force_login(self.user)
+        for body in ('not json', '[]', '{"orders": []}', json.dumps({'orders': self.make_carts(501)})):
+            response = self.client.post(reverse('order-batch-api'), data=body, content_type='application/json')
+            self.assertEqual(response.status_code, 400)
+        self.assertEqual(Order.objects.count(), 0)
+
+
+class OrderExportTests(TestCase):
+    """Export en flux des commandes et lignes (OrderExportView, export_orders)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('admin', password='pass1234', is_staff=True)
+        cls.customer = User.objects.create_user('client', password='pass1234')
+        apple = Product.objects.create(label='Pomme', price=Decimal('2.50'), description='', Categorie='fru')
+        rice = Product.objects.create(label='Riz', price=Decimal('4.00'), description='', Categorie='sec')
+        cls.today = Order.objects.create(customer=cls.customer, client_name='Awa')
+        OrderArticle.objects.create(order=cls.today, product=apple, quantity=2)
+        OrderArticle.objects.create(order=cls.today, product=rice, quantity=1)
+        cls.today.refresh_totals()
+        cls.old = Order.objects.create(customer=cls.customer, client_name='Bala')
+        OrderArticle.objects.create(order=cls.old, product=rice, quantity=3)
+        Order.objects.filter(pk=cls.old.pk).update(created_at=timezone.now() - datetime.timedelta(days=10))
+
+    def setUp(self):
+        self.client.force_login(self.staff)
+
+    def export(self, **params):
+        response = self.client.get(reverse('order-export'), params)
+        self.assertEqual(response.status_code, 200)
+        return b''.join(response.streaming_content)
+
+    def test_csv_export_has_one_row_per_line(self):
+        rows = list(csv.DictReader(self.export().decode().splitlines()))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[0]['order_id'], str(self.old.pk))
+        pomme = next(row for row in rows if row['product_label'] == 'Pomme')
+        self.assertEqual(
+            (pomme['customer'], pomme['order_total'], pomme['unit_price'], pomme['subtotal']),
+            ('client', '9.00', '2.50', '5.00'),
+        )
+
+    def test_filters_by_date_range_and_category(self):
+        today = timezone.localdate().isoformat()
+        lines = self.export(format='ndjson', start=today, end=today).decode().splitlines()
+        self.assertEqual({json.loads(line)['order_id'] for line in lines}, {self.today.pk})
+
+        lines = self.export(format='ndjson', category='sec').decode().splitlines()
+        self.assertEqual(sorted(json.loads(line)['quantity'] for line in lines), [1, 3])
+
+    def test_gzip_export(self):
+        response = self.client.get(reverse('order-export'), {'gzip': '1'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('.csv.gz', response['Content-Disposition'])
+        data = gzip.decompress(b''.join(response.streaming_content)).decode()
+        self.assertEqual(len(data.splitlines()), 4)
+
+    def test_invalid_parameters_and_permissions(self):
+        for params in ({'format': 'xml'}, {'start': 'hier'}, {'category': 'zzz'},
+                       {'start': '2024-05-02', 'end': '2024-05-01'}):
+            self.assertEqual(self.client.get(reverse('order-export'), params).status_code, 400)
+        self.client.force_login(self.customer)
+        self.assertEqual(self.client.get(reverse('order-export')).status_code, 302)
+
+    def test_management_command_writes_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'orders.ndjson.gz')
+            call_command('export_orders', format='ndjson', gzip=True, output=path, stdout=StringIO())
+            with gzip.open(path, 'rt') as f:
+                self.assertEqual(len(f.readlines()), 3)
+        with self.assertRaises(CommandError):
+            call_command('export_orders', category=['zzz'], stdout=StringIO())
+
+
+class OrderArchiveTests(TestCase):
+    """Archivage des commandes anciennes (archive.py): déplacement par lots, lecture, statistiques."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('admin', password='pass1234', is_staff=True)
+        cls.customer = User.objects.create_user('client', password='pass1234')
+        cls.mango = Product.objects.create(label='Mangue', price=Decimal('2.00'), description='', Categorie='fru')
+        cls.rice = Product.objects.create(label='Riz', price=Decimal('5.00'), description='', Categorie='sec')
+        cls.old_orders = []
+        for days, quantity in ((500, 1), (400, 2), (400, 3)):
+            order = Order.objects.create(customer=cls.customer, client_name=f'Ancienne {days}')
+            OrderArticle.objects.create(order=order, product=cls.mango, quantity=quantity)
+            OrderArticle.objects.create(order=order, product=cls.rice, quantity=1)
+            order.refresh_totals()
+            Order.objects.filter(pk=order.pk).update(created_at=timezone.now() - datetime.timedelta(days=days))
+            cls.old_orders.append(order)
+        # Ligne antérieure au prix figé: l'archive retient le prix courant du produit
+        OrderArticle.objects.filter(order=cls.old_orders[0], product=cls.rice).update(unit_price=None)
+        cls.recent = Order.objects.create(customer=cls.customer, client_name='Récente')
+        OrderArticle.objects.create(order=cls.recent, product=cls.mango, quantity=4)
+        cls.recent.refresh_totals()
+
+    def setUp(self):
+        cache.clear()
+        fragments.get_cache().clear()
+        self.client.force_login(self.staff)
+
+    def archive(self, **options):
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('archive_orders', stdout=out, stderr=StringIO(), **options)
+        return out.getvalue()
+
+    def test_batches_are_resumable_and_keep_ids(self):
+        self.assertIn('3 commande(s)', self.archive(dry_run=True))
+        self.assertIn('2 commande(s) et 4 ligne(s) archivée(s)', self.archive(batch_size=2, max_batches=1))
+        # Les plus anciennes d'abord, lot par lot
+        self.assertEqual(
+            set(ArchivedOrder.objects.values_list('id', flat=True)), {self.old_orders[0].pk, self.old_orders[1].pk},
+        )
+        self.assertIn('1 commande(s) et 2 ligne(s)', self.archive(batch_size=2))
+        self.assertEqual(list(Order.objects.values_list('id', flat=True)), [self.recent.pk])
+        self.assertEqual(OrderArticle.objects.count(), 1)
+        self.assertIn('0 commande(s)', self.archive())
+
+        archived = ArchivedOrder.objects.get(pk=self.old_orders[0].pk)
+        self.assertEqual((archived.client_name, archived.total_price, archived.line_count),
+                         ('Ancienne 500', Decimal('7.00'), 2))
+        self.assertEqual(
+            sorted(archived.archivedorderarticle_set.values_list('unit_price', flat=True)),
+            [Decimal('2.00'), Decimal('5.00')],
+        )
+
+    def test_rollups_keep_archived_revenue(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            metrics.rebuild()
+        before = metrics.get_summary()
+        stats = list(DailyStats.objects.order_by('day').values_list('day', 'order_count', 'line_count', 'revenue'))
+        self.archive()
+
+        summary = metrics.get_summary()
+        self.assertEqual(
+            (summary['total_orders'], summary['total_order_articles'], summary['total_revenue']),
+            (before['total_orders'], before['total_order_articles'], before['total_revenue']),
+        )
+        self.assertEqual(summary['total_revenue'], Decimal('35.00'))
+        # La reconstruction relit aussi les archives
+        metrics.rebuild()
+        self.assertEqual(
+            list(DailyStats.objects.order_by('day').values_list('day', 'order_count', 'line_count', 'revenue')), stats,
+        )
+
+    def test_replayed_key_after_archiving_returns_archived_order(self):
+        Order.objects.filter(pk=self.old_orders[2].pk).update(idempotency_key='caisse-1')
+        self.archive()
+        cart = {'idempotency_key': 'caisse-1', 'cart_items': [{'product_id': self.mango.pk, 'quantity': 1}]}
+        [result] = orders.place_orders_batch(self.customer, [cart])
+        self.assertEqual(result['status'], 'existing')
+        self.assertEqual(result['order_id'], self.old_orders[2].pk)
+        self.assertEqual(Order.objects.count(), 1)
+
+    def test_order_detail_reads_archives(self):
+        self.archive()
+        old = self.old_orders[1]
+        response = self.client.get(reverse('order-detail', args=[old.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['archived'])
+        self.assertContains(response, 'lecture seule')
+        self.assertContains(response, 'Mangue')
+        self.assertNotContains(response, reverse('order-update', args=[old.pk]))
+        # Les vues d'écriture ne voient pas les archives
+        self.assertEqual(self.client.get(reverse('order-update', args=[old.pk])).status_code, 404)
+
+        response = self.client.get(reverse('order-detail', args=[self.recent.pk]))
+        self.assertFalse(response.context['archived'])
+        self.assertContains(response, reverse('order-update', args=[self.recent.pk]))
+        self.assertEqual(self.client.get(reverse('order-detail', args=[999999])).status_code, 404)
+
+    def test_exports_include_archived_orders_first(self):
+        self.archive()
+        response = self.client.get(reverse('order-export'), {'category': 'sec'})
+        rows = list(csv.DictReader(b''.join(response.streaming_content).decode().splitlines()))
+        self.assertEqual([row['order_id'] for row in rows], [str(order.pk) for order in self.old_orders])
+        self.assertEqual({row['unit_price'] for row in rows}, {'5.00'})
+
+
+class ProductImportTests(TestCase):
+    """Import en masse du catalogue par upsert sur le SKU (import_products, ProductImportView)."""
+
+    CSV = (
+        "sku,label,price,Categorie,description\n"
+        "A1,Pomme,2.50,fru,Golden\n"
+        "A2,Riz,\"4,00\",produit sec,\n"
+        "A3,Mystère,1.00,zzz,\n"
+        "A4,,1.00,leg,\n"
+        "A1,Pomme bis,3.00,fru,\n"
+        "A5,Chou,abc,leg,\n"
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('admin', password='pass1234', is_staff=True)
+        cls.customer = User.objects.create_user('client', password='pass1234')
+
+    def upload(self, content, name='catalogue.csv'):
+        return self.client.post(
+            reverse('product-import'), {'file': SimpleUploadedFile(name, content.encode())},
+            HTTP_ACCEPT='application/json',
+        )
+
+    def test_import_validates_rows_and_reports_counts(self):
+        self.client.force_login(self.staff)
+        report = self.upload(self.CSV).json()
+        self.assertEqual((report['inserted'], report['updated'], report['rejected']), (2, 0, 4))
+        self.assertEqual([e['line'] for e in report['errors']], [4, 5, 6, 7])
+        rice = Product.objects.get(sku='A2')
+        self.assertEqual((rice.price, rice.Categorie), (Decimal('4.00'), 'sec'))
+
+    def test_reimport_updates_existing_products(self):
+        self.client.force_login(self.staff)
+        self.upload(self.CSV)
+        created_at = Product.objects.get(sku='A1').created_at
+        lines = '\n'.join([
+            json.dumps({'sku': 'A1', 'label': 'Pomme Golden', 'price': '2.75', 'Categorie': 'fru'}),
+            json.dumps({'sku': 'B1', 'label': 'Mangue', 'price': 5, 'Categorie': 'fruit'}),
+        ])
+        report = self.upload(lines, name='catalogue.jsonl').json()
+        self.assertEqual((report['inserted'], report['updated'], report['rejected']), (1, 1, 0))
+        apple = Product.objects.get(sku='A1')
+        self.assertEqual((apple.label, apple.price, apple.created_at), ('Pomme Golden', Decimal('2.75'), created_at))
+        self.assertEqual(Product.objects.count(), 3)
+
+    def test_catalog_cache_and_search_refreshed_once(self):
+        catalog.get_catalog()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            rows = [(i, {'sku': f'S{i}', 'label': f'Produit {i}', 'price': '1'}) for i in range(25)]
+            report = catalog_import.import_products(rows, chunk_size=10)
+        self.assertEqual(report.inserted, 25)
+        self.assertEqual(len(callbacks), 3)  # catalogue, fragments et résumé du tableau de bord, une fois chacun
+        self.assertEqual(len(json.loads(catalog.get_catalog()['body'])['products']), 25)
+        self.assertEqual(search.get_backend().search('produit').count(), 25)
+
+    def test_failing_chunk_rejects_only_its_rows(self):
+        upsert = catalog_import._upsert
+        calls = []
+
+        def fail_second_chunk(products):
+            calls.append(len(products))
+            if len(calls) == 2:
+                raise IntegrityError("contrainte violée")
+            return upsert(products)
+
+        rows = [(i, {'sku': f'S{i}', 'label': f'Produit {i}', 'price': '1'}) for i in range(25)]
+        with mock.patch.object(catalog_import, '_upsert', fail_second_chunk):
+            with self.captureOnCommitCallbacks(execute=True) as callbacks:
+                report = catalog_import.import_products(rows, chunk_size=10)
+        self.assertEqual((report.inserted, report.rejected), (15, 10))
+        self.assertEqual([e['line'] for e in report.errors], list(range(10, 20)))
+        self.assertEqual(Product.objects.count(), 15)
+        self.assertEqual(len(callbacks), 3)
+
+    def test_interrupted_import_still_refreshes_caches(self):
+        def rows():
+            for i in range(15):
+                yield i, {'sku': f'S{i}', 'label': f'Produit {i}', 'price': '1'}
+            raise OSError("lecture interrompue")
+
+        catalog.get_catalog()
+        with self.captureOnCommitCallbacks(execute=True):
+            with self.assertRaises(OSError):
+                catalog_import.import_products(rows(), chunk_size=10)
+        self.assertEqual(len(json.loads(catalog.get_catalog()['body'])['products']), 10)
+
+    def test_command_and_permissions(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'catalogue.json')
+            with open(path, 'w') as f:
+                json.dump([{'sku': 'J1', 'label': 'Tomate', 'price': '1.20', 'Categorie': 'leg'}], f)
+            out = StringIO()
+            call_command('import_products', path, stdout=out)
+            self.assertIn('1 ajouté(s)', out.getvalue())
+        self.assertTrue(Product.objects.filter(sku='J1').exists())
+
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.get(reverse('product-import')).status_code, 200)
+        response = self.client.post(reverse('product-import'), {'file': SimpleUploadedFile('c.csv', self.CSV.encode())})
+        self.assertContains(response, '4 rejeté(s)')
+
+        self.client.force_login(self.customer)
+        self.assertEqual(self.upload(self.CSV).status_code, 302)
+
+
+@override_settings(FOOD_APP_INSTRUMENTATION=True)
+class InstrumentationTests(TestCase):
+    """Middleware d'instrumentation et rapport par vue."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('admin', password='pass1234', is_staff=True)
+        cls.customer = User.objects.create_user('client', password='pass1234')
+        products = Product.objects.bulk_create([
+            Product(label=f'Produit {i}', price=Decimal('1.00'), description='') for i in range(3)
+        ])
+        cls.order = Order.objects.create(customer=cls.customer)
+        OrderArticle.objects.bulk_create([OrderArticle(order=cls.order, product=p, quantity=1) for p in products])
+
+    def setUp(self):
+        instrumentation.reset()
+
+    def test_records_queries_per_view_and_sets_server_timing(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('orderarticle-list'))
+        self.assertRegex(response['Server-Timing'], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ SQL"$')
+
+        stats = {view['view']: view for view in instrumentation.report()}
+        lines = stats['orderarticle-list']
+        self.assertEqual(lines['requests'], 1)
+        self.assertGreater(lines['avg_queries'], 0)
+        self.assertEqual(lines['duplicate_queries'], [])
+
+    def test_duplicate_queries_are_fingerprinted(self):
+        recorder = instrumentation.QueryRecorder()
+        with recorder.capture():
+            for product in Product.objects.all():
+                Product.objects.filter(pk=product.pk).exists()
+        duplicates = recorder.duplicates()
+        self.assertEqual(list(duplicates.values()), [3])
+        self.assertNotIn(str(Product.objects.first().pk) + ' ', next(iter(duplicates)))
+
+    def test_report_is_staff_only(self):
+        self.client.force_login(self.staff)
+        self.client.get(reverse('product-list'))
+        data = self.client.get(reverse('instrumentation-report'), {'format': 'json'}).json()
+        self.assertTrue(data['enabled'])
+        self.assertIn('product-list', [view['view'] for view in data['views']])
+        self.assertContains(self.client.get(reverse('instrumentation-report')), 'product-list')
+
+        self.client.force_login(self.customer)
+        self.assertEqual(self.client.get(reverse('instrumentation-report')).status_code, 302)
+
+    @override_settings(FOOD_APP_INSTRUMENTATION=False)
+    def test_disabled_middleware_is_removed(self):
+        response = self.client.get(reverse('product-list'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(instrumentation.report(), [])
+
+    async def test_async_views_are_instrumented(self):
+        await self.async_client.aforce_login(self.customer)
+        product = await Product.objects.afirst()
+        response = await self.async_client.post(
+            reverse('order-api'), data=json.dumps({'cart_items': [{'product_id': product.pk, 'quantity': 2}]}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertNotIn('desc="0 SQL"', response['Server-Timing'])
+        # Requêtes de l'ORM async comptées, bien qu'exécutées hors de la boucle d'événements
+        stats = {view['view']: view for view in instrumentation.report()}
+        self.assertGreater(stats['order-api']['avg_queries'], 0)
+
+
+
+@override_settings(FOOD_APP_READ_REPLICA='replica')
+class ReplicaRoutingTests(TestCase):
+    """
+    Routage des vues de consultation vers la réplique. L'alias « replica »
+    n'existe pas dans la base de test: le routeur est observé, et les
+    requêtes s'exécutent sur la base par défaut.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('admin', password='pass1234', is_staff=True)
+        cls.customer = User.objects.create_user('client', password='pass1234')
+        cls.product = Product.objects.create(label='Ananas', price=Decimal('3.00'), description='', Categorie='fru')
+        Order.objects.create(customer=cls.customer, client_name='Ancienne')
+
+    def setUp(self):
+        cache.clear()
+        fragments.get_cache().clear()
+
+    def routed(self, send):
+        """Appelle send() et retourne les alias choisis par le routeur pour chaque lecture."""
+        aliases = []
+        original = replicas.ReplicaRouter.db_for_read
+
+        def spy(router, model, **hints):
+            aliases.append(original(router, model, **hints))
+            return None
+
+        with mock.patch.object(replicas.ReplicaRouter, 'db_for_read', spy):
+            response = send()
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response, aliases
+
+    def test_reporting_views_read_from_replica(self):
+        self.client.force_login(self.staff)
+        response, aliases = self.routed(lambda: self.client.get(reverse('order-list')))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('replica', aliases)
+        # Lectures hors vues de consultation, et tableau de bord (tout en cache): base principale
+        for name in ('product-list', 'dashboard'):
+            with self.subTest(view=name):
+                response, aliases = self.routed(lambda: self.client.get(reverse(name)))
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn('replica', aliases)
+
+    def test_cached_values_are_computed_on_primary(self):
+        def fill_caches():
+            metrics.get_summary()
+            fragments.get_or_render('test', lambda: str(Product.objects.count()), depends=['product'])
+            return HttpResponse()
+
+        # Requête d'une vue de consultation: ses autres lectures vont sur la réplique
+        token = replicas._request_state.set({'replica': 'replica', 'wrote': False})
+        try:
+            _, aliases = self.routed(fill_caches)
+            self.assertEqual(replicas._request_state.get()['replica'], 'replica')
+        finally:
+            replicas._request_state.reset(token)
+        self.assertTrue(aliases)
+        self.assertNotIn('replica', aliases)
+
+    def test_export_stream_reads_from_replica(self):
+        self.client.force_login(self.staff)
+        with mock.patch.object(exports, 'stream', wraps=exports.stream) as stream:
+            self.client.get(reverse('order-export'))
+        self.assertEqual(stream.call_args.kwargs['using'], 'replica')
+
+    def test_write_pins_browser_to_primary(self):
+        self.client.force_login(self.customer)
+        url = reverse('orders-user', args=[self.customer.pk])
+        _, aliases = self.routed(lambda: self.client.get(url))
+        self.assertIn('replica', aliases)
+
+        response = self.client.post(
+            reverse('order-view'), content_type='application/json',
+            data=json.dumps({'cart_items': [{'product_id': self.product.pk, 'quantity': 1}]}),
+        )
+        self.assertEqual(response.status_code, 201)
+        cookie = response.cookies[replicas.PIN_COOKIE_NAME]
+        self.assertEqual(cookie['max-age'], 10)
+
+        _, aliases = self.routed(lambda: self.client.get(url))
+        self.assertNotIn('replica', aliases)
+
+    def test_router_outside_requests_and_for_other_apps(self):
+        router = replicas.ReplicaRouter()
+        self.assertIsNone(router.db_for_read(Order))
+        token = replicas._request_state.set({'replica': 'replica', 'wrote': False})
+        try:
+            self.assertEqual(router.db_for_read(Order), 'replica')
+            # Sessions et utilisateurs restent sur la base principale
+            self.assertIsNone(router.db_for_read(User))
+        finally:
+            replicas._request_state.reset(token)
+        self.assertFalse(router.allow_migrate('replica', 'food_app'))
+
+
+@skipUnless(connection.vendor == 'sqlite', "Réglages de connexion propres à SQLite.")
+class SQLiteConnectionTests(TestCase):
+    """Options SQLite des réglages appliquées à chaque connexion."""
+
+    def test_pragmas_and_transaction_mode(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA busy_timeout')
+            self.assertEqual(cursor.fetchone()[0], 20_000)
+        # Le mode WAL est posé par migrate, pas à chaque connexion (fichier de la base modifié)
+        self.assertNotIn('journal_mode', connection.settings_dict['OPTIONS']['init_command'])
+        # atomic() prend le verrou d'écriture dès BEGIN
+        self.assertEqual(connection.transaction_mode, 'IMMEDIATE')
+
+
+@shared_session_cache
+class SessionAuthCacheTests(TestCase):
+    """Session et utilisateur connecté lus depuis le cache, oubliés quand l'utilisateur change."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('admin', password='pass1234', is_staff=True)
+
+    def setUp(self):
+        auth.get_cache().clear()
+        self.client.force_login(self.staff)
+
+    def test_warm_requests_skip_session_and_user_queries(self):
+        auth.get_cache().clear()
+        with self.assertNumQueries(2):
+            self.client.get(reverse('order-view'))
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(reverse('order-view')).status_code, 200)
+
+    def test_password_change_logs_out_other_sessions(self):
+        self.client.get(reverse('order-view'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.staff.set_password('nouveau5678')
+            self.staff.save()
+        # Le hachage de session ne correspond plus: retour à la connexion
+        self.assertEqual(self.client.get(reverse('order-view')).status_code, 302)
+
+    def test_is_staff_change_applies_immediately(self):
+        self.assertEqual(self.client.get(reverse('dashboard')).status_code, 200)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.staff.is_staff = False
+            self.staff.save()
+        self.assertEqual(self.client.get(reverse('dashboard')).status_code, 302)
+
+    def test_logout_forgets_user(self):
+        self.client.get(reverse('order-view'))
+        self.assertIsNotNone(auth.get_cache().get(auth._user_key(self.staff.pk)))
+        self.client.post(reverse('logout'))
+        self.assertIsNone(auth.get_cache().get(auth._user_key(self.staff.pk)))
+        self.assertEqual(self.client.get(reverse('order-view')).status_code, 302)
+
+    @override_settings(SESSION_ENGINE='django.contrib.sessions.backends.db')
+    def test_without_shared_cache_session_is_read_from_database(self):
+        # Réglage par défaut avec le seul cache LocMem, propre à chaque processus
+        self.client.force_login(self.staff)
+        self.client.get(reverse('order-view'))
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(reverse('order-view')).status_code, 200)
+
+
+class StaticAssetTests(TestCase):
+    """collectstatic empreinté et précompressé, servi par StaticAssetMiddleware."""
+
+    def collect(self, backend='food_app.staticfiles.CompressedManifestStaticFilesStorage'):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        storages = {
+            'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+            'staticfiles': {'BACKEND': backend},
+        }
+        settings = self.settings(STATIC_ROOT=tmp.name, STORAGES=storages, FOOD_APP_SERVE_STATIC=True)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        call_command('collectstatic', interactive=False, verbosity=0)
+        return tmp.name
+
+    def get(self, url, encoding='gzip, deflate, br', **headers):
+        response = Client().get(url, HTTP_ACCEPT_ENCODING=encoding, **headers)
+        body = b''.join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def page_view(self, cached=()):
+        """
+        Octets reçus pour afficher l'accueil: la page et ses fichiers statiques,
+        sauf ceux de `cached` (immuables, gardés par le navigateur). Retourne
+        aussi les URL que le navigateur peut garder sans revalider.
+        """
+        response, total = self.get(reverse('index-app'))[0], 0
+        total += len(response.content)
+        immutable = set()
+        for url in re.findall(r'(?:href|src)="(/static/[^"]+)"', response.content.decode()):
+            if url in cached:
+                continue
+            asset, body = self.get(url)
+            self.assertEqual(asset.status_code, 200)
+            total += len(body)
+            if 'immutable' in asset['Cache-Control']:
+                immutable.add(url)
+        return total, immutable
+
+    def test_collectstatic_writes_hashed_compressed_files(self):
+        root = self.collect()
+        with open(os.path.join(root, 'staticfiles.json')) as f:
+            hashed = json.load(f)['paths']['css/styles.css']
+        self.assertRegex(hashed, r'^css/styles\.[0-9a-f]{12}\.css$')
+        with open(os.path.join(root, hashed), 'rb') as f:
+            original = f.read()
+        with open(os.path.join(root, hashed + '.gz'), 'rb') as f:
+            self.assertEqual(gzip.decompress(f.read()), original)
+        self.assertEqual(os.path.exists(os.path.join(root, hashed + '.br')), staticfiles.brotli is not None)
+        self.assertIn(f'/static/{hashed}', Client().get(reverse('index-app')).content.decode())
+
+    def test_encoding_negotiation_and_cache_headers(self):
+        root = self.collect()
+        with open(os.path.join(root, 'staticfiles.json')) as f:
+            url = '/static/' + json.load(f)['paths']['js/base.js']
+
+        response, body = self.get(url, encoding='gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/javascript')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(response['Cache-Control'], staticfiles.IMMUTABLE_CACHE_CONTROL)
+        self.assertNotIn('Content-Disposition', response)
+        _, plain = self.get(url, encoding='gzip;q=0, identity')
+        self.assertEqual(gzip.decompress(body), plain)
+        self.assertLess(len(body), len(plain))
+
+        # Revalidation par ETag, nom non empreinté à courte durée, chemins hors de STATIC_ROOT
+        self.assertEqual(self.get(url, encoding='gzip', HTTP_IF_NONE_MATCH=response['ETag'])[0].status_code, 304)
+        self.assertEqual(self.get('/static/js/base.js')[0]['Cache-Control'], staticfiles.DEFAULT_CACHE_CONTROL)
+        for path in ('/static/../manage.py', '/static/absent.css'):
+            self.assertEqual(self.get(path)[0].status_code, 404)
+
+    def test_bytes_per_page_view(self):
+        # Avant: copie simple, sans empreinte ni compression
+        self.collect('django.contrib.staticfiles.storage.StaticFilesStorage')
+        before_first, immutable = self.page_view()
+        before_repeat, _ = self.page_view(immutable)
+        self.assertEqual(immutable, set())
+        self.assertEqual(before_repeat, before_first)
+
+        self.collect()
+        after_first, immutable = self.page_view()
+        after_repeat, _ = self.page_view(immutable)
+        # Première visite: fichiers compressés; visites suivantes: la page seule
+        self.assertLess(after_first, before_first)
+        self.assertEqual(len(immutable), 2)
+        self.assertEqual(after_repeat, len(Client().get(reverse('index-app')).content))
+        self.assertLess(after_repeat, before_repeat)
+
+    def test_missing_manifest_falls_back_only_when_not_strict(self):
+        with tempfile.TemporaryDirectory() as root:
+            self.assertEqual(staticfiles.CompressedManifestStaticFilesStorage(
+                location=root, manifest_strict=False,
+            ).stored_name('css/styles.css'), 'css/styles.css')
+            with self.assertRaises(ValueError):
+                staticfiles.CompressedManifestStaticFilesStorage(location=root).stored_name('css/styles.css')
+
+    def test_missing_names_are_not_memoized(self):
+        self.collect()
+        middleware = staticfiles.StaticAssetMiddleware(lambda request: None)
+        for i in range(50):
+            self.assertIsNone(middleware.find(f'absent-{i}.css'))
+        self.assertIsNotNone(middleware.find('js/base.js'))
+        self.assertEqual(list(middleware.files), ['js/base.js'])
+
+
+class BenchmarkDataTests(TestCase):
+    """Jeu de données synthétique du banc d'essai (generate_data, benchmark)."""
+
+    def generate(self, **options):
+        return benchmarking.generate(users=5, products=25, orders=60, max_lines=8, batch_size=20, **options)
+
+    def test_generated_dataset_is_consistent_and_reproducible(self):
+        summary = self.generate()
+        self.assertEqual((summary['users'], summary['products'], summary['orders']), (6, 25, 60))
+        self.assertEqual(
+            set(Product.objects.values_list('Categorie', flat=True)), {code for code, _ in Product.CATEGORIE_CHOICES},
+        )
+        for order in Order.objects.with_totals():
+            self.assertEqual((order.computed_total, order.computed_line_count), (order.total_price, order.line_count))
+        self.assertLessEqual(max(Order.objects.values_list('line_count', flat=True)), 8)
+        self.assertEqual(DailyStats.objects.aggregate(n=Sum('order_count'))['n'], 60)
+
+        totals = sorted(Order.objects.values_list('total_price', flat=True))
+        self.assertEqual(self.generate()['order_lines'], summary['order_lines'])
+        self.assertEqual(sorted(Order.objects.values_list('total_price', flat=True)), totals)
+
+    def test_clear_keeps_other_data(self):
+        keep = Product.objects.create(label='Pomme', price=Decimal('1.00'), description='')
+        self.generate()
+        call_command('generate_data', clear=True, stdout=StringIO())
+        self.assertEqual(list(Product.objects.all()), [keep])
+        self.assertFalse(User.objects.exists())
+        self.assertFalse(Order.objects.exists())
+
+    @skipUnless(forecasting.np is not None, "NumPy non installé")
+    def test_regenerate_after_forecasts_and_archiving(self):
+        self.generate(days=30)
+        call_command('forecast_demand', '--horizon', '3', stdout=StringIO())
+        call_command('archive_orders', '--older-than', '10', stdout=StringIO())
+        self.assertTrue(DemandForecast.objects.exists())
+        self.assertTrue(ArchivedOrder.objects.exists())
+        self.generate(days=30)
+        # Plus aucune prévision ni archive ne pointe vers un produit ou une commande supprimés
+        connection.check_constraints()
+        self.assertFalse(DemandForecast.objects.exists())
+        self.assertFalse(ArchivedOrder.objects.exists())
+
+    def test_benchmark_indexes_compares_plans_and_restores_indexes(self):
+        self.generate()
+        out = StringIO()
+        call_command('benchmark_indexes', repeat=1, stdout=out)
+        self.assertIn('Sans les index', out.getvalue())
+        if connection.vendor == 'sqlite':
+            self.assertIn('product_label_idx', out.getvalue())
+        with connection.cursor() as cursor:
+            indexes = connection.introspection.get_constraints(cursor, Product._meta.db_table)
+        self.assertIn('product_categorie_label_idx', indexes)
+
+    def test_benchmark_requires_a_dataset(self):
+        with self.assertRaisesMessage(CommandError, 'generate_data'):
+            call_command('benchmark', stdout=StringIO())
+
+
+@shared_session_cache
+class QueryBudgetTests(TestCase):
+    """
+    Budget de requêtes SQL de chaque route de food_app, pour un visiteur
+    anonyme, un client et un membre du personnel, sur un volume réaliste
+    (des milliers de produits, commandes et lignes).
+
+    Les budgets sont fixes: une requête par ligne affichée (N+1) les fait
+    exploser. Toute nouvelle route doit y être ajoutée (voir
+    test_every_route_has_a_budget). Le cache est vidé avant chaque mesure:
+    ce sont des budgets « à froid ».
+    """
+
+    PRODUCTS = 2000
+    ORDERS = 1000
+    LINES_PER_ORDER = 5
+
+    # nom d'URL -> {rôle: (statut HTTP, requêtes SQL)}
+    # Session et utilisateur connecté sont lus depuis le cache partagé « sessions » (non
+    # vidé): 0 requête pour les charger, contre 2 sans cache (voir SessionAuthCacheTests).
+    BUDGETS = {
+        'register': {'anonymous': (200, 0), 'customer': (200, 0), 'staff': (200, 0)},
+        'login': {'anonymous': (200, 0), 'customer': (200, 0), 'staff': (200, 0)},
+        'logout': {'anonymous': (200, 0), 'customer': (200, 2), 'staff': (200, 2)},
+        'index-app': {'anonymous': (200, 0), 'customer': (200, 0), 'staff': (200, 0)},
+        # Résumé, commandes, produits récents et prévisions de demande (cache vidé)
+        'dashboard': {'anonymous': (302, 0), 'customer': (302, 0), 'staff': (200, 7)},
+        'instrumentation-report': {'anonymous': (302, 0), 'customer': (302, 0), 'staff': (200, 0)},
+        # Compteurs par catégorie (mis en cache ensuite) + la page: pas de COUNT(*)
+        'product-list': {'anonymous': (200, 2), 'customer': (200, 2), 'staff': (200, 2)},
+        'product-by-category': {'anonymous': (200, 2), 'customer': (200, 2), 'staff': (200, 2)},
+        'product-detail': {'anonymous': (302, 0), 'customer': (200, 1), 'staff': (200, 1)},
+        'product-update': {'anonymous': (302, 0), 'customer': (302, 0), 'staff': (200, 1)},
+        'product-delete': {'anonymous': (302, 0), 'customer': (302, 0), 'staff': (200, 1)},
+        'product-search': {'anonymous': (200, 3), 'customer': (200, 3), 'staff': (200, 3)},
+        'product-create': {'anonymous': (302, 0), 'customer': (302, 0), 'staff': (200, 0)},
+        'product-import': {'anonymous': (302, 0), 'customer': (302, 0), 'staff': (200, 0)},
+        # 2 requêtes de reconstruction + le point de sauvegarde de transaction.atomic() (ouvert et relâché)
+        'catalog-api': {'anonymous': (200, 4), 'customer': (200, 4), 'staff': (200, 4)},
+        'order-list': {'anonymous': (302, 0), 'customer': (302, 0), 'staff': (200, 2)},
+        'order-view': {'anonymous': (302, 0), 'customer': (200, 0), 'staff': (200, 0)},
+        # Commandes archivées puis commandes courantes
+        'order-export': {'anonymous': (302, 0), 'customer': (302, 0), 'staff': (200, 2)},
+        # Compteurs des lignes mis à jour par une tâche de fond: sa mise en file (une insertion
+        # après validation) n'est pas comptée, TestCase n'exécutant pas les callbacks on_commit
+        'order-api': {'anonymous': (401, 0), 'customer': (201, 6), 'staff': (201, 6)},
+        'order-batch-api': {'anonymous': (401, 0), 'customer': (200, 7), 'staff': (200, 7)},
+        # Panier en session: prix relus en une requête (cache vidé), session réécrite en 3 (transaction)
+        'cart-api': {'anonymous': (401, 0), 'customer': (200, 0), 'staff': (200, 0)},
+        'cart-line-api': {'anonymous': (401, 0), 'customer': (200, 4), 'staff': (200, 4)},
+        # Produits relus en base dans la transaction de la commande, où place_order ouvre un point de
+        # sauvegarde (2 requêtes), plus la session réécrite
+        'cart-checkout-api': {'anonymous': (401, 0), 'customer': (201, 11), 'staff': (201, 11)},
+        'order-detail': {'anonymous': (302, 0), 'customer': (302, 0), 'staff': (200, 2)},
+        'order-update': {'anonymous': (302, 0), 'customer': (302, 0), 'staff': (200, 2)},
+        'order-delete': {'anonymous': (302, 0), 'customer': (302, 0), 'staff': (200, 1)},
+        'orders-user': {'anonymous': (302, 0), 'customer': (200, 2), 'staff': (200, 2)},
+        'orderarticle-list': {'anonymous': (302, 0), 'customer': (200, 1), 'staff': (200, 1)},
+        'orderarticle-create': {'anonymous': (302, 0), 'customer': (200, 2), 'staff': (200, 2)},
+        'orderarticle-detail': {'anonymous': (302, 0), 'customer': (200, 1), 'staff': (200, 1)},
+        'orderarticle-update': {'anonymous': (302, 0), 'customer': (200, 3), 'staff': (200, 3)},
+        'orderarticle-delete': {'anonymous': (302, 0), 'customer': (200, 1), 'staff': (200, 1)},
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user('admin', password='pass1234', is_staff=True)
+        cls.customer = User.objects.create_user('client', password='pass1234')
+        other = User.objects.create_user('autre', password='pass1234')
+        categories = [code for code, _ in Product.CATEGORIE_CHOICES]
+        products = Product.objects.bulk_create([
+            Product(
+                label=f'Produit {i:04d}', description=f'Description du produit {i}',
+                Categorie=categories[i % len(categories)], price=Decimal(100 + i % 900) / 10,
+            )
+            for i in range(cls.PRODUCTS)
+        ])
+        orders = Order.objects.bulk_create([
+            Order(customer=cls.customer if i % 2 else other, client_name=f'Client {i}',
+                  line_count=cls.LINES_PER_ORDER, total_price=Decimal('50.00'))
+            for i in range(cls.ORDERS)
+        ])
+        OrderArticle.objects.bulk_create([
+            OrderArticle(order=order, product=products[(i * 7 + j) % cls.PRODUCTS], quantity=1 + j,
+                         unit_price=products[(i * 7 + j) % cls.PRODUCTS].price)
+            for i, order in enumerate(orders) for j in range(cls.LINES_PER_ORDER)
+        ], batch_size=1000)
+        # bulk_create n'émet pas de signaux: index de recherche et métriques reconstruits
+        search.get_backend().rebuild()
+        metrics.rebuild()
+
+        cls.product = products[0]
+        cls.order = orders[1]
+        cls.article = OrderArticle.objects.filter(order=cls.order).first()
+        cls.users = {'anonymous': None, 'customer': cls.customer, 'staff': cls.staff}
+
+    def route_args(self, name):
+        if name == 'product-by-category':
+            return [self.product.Categorie]
+        if name.startswith('product-') and name not in ('product-list', 'product-search', 'product-create',
+                                                         'product-import'):
+            return [self.product.pk]
+        if name in ('order-detail', 'order-update', 'order-delete'):
+            return [self.order.pk]
+        if name == 'orders-user':
+            return [self.customer.pk]
+        if name in ('orderarticle-detail', 'orderarticle-update', 'orderarticle-delete'):
+            return [self.article.pk]
+        return []
+
+    def send(self, client, name):
+        url = reverse(name, args=self.route_args(name))
+        if name == 'logout':
+            return client.post(url)
+        if name == 'order-api':
+            body = {'cart_items': [{'product_id': self.product.pk, 'quantity': 2}]}
+            return client.post(url, data=json.dumps(body), content_type='application/json')
+        if name == 'order-batch-api':
+            carts = [
+                {'idempotency_key': f'budget-{i}', 'cart_items': [{'product_id': self.product.pk, 'quantity': 1}]}
+                for i in range(2)
+            ]
+            return client.post(url, data=json.dumps({'orders': carts}), content_type='application/json')
+        if name == 'cart-line-api':
+            body = {'product_id': self.product.pk, 'quantity': 2}
+            return client.post(url, data=json.dumps(body), content_type='application/json')
+        if name == 'cart-checkout-api':
+            return client.post(url, data=json.dumps({'client_name': 'Budget'}), content_type='application/json')
+        if name == 'product-search':
+            return client.get(url, {'q': 'produit 01'})
+        return client.get(url)
+
+    def measure(self, name, role):
+        client = Client()
+        if self.users[role]:
+            client.force_login(self.users[role])
+            if name == 'cart-checkout-api':
+                # Panier non vide à valider
+                self.send(client, 'cart-line-api')
+        cache.clear()
+        fragments.get_cache().clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.send(client, name)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response.status_code, len(ctx.captured_queries)
+
+    def test_every_route_has_a_budget(self):
+        from .urls import urlpatterns
+        self.assertEqual({pattern.name for pattern in urlpatterns}, set(self.BUDGETS))
+
+    def test_query_budgets(self):
+        for name, budgets in self.BUDGETS.items():
+            for role, (status, queries) in budgets.items():
+                with self.subTest(route=name, role=role):
+                    self.assertEqual(self.measure(name, role), (status, queries))
+
+    def test_order_detail_lines_do_not_add_queries(self):
+        # Commande de 5 lignes dans le budget; 50 lignes de plus ne doivent rien coûter
+        OrderArticle.objects.bulk_create([
+            OrderArticle(order=self.order, product=self.product, quantity=1) for _ in range(50)
+        ])
+        self.assertEqual(self.measure('order-detail', 'staff'), self.BUDGETS['order-detail']['staff'])
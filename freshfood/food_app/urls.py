@@ -12,16 +12,27 @@ urlpatterns = [
 
     path('', views.index, name='index-app'),
     path('dashboard/', views.DashboardView.as_view(), name='dashboard'),
+    path('instrumentation/', views.InstrumentationReportView.as_view(), name='instrumentation-report'),
 
     path('products/', views.ProductListView.as_view(), name='product-list'), 
     path('products/<int:pk>/', views.ProductDetailView.as_view(), name='product-detail'),
     path('products/<int:pk>/update/', views.ProductUpdateView.as_view(), name='product-update'),
     path('products/<int:pk>/delete/', views.ProductDeleteView.as_view(), name='product-delete'),
     path('products/search/', views.ProductSearchView.as_view(), name='product-search'), 
+    path('products/category/<str:category>/', views.ProductByCategoryView.as_view(), name='product-by-category'),
     path('products/new/', views.ProductCreateView.as_view(), name='product-create'),
+    path('products/import/', views.ProductImportView.as_view(), name='product-import'),
+
+    path('api/v1/catalog/', views.CatalogView.as_view(), name='catalog-api'),
 
     path('orders/', views.OrderedListView.as_view(), name='order-list'),
     path('orders/new/', views.OrderView.as_view(), name='order-view'),
+    path('orders/export/', views.OrderExportView.as_view(), name='order-export'),
+    path('api/v1/orders/', views.AsyncOrderView.as_view(), name='order-api'),
+    path('api/v1/orders/batch/', views.OrderBatchView.as_view(), name='order-batch-api'),
+    path('api/v1/cart/', views.CartView.as_view(), name='cart-api'),
+    path('api/v1/cart/lines/', views.CartLineView.as_view(), name='cart-line-api'),
+    path('api/v1/cart/checkout/', views.CartCheckoutView.as_view(), name='cart-checkout-api'),
     path('orders/<int:pk>/', views.OrderDetailView.as_view(), name='order-detail'),
     path('orders/<int:pk>/update/', views.OrderUpdateView.as_view(), name='order-update'),
     path('orders/<int:pk>/delete/', views.OrderDeleteView.as_view(), name='order-delete'),
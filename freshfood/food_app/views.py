@@ -1,6 +1,12 @@
-from django.shortcuts import render, redirect
+import json
+
+from asgiref.sync import sync_to_async
+from django.shortcuts import get_object_or_404, render, redirect
 from django.views.generic import ListView, DetailView, UpdateView, CreateView, DeleteView, FormView, TemplateView, RedirectView
-from .models import Product, Order, OrderArticle
+from .models import ArchivedOrder, Product, Order, OrderArticle
+from .pagination import CountedPaginator, KeysetPaginationMixin
+from .replicas import ReplicaReadMixin
+from . import archive, cart, catalog, catalog_import, exports, forecasting, instrumentation, metrics, orders, search
 from django.views import View
 from django.contrib.auth.models import User
 from django.contrib.auth.forms import UserCreationForm
@@ -9,10 +15,11 @@ from django.contrib.auth.decorators import  login_required
 from django.contrib.auth.mixins import UserPassesTestMixin
 from django.contrib.auth.decorators import login_required
 from django.utils.decorators import method_decorator
-from django.db.models import Prefetch
 from django.urls import reverse_lazy
-from django.db import transaction
-from django.http import JsonResponse, HttpResponseBadRequest
+from django.db import IntegrityError, transaction
+from django.http import Http404, HttpResponse, JsonResponse, HttpResponseBadRequest, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.views.decorators.csrf import ensure_csrf_cookie
 
 
 # Create your views here.
@@ -66,39 +73,26 @@ class ProductCreateView(AdminRequiredMixin, CreateView):
 
 # List view for all products
 class ProductListView(ListView):
+    """
+    Catalogue regroupé par catégorie: le tri (Categorie, label, id) est fait
+    en SQL, si bien que chaque catégorie est contiguë d'une page à l'autre;
+    le template regroupe la page avec {% regroup %}.
+    """
     model = Product
-    ordering = ["label"]
+    # id départage les libellés identiques: pagination stable, couverte par product_categorie_label_idx
+    ordering = ["Categorie", "label", "id"]
     template_name = 'food_app/product_list.html'
     context_object_name = 'products'
     paginate_by = 10
 
+    def get_paginator(self, queryset, per_page, **kwargs):
+        # Nombre total tiré des compteurs par catégorie en cache: pas de COUNT(*)
+        total = sum(category['count'] for category in catalog.get_category_counts())
+        return CountedPaginator(queryset, per_page, count=total, **kwargs)
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        
-        # Les produits de la page courante (grâce à la pagination)
-        all_products_on_page = context['object_list'] 
-        
-        # Récupérer la correspondance code -> label (ex: 'vf' -> 'viancde fraiche')
-        category_map = dict(Product.CATEGORIE_CHOICES)
-        
-        categorized_products = {}
-        
-        # Regrouper les produits par leur nom de catégorie lisible
-        for product in all_products_on_page:
-            # Utiliser le code (ex: 'vf') pour trouver le libellé ('viancde fraiche')
-            category_code = product.Categorie
-            category_label = category_map.get(category_code, 'Catégorie Inconnue')
-            
-            if category_label not in categorized_products:
-                categorized_products[category_label] = []
-                
-            categorized_products[category_label].append(product)
-            
-        # Ajouter le dictionnaire groupé au contexte
-        # Trier par nom de catégorie pour un affichage cohérent
-        sorted_categorized_products = dict(sorted(categorized_products.items()))
-        context['categorized_products'] = sorted_categorized_products
-        
+        context['categories'] = catalog.get_category_counts()
         return context
 
 # Detail view for a single product
@@ -121,16 +115,47 @@ class ProductDeleteView(AdminRequiredMixin, DeleteView):
     template_name = 'food_app/product_confirm_delete.html'
     success_url = '/products/'
 
-# Search view for products by label
+# Import en masse du catalogue fournisseur (upsert par SKU)
+class ProductImportView(AdminRequiredMixin, View):
+    """
+    Formulaire d'envoi du fichier catalogue (CSV, JSON ou JSON Lines).
+    Le rapport (ajoutés / mis à jour / rejetés, lignes/s) est affiché dans
+    la page, ou renvoyé en JSON si le client le demande (Accept: application/json).
+    """
+
+    template_name = 'food_app/product_import.html'
+
+    def get(self, request, *args, **kwargs):
+        return render(request, self.template_name)
+
+    def post(self, request, *args, **kwargs):
+        upload = request.FILES.get('file')
+        wants_json = 'application/json' in request.headers.get('Accept', '')
+        if upload is None:
+            if wants_json:
+                return JsonResponse({'message': "Aucun fichier reçu."}, status=400)
+            return render(request, self.template_name, {'error': "Aucun fichier reçu."}, status=400)
+
+        fmt = request.POST.get('format')
+        if fmt not in catalog_import.FORMATS:
+            fmt = catalog_import.guess_format(upload.name)
+        report = catalog_import.import_products(catalog_import.read_rows(upload.file, fmt))
+
+        if wants_json:
+            return JsonResponse(report.as_dict())
+        return render(request, self.template_name, {'report': report})
+
+
+# Search view for products (label + description, classée, paginée)
 class ProductSearchView(ListView):
     model = Product
     template_name = 'food_app/product_search.html'
+    context_object_name = 'products'
+    paginate_by = 10
 
     def get_queryset(self):
-        query = self.request.GET.get('q')
-        if query:
-            return Product.objects.filter(label__icontains=query)
-        return Product.objects.none()
+        # Index plein texte (FTS5 / tsvector) au lieu d'un balayage icontains
+        return search.get_backend().search(self.request.GET.get('q', ''))
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -139,16 +164,30 @@ class ProductSearchView(ListView):
 
 # View for products by category
 class ProductByCategoryView(ListView):
+    """Produits d'une catégorie (code de CATEGORIE_CHOICES), triés par libellé et paginés."""
     model = Product
     template_name = 'food_app/product_by_category.html'
+    context_object_name = 'products'
+    paginate_by = 10
+
+    def dispatch(self, request, *args, **kwargs):
+        self.categories = catalog.get_category_counts()
+        self.category = next((c for c in self.categories if c['code'] == kwargs['category']), None)
+        if self.category is None:
+            raise Http404("Catégorie inconnue.")
+        return super().dispatch(request, *args, **kwargs)
 
     def get_queryset(self):
-        category = self.kwargs.get('category')
-        return Product.objects.filter(category__name__iexact=category)
-    
+        # Servi par l'index (Categorie, label)
+        return Product.objects.filter(Categorie=self.category['code']).order_by('label', 'id')
+
+    def get_paginator(self, queryset, per_page, **kwargs):
+        return CountedPaginator(queryset, per_page, count=self.category['count'], **kwargs)
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['category'] = self.kwargs.get('category', '')
+        context['category'] = self.category
+        context['categories'] = self.categories
         return context
 
 ### Order Views ###   
@@ -162,10 +201,30 @@ class OrderCreateView(CreateView):
     success_url = '/order-articles/new/'
 
 
+def serialize_order(order):
+    """Représentation JSON d'une commande et de ses lignes pré-chargées."""
+    return {
+        'id': order.id,
+        'client_name': order.client_name,
+        'customer': order.customer.username,
+        'created_at': order.created_at.isoformat(),
+        'total_price': str(order.get_total_price()),
+        'line_count': order.line_count,
+        'lines': [
+            {
+                'product': article.product.label,
+                'quantity': article.quantity,
+                'unit_price': str(article.unit_price),
+                'subtotal': str(article.get_subtotal()),
+            }
+            for article in getattr(order, 'articles', [])
+        ],
+    }
+
+
 # List view for all orders
-class OrderedListView(AdminRequiredMixin, ListView):
+class OrderedListView(AdminRequiredMixin, ReplicaReadMixin, KeysetPaginationMixin, ListView):
     model = Order
-    ordering = ['-created_at']
     template_name = 'food_app/ordered_list.html'
     context_object_name = 'orders'
     
@@ -173,32 +232,67 @@ class OrderedListView(AdminRequiredMixin, ListView):
         """
         Optimise les requêtes pour éviter le problème N+1.
         - select_related pour le client (ForeignKey)
-        - prefetch_related pour les articles de la commande (relation inverse)
+        - with_lines() pour les articles et leurs produits (order.articles),
+          lignes dont get_total_price() se sert aussi pour le total
         """
-        
-        # Le nom par défaut de la relation inverse de OrderArticle vers Order est 'orderarticle_set'.
-        # Nous utilisons Prefetch pour charger les articles et leurs produits associés.
-        order_articles_prefetch = Prefetch(
-            'orderarticle_set',  # Le related_name par défaut de OrderArticle vers Order
-            queryset=OrderArticle.objects.select_related('product'),
-            to_attr='articles' # Nomme l'attribut de résultat 'articles' pour une utilisation facile dans le template
+        # Le tri (-created_at, -id) est appliqué par la pagination par clé
+        return Order.objects.with_lines().select_related(
+            'customer'  # Chargement de l'utilisateur (User)
         )
 
-        return Order.objects.all().select_related(
-            'customer'  # Chargement de l'utilisateur (User)
-        ).prefetch_related(
-            order_articles_prefetch
-        ).order_by('-created_at')
+    def serialize_object(self, order):
+        return serialize_order(order)
+
+class OrderExportView(AdminRequiredMixin, ReplicaReadMixin, View):
+    """
+    Export en flux des commandes et de leurs lignes pour la comptabilité.
+
+    Paramètres: format=csv|ndjson, start/end=AAAA-MM-JJ (inclus),
+    category=<code> (répétable), gzip=1 pour un fichier .gz compressé à la volée.
+    """
+
+    def get(self, request, *args, **kwargs):
+        fmt = request.GET.get('format', 'csv')
+        if fmt not in exports.FORMATS:
+            return HttpResponseBadRequest(f"Format inconnu (valeurs possibles: {', '.join(exports.FORMATS)}).")
+        try:
+            start, end, categories = exports.parse_filters(
+                request.GET.get('start'), request.GET.get('end'), request.GET.getlist('category'),
+            )
+        except ValueError as e:
+            return HttpResponseBadRequest(str(e))
+        compress = request.GET.get('gzip') == '1'
+
+        response = StreamingHttpResponse(
+            # Flux consommé après la fin de la requête: la base lue est passée explicitement
+            exports.stream(fmt, start, end, categories, compress=compress, using=self.read_db),
+            content_type='application/gzip' if compress else exports.CONTENT_TYPES[fmt],
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{exports.filename(fmt, start, end, compress)}"'
+        )
+        return response
+
 
 # Detail view for a single order
 class OrderDetailView(AdminRequiredMixin, DetailView):
     model = Order
     template_name = 'food_app/order_detail.html'
     context_object_name = 'order'
+    queryset = Order.objects.select_related('customer')
+
+    def get_object(self, queryset=None):
+        try:
+            return super().get_object(queryset)
+        except Http404:
+            # Commande ancienne déplacée dans les archives (voir archive.py): lecture seule
+            return get_object_or_404(ArchivedOrder.objects.select_related('customer'), pk=self.kwargs['pk'])
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['order_articles'] = OrderArticle.objects.filter(order=self.object)
+        context['archived'] = isinstance(self.object, ArchivedOrder)
+        # select_related: sans lui, chaque ligne affichée chargeait son produit (N+1)
+        context['order_articles'] = archive.lines_of(self.object)
         return context
     
 # Delete view for removing an order
@@ -217,9 +311,36 @@ class OrderUpdateView(AdminRequiredMixin, UpdateView):
 
 ### Order Article Views ###
 
+class OrderTotalsMixin:
+    """
+    Mixin pour les vues OrderArticle: maintient Order.total_price et
+    Order.line_count dans la même transaction que l'écriture de la ligne.
+    """
+
+    def _refresh_order_totals(self, *orders):
+        for order in {o.pk: o for o in orders if o is not None}.values():
+            order.refresh_totals()
+
+    def form_valid(self, form):
+        with transaction.atomic():
+            # Commande d'origine lue en base: le formulaire a déjà pu modifier
+            # instance.order (ligne déplacée vers une autre commande)
+            previous_order = None
+            current = getattr(self, 'object', None)
+            if current is not None and current.pk:
+                previous_order = Order.objects.filter(orderarticle__pk=current.pk).first()
+            if 'product' in getattr(form, 'changed_data', ()):
+                # Nouveau produit: on fige son prix courant
+                form.instance.unit_price = form.instance.product.price
+            response = super().form_valid(form)
+            # Après une suppression, self.object.pk vaut None
+            new_order = self.object.order if self.object.pk else None
+            self._refresh_order_totals(previous_order, new_order)
+        return response
+
 # Create view for adding articles to an order
 @method_decorator(login_required, name='dispatch') # Ceci est maintenant redondant
-class OrderArticleCreateView(CreateView):
+class OrderArticleCreateView(OrderTotalsMixin, CreateView):
     model = OrderArticle
     fields = ['product', 'quantity', 'order']
     template_name = 'food_app/orderarticle_form.html'
@@ -227,36 +348,48 @@ class OrderArticleCreateView(CreateView):
 
 # Delete view for removing an order article
 @method_decorator(login_required, name='dispatch') # Ceci est maintenant redondant
-class OrderArticleDeleteView(DeleteView):
+class OrderArticleDeleteView(OrderTotalsMixin, DeleteView):
     model = OrderArticle
+    queryset = OrderArticle.objects.select_related('product', 'order')
     template_name = 'food_app/orderarticle_confirm_delete.html'
     success_url = '/orders/'
 
 # Update view for editing an order article
 @method_decorator(login_required, name='dispatch') # Ceci est maintenant redondant
-class OrderArticleUpdateView(UpdateView):   
+class OrderArticleUpdateView(OrderTotalsMixin, UpdateView):   
     model = OrderArticle
+    queryset = OrderArticle.objects.select_related('product', 'order')
     fields = ['product', 'quantity', 'order']
     template_name_suffix = '_update_form'
     success_url = '/orders/'
 
 # List view for all order articles
 @method_decorator(login_required, name='dispatch') # Ceci est maintenant redondant
-class OrderArticleListView(ListView):
+class OrderArticleListView(KeysetPaginationMixin, ListView):
     model = OrderArticle
-    ordering = ['order']
+    # Commandes les plus récentes d'abord; l'index de la clé étrangère order_id couvre ce tri
+    keyset_ordering = ('-order_id', '-id')
     template_name = 'food_app/orderarticle_list.html'
     context_object_name = 'order_articles'
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        context['products'] = Product.objects.all()
-        return context
+    def get_queryset(self):
+        return OrderArticle.objects.select_related('product', 'order')
+
+    def serialize_object(self, article):
+        return {
+            'id': article.id,
+            'order_id': article.order_id,
+            'product': article.product.label,
+            'quantity': article.quantity,
+            'unit_price': str(article.unit_price),
+            'subtotal': str(article.get_subtotal()),
+        }
 
 # Detail view for a single order article
 @method_decorator(login_required, name='dispatch') # Ceci est maintenant redondant
 class OrderArticleDetailView(DetailView):
     model = OrderArticle
+    queryset = OrderArticle.objects.select_related('product', 'order')
     template_name = 'food_app/orderarticle_detail.html'
     context_object_name = 'order_article'   
 
@@ -265,22 +398,37 @@ class OrderArticleDetailView(DetailView):
 DEFAULT_CUSTOMER_ID = 1
 
 
+class CatalogView(View):
+    """
+    Catalogue produits en JSON (lu par le formulaire de commande).
+
+    Répond 304 si l'ETag présenté (If-None-Match) correspond toujours au
+    catalogue: le client ne retélécharge que lorsque les produits changent.
+    """
+
+    def get(self, request, *args, **kwargs):
+        data = catalog.get_catalog()
+        response = HttpResponse(data['body'], content_type='application/json')
+        response['ETag'] = data['etag']
+        # Réutilisable par tout cache, mais toujours revalidé auprès du serveur
+        response['Cache-Control'] = 'public, no-cache'
+        return get_conditional_response(request, etag=data['etag'], response=response)
+
+
 @method_decorator(login_required, name='dispatch')
 class OrderView(View):
     template_name = 'food_app/order_form.html'
 
+    @method_decorator(ensure_csrf_cookie)
     def get(self, request, *args, **kwargs):
         """
-        Affiche la liste des produits disponibles.
+        Affiche le formulaire de commande. La page ne contient plus les produits:
+        le JavaScript les charge depuis le catalogue JSON (catalog-api), et lit
+        le jeton CSRF dans le cookie: la page est légère et identique pour tous.
+        Elle n'est pas mise en cache par le navigateur, qui la garderait après
+        une déconnexion ou un changement de compte.
         """
-        # Récupérer tous les produits avec leurs IDs et prix
-        products = Product.objects.all().values('id', 'label', 'description', 'price')
-        
-        # Passer les données à la template (le reste du panier est géré par JS)
-        context = {
-            'products': list(products),
-        }
-        return render(request, self.template_name, context)
+        return render(request, self.template_name)
 
     def post(self, request, *args, **kwargs):
         """
@@ -289,7 +437,6 @@ class OrderView(View):
         try:
             # 1. Récupérer les données de la requête
             # Les données doivent être envoyées en JSON depuis le JavaScript
-            import json
             data = json.loads(request.body)
             
             client_name = data.get('client_name')
@@ -314,40 +461,13 @@ class OrderView(View):
 
             # 3. Utiliser une transaction pour garantir l'atomicité
             with transaction.atomic():
-                # Création de l'objet Order principal
-                order = Order.objects.create(
-                    customer=customer,
-                    client_name=client_name or customer.username
-                )
-
                 # Dictionnaire pour valider les IDs de produits et les prix
-                product_map = {
-                    p.id: p for p in Product.objects.filter(id__in=[item['product_id'] for item in cart_items])
-                }
-
-                # Création des OrderArticle
-                order_articles = []
-                for item in cart_items:
-                    product_id = item.get('product_id')
-                    quantity = int(item.get('quantity', 0))
-
-                    if quantity > 0 and product_id in product_map:
-                        product = product_map[product_id]
-                        
-                        order_articles.append(
-                            OrderArticle(
-                                order=order,
-                                product=product,
-                                quantity=quantity
-                            )
-                        )
-                
-                # Enregistrement en masse des articles de la commande
-                if not order_articles:
-                    # Si aucune ligne valide, annuler la commande (rollback de la transaction)
-                    raise ValueError("Aucun article valide trouvé dans le panier.")
-                    
-                OrderArticle.objects.bulk_create(order_articles)
+                product_map = Product.objects.in_bulk(orders.cart_product_ids(cart_items))
+
+                # Lignes validées puis commande enregistrée avec ses totaux
+                # (ValueError si aucune ligne valide: rollback de la transaction)
+                order_articles, total_price = orders.build_lines(cart_items, product_map)
+                order = orders.place_order(customer, client_name, order_articles, total_price)
 
             # 4. Réponse de succès
             return JsonResponse({'message': 'Commande enregistrée avec succès!', 'order_id': order.id}, status=201)
@@ -362,45 +482,228 @@ class OrderView(View):
             return JsonResponse({'message': f'Erreur lors de l\'enregistrement: {e}'}, status=500)
 
 
+class AsyncOrderView(View):
+    """
+    Variante asynchrone de la prise de commande (JSON, pile ASGI).
+
+    L'authentification, le décodage et le chargement des produits se font
+    sans bloquer la boucle d'événements (ORM asynchrone); seule l'écriture,
+    transactionnelle, passe par sync_to_async car les transactions de
+    Django ne sont pas disponibles en mode asynchrone.
+    """
+
+    http_method_names = ['post']
+
+    async def post(self, request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return JsonResponse({'message': 'Authentification requise.'}, status=401)
+
+        try:
+            data = json.loads(request.body)
+        except json.JSONDecodeError:
+            return HttpResponseBadRequest("Format de données JSON invalide.")
+        if not isinstance(data, dict):
+            return HttpResponseBadRequest("Objet JSON attendu.")
+
+        cart_items = data.get('cart_items', [])
+        if not cart_items:
+            return HttpResponseBadRequest("Le panier est vide.")
+
+        try:
+            product_map = await Product.objects.ain_bulk(orders.cart_product_ids(cart_items))
+            order_articles, total_price = orders.build_lines(cart_items, product_map)
+        except (ValueError, TypeError, AttributeError) as e:
+            return HttpResponseBadRequest(f"Erreur de validation: {e}")
+
+        order = await sync_to_async(orders.place_order)(
+            user, data.get('client_name'), order_articles, total_price
+        )
+        return JsonResponse({'message': 'Commande enregistrée avec succès!', 'order_id': order.id}, status=201)
+
+
+class OrderBatchView(View):
+    """
+    Soumission par lots pour les clients à fort volume (terminaux de caisse).
+
+    Corps: {"orders": [{"idempotency_key": "...", "client_name": "...", "cart_items": [...]}, ...]}.
+    Chaque panier est traité indépendamment et reçoit son propre résultat;
+    renvoyer un lot déjà accepté (même clé) ne crée aucune commande en double.
+    """
+
+    http_method_names = ['post']
+
+    def post(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'message': 'Authentification requise.'}, status=401)
+
+        try:
+            carts = json.loads(request.body).get('orders')
+        except (json.JSONDecodeError, AttributeError):
+            return HttpResponseBadRequest("Format de données JSON invalide.")
+        if not isinstance(carts, list) or not carts:
+            return HttpResponseBadRequest("Le lot de commandes est vide.")
+        if len(carts) > orders.MAX_BATCH_SIZE:
+            return HttpResponseBadRequest(f"Lot trop volumineux (maximum {orders.MAX_BATCH_SIZE} commandes).")
+
+        results = orders.place_orders_batch(request.user, carts)
+        summary = {status: 0 for status in ('created', 'existing', 'rejected')}
+        for result in results:
+            summary[result['status']] += 1
+        return JsonResponse({'summary': summary, 'results': results})
+
+
+class CartApiView(View):
+    """
+    Base des vues du panier côté serveur (voir cart.py): authentification
+    requise, réponses JSON avec l'état complet du panier et son total.
+    """
+
+    def dispatch(self, request, *args, **kwargs):
+        if not request.user.is_authenticated:
+            return JsonResponse({'message': 'Authentification requise.'}, status=401)
+        self.cart = cart.Cart(request.session)
+        return super().dispatch(request, *args, **kwargs)
+
+    def read_json(self):
+        data = json.loads(self.request.body or b'{}')
+        if not isinstance(data, dict):
+            raise ValueError("Objet JSON attendu.")
+        return data
+
+    def cart_response(self, status=200):
+        return JsonResponse(self.cart.as_dict(), status=status)
+
+
+class CartView(CartApiView):
+    """GET: contenu du panier (revérifié contre les prix en cache); DELETE: vide le panier."""
+
+    http_method_names = ['get', 'delete']
+
+    def get(self, request, *args, **kwargs):
+        changes = self.cart.refresh()
+        return JsonResponse({**self.cart.as_dict(), 'changes': changes})
+
+    def delete(self, request, *args, **kwargs):
+        self.cart.clear()
+        return self.cart_response()
+
+
+class CartLineView(CartApiView):
+    """
+    POST {product_id, quantity}: ajoute au panier (quantité cumulée).
+    PUT {product_id, quantity}: fixe la quantité, 0 retire la ligne.
+    DELETE {product_id}: retire la ligne.
+    """
+
+    http_method_names = ['post', 'put', 'delete']
+
+    def post(self, request, *args, **kwargs):
+        return self.change(lambda data: self.cart.add(data.get('product_id'), data.get('quantity', 1)))
+
+    def put(self, request, *args, **kwargs):
+        return self.change(lambda data: self.cart.set(data.get('product_id'), data.get('quantity')))
+
+    def delete(self, request, *args, **kwargs):
+        return self.change(lambda data: self.cart.remove(data.get('product_id')))
+
+    def change(self, apply):
+        try:
+            apply(self.read_json())
+        except json.JSONDecodeError:
+            return HttpResponseBadRequest("Format de données JSON invalide.")
+        except ValueError as e:
+            return JsonResponse({**self.cart.as_dict(), 'message': str(e)}, status=400)
+        return self.cart_response()
+
+
+class CartCheckoutView(CartApiView):
+    """
+    POST {client_name}: enregistre la commande du panier en une transaction,
+    aux prix relus en base. 409 avec le panier mis à jour si le catalogue
+    a changé depuis l'ajout des lignes.
+    """
+
+    http_method_names = ['post']
+
+    def post(self, request, *args, **kwargs):
+        try:
+            client_name = self.read_json().get('client_name')
+            order = self.cart.checkout(request.user, client_name)
+        except json.JSONDecodeError:
+            return HttpResponseBadRequest("Format de données JSON invalide.")
+        except cart.CartChanged as e:
+            return JsonResponse({**self.cart.as_dict(), 'message': str(e), 'changes': e.changes}, status=409)
+        except ValueError as e:
+            return JsonResponse({**self.cart.as_dict(), 'message': str(e)}, status=400)
+        except IntegrityError:
+            # Produit supprimé entre la vérification et l'écriture
+            changes = self.cart.refresh()
+            return JsonResponse({
+                **self.cart.as_dict(), 'message': "Un produit n'est plus disponible.", 'changes': changes,
+            }, status=409)
+        return JsonResponse({'message': 'Commande enregistrée avec succès!', 'order_id': order.id}, status=201)
+
+
 class DashboardView(AdminRequiredMixin, TemplateView):
+    """
+    Tableau de bord: résumé et blocs en cache, calculés sur la base
+    principale (une réplique en retard remplirait le cache de données
+    périmées pour tous, voir replicas.py).
+    """
+
     template_name = 'food_app/dashboard.html'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        context['total_products'] = Product.objects.count()
-        context['total_orders'] = Order.objects.count()
-        context['total_order_articles'] = OrderArticle.objects.count()
-        context['recent_orders'] = Order.objects.order_by('-created_at')[:5]
+        # Compteurs et chiffre d'affaires lus depuis le cache (voir metrics.py)
+        context.update(metrics.get_summary())
+        context['recent_orders'] = Order.objects.select_related('customer').order_by('-created_at')[:5]
         context['recent_products'] = Product.objects.order_by('-id')[:5]
-        context['all_orders'] = Order.objects.all()
-        context['all_products'] = Product.objects.all()
+        # Prévisions enregistrées par forecast_demand (requête paresseuse: lue seulement hors cache)
+        context['forecast_day'] = forecasting.tomorrow()
+        context['forecasts'] = forecasting.upcoming(context['forecast_day'])
 
         return context
 
+
+class InstrumentationReportView(AdminRequiredMixin, View):
+    """
+    Rapport de l'instrumentation par vue (voir instrumentation.py):
+    HTML par défaut, JSON avec ?format=json; POST remet les compteurs à zéro.
+    """
+
+    template_name = 'food_app/instrumentation_report.html'
+
+    def get(self, request, *args, **kwargs):
+        stats = instrumentation.report()
+        fragment_stats = instrumentation.fragment_report()
+        enabled = instrumentation.is_enabled()
+        accept = request.headers.get('Accept', '')
+        if request.GET.get('format') == 'json' or ('application/json' in accept and 'text/html' not in accept):
+            return JsonResponse({'enabled': enabled, 'views': stats, 'fragments': fragment_stats})
+        return render(request, self.template_name, {
+            'enabled': enabled, 'stats': stats, 'fragment_stats': fragment_stats,
+        })
+
+    def post(self, request, *args, **kwargs):
+        instrumentation.reset()
+        return redirect('instrumentation-report')
+
  
 @method_decorator(login_required, name='dispatch')
-class UserOrderListView(ListView):
+class UserOrderListView(ReplicaReadMixin, KeysetPaginationMixin, ListView):
     model = Order
     template_name = 'food_app/user_order_list.html'
     context_object_name = 'user_orders'
 
     def get_queryset(self):
-        # Définition de la pré-récupération des articles de commande
-        # On utilise le related_name par défaut 'orderarticle_set' et on charge les produits associés
-        order_articles_prefetch = Prefetch(
-            'orderarticle_set',  
-            queryset=OrderArticle.objects.select_related('product'),
-            to_attr='articles' # Nomme la liste d'articles dans le template : order.articles
-        )
-
-        # Récupérer uniquement les commandes de l'utilisateur connecté, 
-        # optimiser le chargement et trier par date
-        return Order.objects.filter(customer=self.request.user).select_related(
+        # Récupérer uniquement les commandes de l'utilisateur connecté,
+        # avec leurs articles pré-chargés (order.articles) et trier par date
+        # (tri -created_at, -id appliqué par la pagination par clé)
+        return Order.objects.filter(customer=self.request.user).with_lines().select_related(
             'customer'
-        ).prefetch_related(
-            order_articles_prefetch
-        ).order_by('-created_at')
-    
-    
-
+        )
 
+    def serialize_object(self, order):
+        return serialize_order(order)
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -93,14 +94,23 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    # Fichiers statiques empreintés servis avant sessions et vues (retiré en développement)
+    'food_app.staticfiles.StaticAssetMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    # Temps de réponse et requêtes SQL par vue (rapport sur /instrumentation/)
+    'food_app.instrumentation.InstrumentationMiddleware',
+    # Lectures sur la réplique et épinglage après écriture (retiré sans réplique)
+    'food_app.replicas.ReplicaRoutingMiddleware',
 ]
 
+# Instrumentation des vues: désactivée, le middleware est retiré au démarrage (coût nul)
+FOOD_APP_INSTRUMENTATION = DEBUG
+
 ROOT_URLCONF = 'freshfood.urls'
 #AUTH_USER_MODEL = 'account.CustomUser'
 
@@ -125,12 +135,188 @@ WSGI_APPLICATION = 'freshfood.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+#
+# SQLite par défaut. DATABASE_URL (par exemple postgres://user:pass@hôte/base)
+# sélectionne une autre base via dj-database-url. Les connexions sont
+# conservées DATABASE_CONN_MAX_AGE secondes et vérifiées avant réutilisation.
+
+DATABASE_CONN_MAX_AGE = int(os.environ.get('DATABASE_CONN_MAX_AGE', 60))
+
+# Mode WAL (les lectures ne bloquent plus l'écrivain, et inversement): il est
+# enregistré dans le fichier de la base, « manage.py migrate » le pose une fois
+# (food_app/signals.py). Les fichiers -wal et -shm qui l'accompagnent ne sont
+# pas suivis par git.
+#
+# Réglages propres à chaque connexion SQLite:
+# - synchronous=NORMAL: pas de fsync à chaque validation en mode WAL
+#   (durable jusqu'au dernier point de contrôle en cas de coupure courant);
+# - cache_size: 20 Mo de pages en mémoire;
+# - mmap: lectures des pages par projection mémoire;
+# - timeout: attente (en secondes) du verrou d'écriture au lieu d'échouer;
+# - IMMEDIATE: transaction.atomic() prend le verrou d'écriture dès le début.
+#   En mode différé, deux transactions qui lisent puis écrivent s'interbloquent
+#   et l'une échoue aussitôt (« database is locked ») malgré le timeout.
+SQLITE_OPTIONS = {
+    'init_command': (
+        'PRAGMA synchronous=NORMAL;'
+        'PRAGMA mmap_size=268435456;'
+        'PRAGMA cache_size=-20000'
+    ),
+    'timeout': 20,
+    'transaction_mode': 'IMMEDIATE',
+}
+
+if os.environ.get('DATABASE_URL'):
+    import dj_database_url
+
+    DATABASES = {
+        'default': dj_database_url.config(conn_max_age=DATABASE_CONN_MAX_AGE, conn_health_checks=True),
+    }
+    if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql' and os.environ.get('DATABASE_POOL_SIZE'):
+        # Pool de connexions intégré (psycopg 3 avec psycopg_pool): remplace
+        # les connexions persistantes, incompatibles avec lui
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+            'min_size': 2,
+            'max_size': int(os.environ['DATABASE_POOL_SIZE']),
+            'timeout': 10,
+        }
+    elif DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+        DATABASES['default'].setdefault('OPTIONS', {}).update(SQLITE_OPTIONS)
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': DATABASE_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': SQLITE_OPTIONS,
+        }
     }
+
+# Réplique en lecture optionnelle (food_app/replicas.py): liste des commandes,
+# tableau de bord, historique client et exports y lisent. En local, deux
+# fichiers SQLite suffisent, par exemple
+# DATABASE_REPLICA_URL=sqlite:////tmp/replica.sqlite3 puis
+# « manage.py sync_replica » pour recopier la base principale.
+if os.environ.get('DATABASE_REPLICA_URL'):
+    import dj_database_url
+
+    DATABASES['replica'] = dj_database_url.parse(
+        os.environ['DATABASE_REPLICA_URL'], conn_max_age=DATABASE_CONN_MAX_AGE, conn_health_checks=True,
+    )
+    if DATABASES['replica']['ENGINE'] == 'django.db.backends.sqlite3':
+        DATABASES['replica'].setdefault('OPTIONS', {}).update(SQLITE_OPTIONS)
+    # Les tests lisent la base de test principale sous cet alias
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+    FOOD_APP_READ_REPLICA = 'replica'
+else:
+    FOOD_APP_READ_REPLICA = None
+
+DATABASE_ROUTERS = ['food_app.replicas.ReplicaRouter']
+
+# Durée pendant laquelle un navigateur qui vient d'écrire relit la base principale
+FOOD_APP_REPLICA_PIN_SECONDS = 10
+
+# Utilisateur de la session gardé en cache (food_app/auth.py), oublié à chaque
+# modification et à la déconnexion. ModelBackend reste listé après lui: les
+# sessions ouvertes avant ce réglage (chemin du backend enregistré dans la
+# session) restent valides.
+AUTHENTICATION_BACKENDS = [
+    'food_app.auth.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+FOOD_APP_USER_CACHE_SECONDS = 60
+
+# Tâches de fond (food_app/tasks.py): compteurs de lignes et de chiffre
+# d'affaires du tableau de bord après une commande. Avec
+# FOOD_APP_TASK_WORKER=1, elles sont mises en file et « manage.py worker »
+# doit tourner en permanence, à côté du serveur web (sinon les chiffres du
+# tableau de bord n'avancent plus). Sans worker, elles s'exécutent dans la
+# requête, juste après la validation de sa transaction.
+FOOD_APP_TASK_WORKER = os.environ.get('FOOD_APP_TASK_WORKER') == '1'
+
+# Âge (jours) à partir duquel « manage.py archive_orders » déplace les commandes
+# vers les tables d'archives (food_app/archive.py)
+FOOD_APP_ARCHIVE_AFTER_DAYS = 365
+
+
+# Cache
+# https://docs.djangoproject.com/en/6.0/topics/cache/
+#
+# Catalogue JSON, son ETag, les compteurs par catégorie et la table des prix
+# (food_app/catalog.py) dans le cache par défaut, invalidés après chaque
+# écriture sur Product. Avec plusieurs processus, un cache en mémoire n'est
+# invalidé que dans celui qui a écrit: les autres serviraient l'ancien
+# catalogue (et répondraient 304 à l'ancien ETag). En production,
+# FOOD_APP_CACHE_URL (par exemple redis://localhost:6379/0) le remplace par
+# un cache Redis partagé; sans lui, les entrées du catalogue ne vivent que
+# FOOD_APP_CATALOG_CACHE_SECONDS secondes.
+#
+# Fragments de gabarits (food_app/fragments.py) dans leur propre cache, pour
+# ne pas évincer le catalogue et les métriques. Ils sont invalidés par des
+# jetons de génération rangés dans ce même cache: en mémoire (défaut), chaque
+# processus a les siens et une écriture n'invalide que ceux du processus qui
+# l'a faite; les autres servent des fragments périmés jusqu'à une heure. Ce
+# défaut ne convient donc qu'à un seul processus (runserver). Avec plusieurs
+# processus, les fragments vont dans le cache Redis de FOOD_APP_CACHE_URL, ou
+# sur disque avec FOOD_APP_FRAGMENT_CACHE_DIR (processus d'une même machine).
+#
+# Utilisateurs connectés (et sessions, voir plus bas) dans le cache
+# « sessions ». FOOD_APP_SESSION_CACHE_URL (par exemple
+# redis://localhost:6379/1) le remplace par un cache Redis partagé entre
+# les processus.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'fragments': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'food_app-fragments',
+        'OPTIONS': {'MAX_ENTRIES': 5000},
+    },
+    'sessions': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'food_app-sessions',
+        'OPTIONS': {'MAX_ENTRIES': 10000},
+    },
 }
+if os.environ.get('FOOD_APP_CACHE_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['FOOD_APP_CACHE_URL'],
+    }
+if os.environ.get('FOOD_APP_SESSION_CACHE_URL'):
+    CACHES['sessions'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['FOOD_APP_SESSION_CACHE_URL'],
+    }
+if os.environ.get('FOOD_APP_FRAGMENT_CACHE_DIR'):
+    CACHES['fragments'] = {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ['FOOD_APP_FRAGMENT_CACHE_DIR'],
+        'OPTIONS': {'MAX_ENTRIES': 50000},
+    }
+elif os.environ.get('FOOD_APP_CACHE_URL'):
+    CACHES['fragments'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['FOOD_APP_CACHE_URL'],
+        'KEY_PREFIX': 'fragments',
+    }
+
+FOOD_APP_CATALOG_CACHE_SECONDS = 60 * 60 * 24 if os.environ.get('FOOD_APP_CACHE_URL') else 30
+
+# Sessions lues depuis le cache et écrites aussi en base (cached_db) quand le
+# cache « sessions » est partagé: le panier côté serveur (food_app/cart.py) y
+# est alors lu sans requête. Un cache en mémoire est propre à chaque
+# processus et garderait une session déconnectée ailleurs valable jusqu'à
+# son expiration: sans cache partagé, les sessions restent en base.
+if CACHES['sessions']['BACKEND'].endswith('LocMemCache'):
+    SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+else:
+    SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
+    SESSION_CACHE_ALIAS = 'sessions'
 
 
 # Password validation
@@ -175,6 +361,22 @@ STATICFILES_DIRS = [
     # Ajoutez d'autres chemins si vous avez des fichiers statiques globaux
 ]
 
+# collectstatic écrit des noms empreintés (css/styles.<empreinte>.css) et leurs
+# variantes .gz/.br (food_app/staticfiles.py); {% static %} renvoie ces noms.
+# Hors DEBUG, un manifeste absent (collectstatic oublié) est une erreur; en
+# développement et dans les tests, {% static %} renvoie alors le nom d'origine.
+STORAGES = {
+    'default': {'BACKEND': 'django.core.files.storage.FileSystemStorage'},
+    'staticfiles': {
+        'BACKEND': 'food_app.staticfiles.CompressedManifestStaticFilesStorage',
+        'OPTIONS': {'manifest_strict': not DEBUG},
+    },
+}
+
+# Service de STATIC_ROOT par StaticAssetMiddleware (cache immuable, Accept-Encoding).
+# En développement, runserver sert les fichiers sources.
+FOOD_APP_SERVE_STATIC = not DEBUG
+
 # Si vous utilisez des fichiers média (téléchargements utilisateurs)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
\ No newline at end of file